@@ -0,0 +1,188 @@
+# apps/affiliates/assignments.py - Set-based affiliate / form assignment changes
+"""
+Bulk changes to AffiliateFormAssignment rows.
+
+Every operation loads the affiliates, forms and existing assignments it
+touches up front (one query each), then writes with bulk_create /
+single UPDATE statements inside one transaction. The caller gets a per-pair
+report of what happened.
+
+- bulk_assign: assign / unassign forms x affiliates (FormAssignmentBulkView)
+- replace_assignments: set one affiliate's active forms (form_assignments POST)
+"""
+from django.db import transaction
+from apps.forms.models import Form
+from .models import Affiliate, AffiliateFormAssignment
+from .stats import recompute_assignment_stats
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def _parse_ids(values):
+    """Split raw ids into ``(valid UUIDs, invalid values)`` keeping order"""
+    valid, invalid = [], []
+    for value in values or []:
+        try:
+            parsed = uuid.UUID(str(value))
+        except ValueError:
+            invalid.append(value)
+            continue
+        if parsed not in valid:
+            valid.append(parsed)
+    return valid, invalid
+
+
+def bulk_assign(affiliate_ids, form_ids, action='assign', user=None):
+    """
+    Assign (or unassign) every form to every affiliate.
+
+    Returns one entry per requested affiliate with the outcome for each
+    form: created, reactivated, already_active, deactivated, not_assigned.
+    """
+    affiliate_uuids, bad_affiliates = _parse_ids(affiliate_ids)
+    form_uuids, bad_forms = _parse_ids(form_ids)
+
+    affiliates = {
+        affiliate.id: affiliate
+        for affiliate in Affiliate.objects.filter(id__in=affiliate_uuids).only('id', 'affiliate_code')
+    }
+    found = set(
+        Form.objects.filter(id__in=form_uuids, is_active=True).values_list('id', flat=True)
+    )
+    forms = [form_id for form_id in form_uuids if form_id in found]
+    skipped_forms = [str(value) for value in bad_forms] + [
+        str(form_id) for form_id in form_uuids if form_id not in found
+    ]
+
+    outcomes = {}
+    if affiliates and forms:
+        # The requested pairs are the full affiliates x forms product, so
+        # "(affiliate, form) IN pairs" is simply affiliate IN ... AND form IN ...
+        pair_filter = {'affiliate_id__in': list(affiliates), 'form_id__in': forms}
+
+        with transaction.atomic():
+            existing = dict(
+                ((affiliate_id, form_id), is_active)
+                for affiliate_id, form_id, is_active in
+                AffiliateFormAssignment.objects.select_for_update()
+                .filter(**pair_filter)
+                .values_list('affiliate_id', 'form_id', 'is_active')
+            )
+
+            for affiliate_id in affiliates:
+                for form_id in forms:
+                    state = existing.get((affiliate_id, form_id))
+                    if action == 'assign':
+                        if state is None:
+                            outcomes[(affiliate_id, form_id)] = 'created'
+                        else:
+                            outcomes[(affiliate_id, form_id)] = 'already_active' if state else 'reactivated'
+                    else:
+                        outcomes[(affiliate_id, form_id)] = 'deactivated' if state else 'not_assigned'
+
+            if action == 'assign':
+                AffiliateFormAssignment.objects.bulk_create([
+                    AffiliateFormAssignment(
+                        affiliate_id=affiliate_id,
+                        form_id=form_id,
+                        assigned_by=user,
+                        is_active=True
+                    )
+                    for (affiliate_id, form_id), outcome in outcomes.items()
+                    if outcome == 'created'
+                ], batch_size=1000, ignore_conflicts=True)
+                AffiliateFormAssignment.objects.filter(
+                    is_active=False, **pair_filter
+                ).update(is_active=True)
+            else:
+                AffiliateFormAssignment.objects.filter(
+                    is_active=True, **pair_filter
+                ).update(is_active=False)
+
+    results = []
+    for affiliate_id in affiliate_uuids:
+        affiliate = affiliates.get(affiliate_id)
+        if affiliate is None:
+            results.append({'affiliate_id': str(affiliate_id), 'error': 'Affiliate not found'})
+            continue
+        results.append({
+            'affiliate_id': str(affiliate.id),
+            'affiliate_code': affiliate.affiliate_code,
+            'processed_forms': len(forms),
+            'forms': [
+                {'form_id': str(form_id), 'result': outcomes[(affiliate.id, form_id)]}
+                for form_id in forms
+            ],
+        })
+    for value in bad_affiliates:
+        results.append({'affiliate_id': value, 'error': 'Affiliate not found'})
+
+    logger.info(
+        f"Bulk {action}: {len(affiliates)} affiliates x {len(forms)} forms, "
+        f"{sum(1 for outcome in outcomes.values() if outcome in ('created', 'reactivated', 'deactivated'))} changed"
+    )
+    return results, skipped_forms
+
+
+def replace_assignments(affiliate, form_ids, user=None):
+    """
+    Make ``form_ids`` the affiliate's active assignments.
+
+    Diffs against the current assignments and only writes what changed:
+    one bulk_create for new pairs and one UPDATE each for reactivated and
+    deactivated pairs. Stats for the assigned pairs are recounted with one
+    grouped query.
+    """
+    form_uuids, bad_forms = _parse_ids(form_ids)
+    found = set(
+        Form.objects.filter(id__in=form_uuids, is_active=True).values_list('id', flat=True)
+    )
+    desired = [form_id for form_id in form_uuids if form_id in found]
+    skipped_forms = [str(value) for value in bad_forms] + [
+        str(form_id) for form_id in form_uuids if form_id not in found
+    ]
+
+    with transaction.atomic():
+        current = dict(
+            AffiliateFormAssignment.objects.select_for_update()
+            .filter(affiliate=affiliate)
+            .values_list('form_id', 'is_active')
+        )
+
+        to_create = [form_id for form_id in desired if form_id not in current]
+        to_activate = [form_id for form_id in desired if current.get(form_id) is False]
+        to_deactivate = [
+            form_id for form_id, is_active in current.items()
+            if is_active and form_id not in found
+        ]
+
+        AffiliateFormAssignment.objects.bulk_create([
+            AffiliateFormAssignment(
+                affiliate=affiliate,
+                form_id=form_id,
+                assigned_by=user,
+                is_active=True
+            )
+            for form_id in to_create
+        ], batch_size=1000, ignore_conflicts=True)
+        if to_activate:
+            AffiliateFormAssignment.objects.filter(
+                affiliate=affiliate, form_id__in=to_activate
+            ).update(is_active=True)
+        if to_deactivate:
+            AffiliateFormAssignment.objects.filter(
+                affiliate=affiliate, form_id__in=to_deactivate
+            ).update(is_active=False)
+
+        recompute_assignment_stats((affiliate.id, form_id) for form_id in desired)
+
+    return {
+        'assigned_forms': len(desired),
+        'created': [str(form_id) for form_id in to_create],
+        'reactivated': [str(form_id) for form_id in to_activate],
+        'deactivated': [str(form_id) for form_id in to_deactivate],
+        'unchanged': len(desired) - len(to_create) - len(to_activate),
+        'skipped_forms': skipped_forms,
+    }
@@ -0,0 +1,2 @@
+# apps/affiliates/management/commands/__init__.py
+# This file makes Python treat the directory as a package
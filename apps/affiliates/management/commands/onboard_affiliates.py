@@ -0,0 +1,51 @@
+# apps/affiliates/management/commands/onboard_affiliates.py
+from django.core.management.base import BaseCommand, CommandError
+from apps.affiliates.onboarding import onboard_affiliates
+import csv
+
+class Command(BaseCommand):
+    help = 'Create affiliates in bulk from a CSV file (user_name, email, password, affiliate_code, company_name, website)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='CSV file with one affiliate per row')
+        parser.add_argument(
+            '--send-credentials',
+            action='store_true',
+            help='Email every new affiliate its login',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Processes used to hash passwords',
+        )
+    
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as fileobj:
+                rows = list(csv.DictReader(fileobj))
+        except OSError as e:
+            raise CommandError(str(e))
+        
+        self.stdout.write(f"👥 Onboarding {len(rows)} affiliates...")
+        
+        # The command waits for the emails instead of leaving them to a thread
+        created, errors = onboard_affiliates(
+            rows,
+            send_credentials=options['send_credentials'],
+            background=False,
+            workers=options['workers']
+        )
+        
+        for error in errors:
+            # +2: header line and 1-based numbering
+            details = '; '.join(f"{field}: {message}" for field, message in error['errors'].items())
+            self.stdout.write(f"   ⚠️  Line {error['row'] + 2}: {details}")
+        
+        # Generated passwords nobody was emailed are shown only here
+        generated = [entry for entry in created if entry['password']]
+        if generated:
+            self.stdout.write(f"🔑 Generated passwords ({len(generated)} not emailed):")
+            for entry in generated:
+                self.stdout.write(f"   {entry['user_name']}: {entry['password']}")
+        
+        self.stdout.write(f"✅ Onboarding complete ({len(created)} created, {len(errors)} rejected)")
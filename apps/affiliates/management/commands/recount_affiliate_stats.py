@@ -0,0 +1,16 @@
+# apps/affiliates/management/commands/recount_affiliate_stats.py
+from django.core.management.base import BaseCommand
+from apps.affiliates.models import AffiliateFormAssignment
+from apps.affiliates import stats
+
+class Command(BaseCommand):
+    help = 'Recount affiliate and assignment lead / conversion counters from the leads table'
+    
+    def handle(self, *args, **options):
+        self.stdout.write('🔢 Recounting affiliate stats...')
+        
+        affiliates = stats.recompute_affiliate_stats()
+        pairs = AffiliateFormAssignment.objects.values_list('affiliate_id', 'form_id')
+        assignments = stats.recompute_assignment_stats(pairs)
+        
+        self.stdout.write(f"✅ Stats recounted ({affiliates} affiliates, {assignments} assignments)")
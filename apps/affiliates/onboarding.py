@@ -0,0 +1,411 @@
+# apps/affiliates/onboarding.py - Bulk affiliate onboarding
+"""
+Create many affiliate accounts at once.
+
+Creating one affiliate through AffiliateCreateSerializer costs a PBKDF2 hash
+(hundreds of milliseconds by design), a few INSERTs and an SMTP round trip.
+For a whole partner network this module instead:
+
+- validates every row up front, checking usernames and affiliate codes
+  against the database with one query each
+- hashes the passwords on a process pool (hashing is CPU bound, so threads
+  would not help)
+- inserts all users with one bulk_create and all affiliates with another
+- queues the credential emails for the background worker, which sends
+  each batch over a single SMTP connection
+
+Generated passwords that are emailed are made by the worker itself
+(``issue_credentials`` is queued with user ids only), so they never sit in
+the job table; the accounts have no usable password until it runs. Only a
+password an admin typed in is queued, as a ``sensitive`` job.
+"""
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.password_validation import validate_password
+from django.core.exceptions import ValidationError
+from django.core.mail import EmailMessage, get_connection
+from django.core.validators import validate_email
+from django.db import connection, transaction
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from apps.core.jobs import enqueue, task, PRIORITY_DEFAULT
+from .models import Affiliate
+import logging
+import os
+import secrets
+import string
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ONBOARDING_LIMIT = 5000
+DEFAULT_HASH_POOL_MIN = 20
+EMAIL_BATCH_SIZE = 100
+
+PASSWORD_ALPHABET = string.ascii_letters + string.digits + "!@#$%^&*"
+
+CREDENTIALS_SUBJECT = 'Your Affiliate Account Credentials'
+CREDENTIALS_MESSAGE = """
+Welcome to our Affiliate Program!
+
+Your account has been created with the following credentials:
+
+Username: {username}
+Password: {password}
+Affiliate Code: {affiliate_code}
+
+Please login at: {login_url}
+
+For security, please change your password after your first login.
+
+Best regards,
+The Team
+"""
+
+UPDATED_SUBJECT = 'Your Affiliate Account Credentials'
+UPDATED_MESSAGE = """
+Hello {username},
+
+Here are your updated login credentials:
+
+Username: {username}
+Password: {password}
+Affiliate Code: {affiliate_code}
+
+Login URL: {login_url}
+
+Please change your password after logging in for security.
+
+Best regards,
+The Team
+"""
+
+RESET_SUBJECT = 'Your Password Has Been Reset'
+RESET_MESSAGE = """
+Hello {username},
+
+Your password has been reset by an administrator.
+
+New Password: {password}
+
+Please login and change your password for security.
+
+Login URL: {login_url}
+
+Best regards,
+The Team
+"""
+
+# kind -> (subject, message): new account, credentials re-sent, admin reset
+CREDENTIAL_EMAILS = {
+    'welcome': (CREDENTIALS_SUBJECT, CREDENTIALS_MESSAGE),
+    'updated': (UPDATED_SUBJECT, UPDATED_MESSAGE),
+    'reset': (RESET_SUBJECT, RESET_MESSAGE),
+}
+
+
+def onboarding_limit():
+    return getattr(settings, 'AFFILIATE_ONBOARDING_LIMIT', DEFAULT_ONBOARDING_LIMIT)
+
+
+def hash_workers():
+    default = min(4, os.cpu_count() or 1)
+    return getattr(settings, 'AFFILIATE_ONBOARDING_HASH_WORKERS', default)
+
+
+def generate_password(length=12):
+    return ''.join(secrets.choice(PASSWORD_ALPHABET) for _ in range(length))
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def hash_passwords(passwords, workers=None):
+    """make_password for every password, on a process pool when worthwhile"""
+    passwords = list(passwords)
+    workers = workers or hash_workers()
+    if workers <= 1 or len(passwords) < DEFAULT_HASH_POOL_MIN:
+        return [make_password(password) for password in passwords]
+
+    # Don't hand open connections to the pool
+    connection.close()
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=get_context('spawn'),
+        initializer=_init_worker
+    ) as pool:
+        chunksize = max(1, len(passwords) // (workers * 4))
+        return list(pool.map(make_password, passwords, chunksize=chunksize))
+
+
+def _text(row, key):
+    value = row.get(key)
+    return '' if value is None else str(value).strip()
+
+
+def validate_rows(rows):
+    """
+    Clean onboarding rows.
+
+    Returns ``(valid, errors)``; ``errors`` are ``{'row': index, 'errors': {...}}``.
+    Usernames and affiliate codes are checked against each other and against
+    the database, and text fields against their column lengths (bulk_create
+    runs no model validation). ``phone`` is accepted and, as with
+    AffiliateCreateSerializer, not stored: no model has a field for it.
+    """
+    User = get_user_model()
+    max_lengths = {
+        'user_name': User._meta.get_field('username').max_length,
+        'email': User._meta.get_field('email').max_length,
+        'company_name': Affiliate._meta.get_field('company_name').max_length,
+        'website': Affiliate._meta.get_field('website').max_length,
+    }
+
+    cleaned = []
+    for row in rows:
+        if not isinstance(row, dict):
+            row = {}
+        cleaned.append({
+            'user_name': _text(row, 'user_name') or _text(row, 'username'),
+            'email': _text(row, 'email'),
+            'phone': _text(row, 'phone'),
+            'password': _text(row, 'password'),
+            'affiliate_code': _text(row, 'affiliate_code'),
+            'company_name': _text(row, 'company_name'),
+            'website': _text(row, 'website'),
+            'is_active': str(row.get('is_active', True)).lower() not in ('0', 'false', 'no'),
+        })
+
+    taken_usernames = set(
+        User.objects.filter(username__in=[row['user_name'] for row in cleaned])
+        .values_list('username', flat=True)
+    )
+    codes = [row['affiliate_code'] for row in cleaned]
+    taken_codes = set(
+        Affiliate.objects.filter(affiliate_code__in=codes).values_list('affiliate_code', flat=True)
+    ) | set(
+        User.objects.filter(affiliate_id__in=codes).values_list('affiliate_id', flat=True)
+    )
+
+    valid, errors = [], []
+    seen_usernames, seen_codes = set(), set()
+    for index, row in enumerate(cleaned):
+        problems = {}
+
+        if not row['user_name']:
+            problems['user_name'] = 'This field is required.'
+        elif row['user_name'] in taken_usernames:
+            problems['user_name'] = f"Username '{row['user_name']}' is already taken"
+        elif row['user_name'] in seen_usernames:
+            problems['user_name'] = f"Username '{row['user_name']}' appears more than once"
+
+        if not row['affiliate_code']:
+            problems['affiliate_code'] = 'This field is required.'
+        elif len(row['affiliate_code']) > Affiliate._meta.get_field('affiliate_code').max_length:
+            problems['affiliate_code'] = 'Affiliate code is too long'
+        elif row['affiliate_code'] in taken_codes:
+            problems['affiliate_code'] = f"Affiliate code '{row['affiliate_code']}' already exists"
+        elif row['affiliate_code'] in seen_codes:
+            problems['affiliate_code'] = f"Affiliate code '{row['affiliate_code']}' appears more than once"
+
+        if row['email']:
+            try:
+                validate_email(row['email'])
+            except ValidationError:
+                problems['email'] = 'Enter a valid email address.'
+
+        if row['website'] and not row['website'].startswith(('http://', 'https://')):
+            problems['website'] = 'Website URL must start with http:// or https://'
+
+        for key, max_length in max_lengths.items():
+            if key not in problems and len(row[key]) > max_length:
+                problems[key] = f'Ensure this field has no more than {max_length} characters.'
+
+        if row['password']:
+            try:
+                validate_password(row['password'])
+            except ValidationError as e:
+                problems['password'] = e.messages
+
+        seen_usernames.add(row['user_name'])
+        seen_codes.add(row['affiliate_code'])
+        if problems:
+            errors.append({'row': index, 'errors': problems})
+        else:
+            valid.append(row)
+
+    return valid, errors
+
+
+def credentials_email(username, password, affiliate_code, email, kind='welcome'):
+    subject, message = CREDENTIAL_EMAILS[kind]
+    return EmailMessage(
+        subject,
+        message.format(
+            username=username,
+            password=password,
+            affiliate_code=affiliate_code,
+            login_url=f'{settings.FRONTEND_URL}/login'
+        ),
+        settings.DEFAULT_FROM_EMAIL,
+        [email]
+    )
+
+
+def send_credential_emails(messages):
+    """
+    Send credential emails over one reused connection.
+
+    Returns the number sent. A connection that can't be opened raises (so a
+    queued batch is retried); failures while sending are logged, since
+    retrying would resend the emails that did go out.
+    """
+    sent = 0
+    mail = get_connection(fail_silently=False)
+    mail.open()
+    try:
+        for start in range(0, len(messages), EMAIL_BATCH_SIZE):
+            batch = messages[start:start + EMAIL_BATCH_SIZE]
+            try:
+                sent += mail.send_messages(batch) or 0
+            except Exception as e:
+                logger.error(f"Failed to send {len(batch)} credential emails: {e}")
+    finally:
+        mail.close()
+
+    logger.info(f"Sent {sent} of {len(messages)} affiliate credential emails")
+    return sent
+
+
+@task(sensitive=True)
+def send_credentials_batch(credentials, kind='welcome'):
+    """Queue entry point: ``[[username, password, affiliate_code, email], ...]``"""
+    send_credential_emails([credentials_email(*item, kind=kind) for item in credentials])
+
+
+def queue_credential_emails(credentials, kind='welcome', priority=PRIORITY_DEFAULT):
+    """One job per EMAIL_BATCH_SIZE emails, each sent over one connection"""
+    for start in range(0, len(credentials), EMAIL_BATCH_SIZE):
+        enqueue(send_credentials_batch, priority=priority,
+                credentials=credentials[start:start + EMAIL_BATCH_SIZE], kind=kind)
+
+
+@task
+def issue_credentials(user_ids, kind='welcome'):
+    """
+    Give each user a new generated password and email it to them.
+
+    Only user ids are queued; the passwords are made here. A retry (the
+    mail server was unreachable) issues fresh ones, since the earlier ones
+    were never delivered.
+    """
+    User = get_user_model()
+    users = list(User.objects.filter(pk__in=user_ids, is_active=True).exclude(email=''))
+    if not users:
+        return
+
+    passwords = [generate_password() for _ in users]
+    for user, password_hash in zip(users, hash_passwords(passwords)):
+        user.password = password_hash
+    User.objects.bulk_update(users, ['password'], batch_size=500)
+
+    send_credential_emails([
+        credentials_email(user.username, password, user.affiliate_id, user.email, kind=kind)
+        for user, password in zip(users, passwords)
+    ])
+
+
+def queue_issued_credentials(user_ids, kind='welcome', priority=PRIORITY_DEFAULT):
+    """One issue_credentials job per EMAIL_BATCH_SIZE users"""
+    user_ids = list(user_ids)
+    for start in range(0, len(user_ids), EMAIL_BATCH_SIZE):
+        enqueue(issue_credentials, priority=priority, user_ids=user_ids[start:start + EMAIL_BATCH_SIZE], kind=kind)
+
+
+def onboard_affiliates(rows, send_credentials=False, background=True, workers=None):
+    """
+    Create a user and an affiliate for every valid row.
+
+    Rows without a password get a generated one. With ``send_credentials``
+    every new affiliate that has an email is sent its login: queued for the
+    background worker, or sent right after commit if ``background`` is False.
+    When queued, generated passwords are left to ``issue_credentials``.
+
+    Returns ``(created, errors)``. A generated password that isn't emailed is
+    returned in its ``created`` entry as ``password`` (``None`` otherwise),
+    since nothing else ever shows it.
+    """
+    User = get_user_model()
+
+    valid, errors = validate_rows(rows)
+    if not valid:
+        return [], errors
+
+    # Queued rows with an email and no password get theirs from the worker
+    issued = [
+        send_credentials and background and not row['password'] and bool(row['email'])
+        for row in valid
+    ]
+    passwords = [
+        None if deferred else row['password'] or generate_password()
+        for row, deferred in zip(valid, issued)
+    ]
+    hashed = iter(hash_passwords([password for password in passwords if password is not None], workers))
+    hashes = [make_password(None) if password is None else next(hashed) for password in passwords]
+
+    with transaction.atomic():
+        User.objects.bulk_create([
+            User(
+                username=row['user_name'],
+                email=row['email'],
+                password=password_hash,
+                user_type='affiliate',
+                affiliate_id=row['affiliate_code']
+            )
+            for row, password_hash in zip(valid, hashes)
+        ], batch_size=500)
+
+        # Not every backend hands primary keys back from bulk_create
+        user_ids = dict(
+            User.objects.filter(username__in=[row['user_name'] for row in valid])
+            .values_list('username', 'id')
+        )
+        affiliates = Affiliate.objects.bulk_create([
+            Affiliate(
+                user_id=user_ids[row['user_name']],
+                affiliate_code=row['affiliate_code'],
+                company_name=row['company_name'],
+                website=row['website'],
+                is_active=row['is_active']
+            )
+            for row in valid
+        ], batch_size=500)
+
+        if send_credentials:
+            credentials = [
+                [row['user_name'], password, row['affiliate_code'], row['email']]
+                for row, password in zip(valid, passwords)
+                if row['email'] and password is not None
+            ]
+            if background:
+                # Commits with the accounts: no emails for a rolled back batch
+                queue_credential_emails(credentials)
+                queue_issued_credentials([
+                    user_ids[row['user_name']] for row, deferred in zip(valid, issued) if deferred
+                ])
+            else:
+                transaction.on_commit(lambda: send_credential_emails(
+                    [credentials_email(*item) for item in credentials]
+                ))
+
+    logger.info(f"Onboarded {len(affiliates)} affiliates ({len(errors)} rows rejected)")
+    created = [{
+        'id': str(affiliate.id),
+        'user_name': row['user_name'],
+        'affiliate_code': affiliate.affiliate_code,
+        'email': row['email'],
+        'password': password if not row['password'] and not (send_credentials and row['email']) else None,
+    } for affiliate, row, password in zip(affiliates, valid, passwords)]
+    return created, errors
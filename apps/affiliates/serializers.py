@@ -159,10 +159,8 @@ class AffiliateCreateSerializer(serializers.ModelSerializer):
     
     def create(self, validated_data):
         from django.contrib.auth import get_user_model
-        from django.core.mail import send_mail
-        from django.conf import settings
-        import secrets
-        import string
+        from apps.core.jobs import PRIORITY_HIGH
+        from .onboarding import generate_password, queue_credential_emails, queue_issued_credentials
         
         User = get_user_model()
         
@@ -171,19 +169,18 @@ class AffiliateCreateSerializer(serializers.ModelSerializer):
         email = validated_data.pop('email', '')
         phone = validated_data.pop('phone', '')
         password = validated_data.pop('password', '')
-        send_credentials = validated_data.pop('send_credentials', False)
+        send_credentials = validated_data.pop('send_credentials', False) and bool(email)
         
-        # Generate password if not provided
-        if not password:
-            # Generate secure random password
-            alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-            password = ''.join(secrets.choice(alphabet) for _ in range(12))
+        # Generate password if not provided; an emailed one is made by the
+        # worker so it never sits in the job table
+        if not password and not send_credentials:
+            password = generate_password()
         
         # Create user
         user = User.objects.create_user(
             username=user_name,
             email=email,
-            password=password,
+            password=password or None,
             user_type='affiliate',
             affiliate_id=validated_data['affiliate_code']
         )
@@ -194,39 +191,14 @@ class AffiliateCreateSerializer(serializers.ModelSerializer):
             **validated_data
         )
         
-        # Send credentials via email if requested and email is provided
-        if send_credentials and email:
-            try:
-                subject = 'Your Affiliate Account Credentials'
-                message = f"""
-                Welcome to our Affiliate Program!
-                
-                Your account has been created with the following credentials:
-                
-                Username: {user_name}
-                Password: {password}
-                Affiliate Code: {validated_data['affiliate_code']}
-                
-                Please login at: {settings.FRONTEND_URL}/login
-                
-                For security, please change your password after your first login.
-                
-                Best regards,
-                The Team
-                """
-                
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [email],
-                    fail_silently=True,
+        # Queue the credentials email if requested and email is provided
+        if send_credentials:
+            if password:
+                queue_credential_emails(
+                    [[user_name, password, affiliate.affiliate_code, email]], priority=PRIORITY_HIGH
                 )
-            except Exception as e:
-                # Don't fail affiliate creation if email fails
-                import logging
-                logger = logging.getLogger(__name__)
-                logger.error(f"Failed to send credentials email: {e}")
+            else:
+                queue_issued_credentials([user.pk], priority=PRIORITY_HIGH)
         
         return affiliate
 
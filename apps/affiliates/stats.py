@@ -0,0 +1,192 @@
+# apps/affiliates/stats.py - Set-based maintenance of affiliate counters
+"""
+Keeps Affiliate.total_conversions and AffiliateFormAssignment
+leads_generated / conversions up to date without per-row recounts.
+
+- apply_conversion_deltas: one UPDATE per table, adding a grouped delta
+  per affiliate / (affiliate, form) pair through CASE
+- apply_lead_deltas: the same for total_leads / leads_generated when leads
+  are inserted in bulk
+- recompute_assignment_stats: exact recount of many pairs with a single
+  grouped query, written back with one bulk_update
+- recompute_affiliate_stats: the same for Affiliate total_leads /
+  total_conversions; ``manage.py recount_affiliate_stats`` runs both over
+  every affiliate so the deltas start from true counts
+"""
+from django.db.models import Case, Count, F, IntegerField, Q, Value, When
+from django.db.models.functions import Greatest
+from collections import Counter
+from functools import reduce
+import logging
+import operator
+
+logger = logging.getLogger(__name__)
+
+
+def _pairs_q(pairs, prefix=''):
+    return reduce(operator.or_, (
+        Q(**{f'{prefix}affiliate_id': affiliate_id, f'{prefix}form_id': form_id})
+        for affiliate_id, form_id in pairs
+    ))
+
+
+def conversion_deltas(changes, conversion_statuses):
+    """
+    Group status changes into conversion count deltas.
+
+    ``changes`` yields ``(affiliate_id, form_id, old_status, new_status)``.
+    Returns ``(per_affiliate, per_assignment)`` Counters, zero deltas dropped.
+    """
+    per_affiliate = Counter()
+    per_assignment = Counter()
+    for affiliate_id, form_id, old_status, new_status in changes:
+        if affiliate_id is None:
+            continue
+        delta = int(new_status in conversion_statuses) - int(old_status in conversion_statuses)
+        if delta:
+            per_affiliate[affiliate_id] += delta
+            per_assignment[(affiliate_id, form_id)] += delta
+
+    return (
+        Counter({key: value for key, value in per_affiliate.items() if value}),
+        Counter({key: value for key, value in per_assignment.items() if value}),
+    )
+
+
+def apply_conversion_deltas(per_affiliate, per_assignment):
+    """Add grouped deltas to the conversion counters, one UPDATE per table"""
+    from .models import Affiliate, AffiliateFormAssignment
+
+    if per_affiliate:
+        delta = Case(
+            *[When(pk=pk, then=Value(value)) for pk, value in per_affiliate.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+        Affiliate.objects.filter(pk__in=per_affiliate.keys()).update(
+            total_conversions=Greatest(F('total_conversions') + delta, Value(0))
+        )
+
+    if per_assignment:
+        delta = Case(
+            *[When(affiliate_id=affiliate_id, form_id=form_id, then=Value(value))
+              for (affiliate_id, form_id), value in per_assignment.items()],
+            default=Value(0),
+            output_field=IntegerField()
+        )
+        AffiliateFormAssignment.objects.filter(_pairs_q(per_assignment.keys())).update(
+            conversions=Greatest(F('conversions') + delta, Value(0))
+        )
+
+
+def lead_deltas(pairs):
+    """
+    Count new leads per affiliate and per ``(affiliate_id, form_id)`` pair.
+
+    ``pairs`` yields ``(affiliate_id, form_id)``, one per new lead.
+    """
+    per_affiliate = Counter()
+    per_assignment = Counter()
+    for affiliate_id, form_id in pairs:
+        if affiliate_id is None:
+            continue
+        per_affiliate[affiliate_id] += 1
+        per_assignment[(affiliate_id, form_id)] += 1
+    return per_affiliate, per_assignment
+
+
+def _case(whens):
+    return Case(*whens, default=Value(0), output_field=IntegerField())
+
+
+def apply_lead_deltas(per_affiliate, per_assignment):
+    """Add grouped new-lead counts to the lead counters, one UPDATE per table"""
+    from .models import Affiliate, AffiliateFormAssignment
+
+    if per_affiliate:
+        Affiliate.objects.filter(pk__in=per_affiliate.keys()).update(
+            total_leads=F('total_leads') + _case(
+                [When(pk=pk, then=Value(value)) for pk, value in per_affiliate.items()]
+            )
+        )
+
+    if per_assignment:
+        AffiliateFormAssignment.objects.filter(_pairs_q(per_assignment.keys())).update(
+            leads_generated=F('leads_generated') + _case([
+                When(affiliate_id=affiliate_id, form_id=form_id, then=Value(value))
+                for (affiliate_id, form_id), value in per_assignment.items()
+            ])
+        )
+
+
+def recompute_assignment_stats(pairs):
+    """
+    Recount leads_generated / conversions for ``(affiliate_id, form_id)`` pairs.
+
+    One grouped COUNT over leads for every pair, then one bulk_update.
+    """
+    from apps.leads.models import Lead
+    from .models import AffiliateFormAssignment
+
+    pairs = set(pairs)
+    if not pairs:
+        return 0
+
+    counts = {
+        (row['affiliate_id'], row['form_id']): row
+        for row in Lead.objects.filter(_pairs_q(pairs))
+        .values('affiliate_id', 'form_id')
+        .annotate(
+            leads=Count('id'),
+            converted=Count('id', filter=Q(status__in=Lead.CONVERSION_STATUSES))
+        )
+        .order_by()
+    }
+
+    assignments = list(AffiliateFormAssignment.objects.filter(_pairs_q(pairs)))
+    for assignment in assignments:
+        row = counts.get((assignment.affiliate_id, assignment.form_id), {})
+        assignment.leads_generated = row.get('leads', 0)
+        assignment.conversions = row.get('converted', 0)
+
+    AffiliateFormAssignment.objects.bulk_update(
+        assignments, ['leads_generated', 'conversions'], batch_size=500
+    )
+    logger.info(f"Recomputed stats for {len(assignments)} assignments")
+    return len(assignments)
+
+
+def recompute_affiliate_stats(affiliate_ids=None):
+    """
+    Recount total_leads / total_conversions for affiliates (all by default).
+
+    One grouped COUNT over leads, then one bulk_update.
+    """
+    from apps.leads.models import Lead
+    from .models import Affiliate
+
+    affiliates = Affiliate.objects.all()
+    leads = Lead.objects.filter(affiliate__isnull=False)
+    if affiliate_ids is not None:
+        affiliates = affiliates.filter(pk__in=affiliate_ids)
+        leads = leads.filter(affiliate_id__in=affiliate_ids)
+
+    counts = {
+        row['affiliate_id']: row
+        for row in leads.values('affiliate_id')
+        .annotate(
+            leads=Count('id'),
+            converted=Count('id', filter=Q(status__in=Lead.CONVERSION_STATUSES))
+        )
+        .order_by()
+    }
+
+    affiliates = list(affiliates.only('id', 'total_leads', 'total_conversions'))
+    for affiliate in affiliates:
+        row = counts.get(affiliate.pk, {})
+        affiliate.total_leads = row.get('leads', 0)
+        affiliate.total_conversions = row.get('converted', 0)
+
+    Affiliate.objects.bulk_update(affiliates, ['total_leads', 'total_conversions'], batch_size=500)
+    logger.info(f"Recomputed stats for {len(affiliates)} affiliates")
+    return len(affiliates)
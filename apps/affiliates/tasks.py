@@ -0,0 +1,9 @@
+# apps/affiliates/tasks.py - Background tasks for affiliates
+from apps.core.jobs import task
+from .stats import recompute_assignment_stats
+
+
+@task
+def refresh_assignment_stats(pairs):
+    """Recount leads / conversions for ``[[affiliate_id, form_id], ...]``"""
+    recompute_assignment_stats((affiliate_id, form_id) for affiliate_id, form_id in pairs)
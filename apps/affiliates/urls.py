@@ -15,4 +15,7 @@ urlpatterns = [
     
     # Form assignment management
     path('bulk-assign/', views.FormAssignmentBulkView.as_view(), name='bulk_assign_forms'),
+    
+    # Bulk onboarding
+    path('bulk-onboard/', views.AffiliateOnboardingView.as_view(), name='bulk_onboard_affiliates'),
 ]
@@ -13,6 +13,15 @@ from .serializers import (
 )
 from apps.leads.models import Lead
 from apps.forms.models import Form
+from apps.core.pagination import count_metadata
+from .assignments import bulk_assign, replace_assignments
+from .onboarding import (
+    generate_password, onboard_affiliates, onboarding_limit,
+    queue_credential_emails, queue_issued_credentials
+)
+from apps.core.jobs import PRIORITY_HIGH
+from apps.users import access_tokens
+from django.db import IntegrityError
 import logging
 
 logger = logging.getLogger(__name__)
@@ -95,60 +104,44 @@ class AffiliateViewSet(viewsets.ModelViewSet):
         
         try:
             affiliate = self.get_object()
+            user = affiliate.user
             password = request.data.get('password')
-            send_email = request.data.get('send_email', False)
-            
-            if not password:
-                # Generate a secure random password
-                import secrets
-                import string
-                alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-                password = ''.join(secrets.choice(alphabet) for _ in range(12))
+            send_email = request.data.get('send_email', False) and bool(user.email)
             
-            # Update user password
-            affiliate.user.set_password(password)
-            affiliate.user.save()
+            if send_email and not password:
+                # The worker makes and emails the new password, so it never
+                # sits in the job table; until then the old one no longer works
+                user.set_unusable_password()
+            else:
+                password = password or generate_password()
+                user.set_password(password)
+            user.save()
             
             # Invalidate existing tokens
             from rest_framework.authtoken.models import Token
-            Token.objects.filter(user=affiliate.user).delete()
+            Token.objects.filter(user=user).delete()
+            access_tokens.revoke_user(user.pk)
             
-            # Send email if requested and user has email
-            if send_email and affiliate.user.email:
+            if send_email:
                 try:
-                    from django.core.mail import send_mail
-                    from django.conf import settings
-                    
-                    subject = 'Your Password Has Been Reset'
-                    message = f"""
-                    Hello {affiliate.user.username},
-                    
-                    Your password has been reset by an administrator.
-                    
-                    New Password: {password}
-                    
-                    Please login and change your password for security.
-                    
-                    Login URL: {settings.FRONTEND_URL}/login
-                    
-                    Best regards,
-                    The Team
-                    """
-                    
-                    send_mail(
-                        subject,
-                        message,
-                        settings.DEFAULT_FROM_EMAIL,
-                        [affiliate.user.email],
-                        fail_silently=False,
-                    )
+                    if password:
+                        queue_credential_emails(
+                            [[user.username, password, affiliate.affiliate_code, user.email]],
+                            kind='reset', priority=PRIORITY_HIGH
+                        )
+                    else:
+                        queue_issued_credentials([user.pk], kind='reset', priority=PRIORITY_HIGH)
                     
                     return Response({
-                        'message': 'Password reset successfully and email sent',
-                        'password': password if not send_email else None
+                        'message': 'Password reset successfully and email queued',
+                        'password': None
                     })
                 except Exception as e:
-                    logger.error(f"Failed to send password reset email: {e}")
+                    logger.error(f"Failed to queue password reset email: {e}")
+                    if not password:
+                        password = generate_password()
+                        user.set_password(password)
+                        user.save()
                     return Response({
                         'message': 'Password reset successfully but email failed to send',
                         'password': password,
@@ -181,48 +174,11 @@ class AffiliateViewSet(viewsets.ModelViewSet):
                     'error': 'Affiliate has no email address'
                 }, status=status.HTTP_400_BAD_REQUEST)
             
-            # Generate new password
-            import secrets
-            import string
-            alphabet = string.ascii_letters + string.digits + "!@#$%^&*"
-            new_password = ''.join(secrets.choice(alphabet) for _ in range(12))
-            
-            # Update password
-            affiliate.user.set_password(new_password)
-            affiliate.user.save()
-            
-            # Send email
-            from django.core.mail import send_mail
-            from django.conf import settings
-            
-            subject = 'Your Affiliate Account Credentials'
-            message = f"""
-            Hello {affiliate.user.username},
-            
-            Here are your updated login credentials:
-            
-            Username: {affiliate.user.username}
-            Password: {new_password}
-            Affiliate Code: {affiliate.affiliate_code}
-            
-            Login URL: {settings.FRONTEND_URL}/login
-            
-            Please change your password after logging in for security.
-            
-            Best regards,
-            The Team
-            """
-            
-            send_mail(
-                subject,
-                message,
-                settings.DEFAULT_FROM_EMAIL,
-                [affiliate.user.email],
-                fail_silently=False,
-            )
+            # The worker sets a new password and emails it
+            queue_issued_credentials([affiliate.user_id], kind='updated', priority=PRIORITY_HIGH)
             
             return Response({
-                'message': f'Credentials sent to {affiliate.user.email}'
+                'message': f'Credentials queued for {affiliate.user.email}'
             })
             
         except Exception as e:
@@ -338,12 +294,18 @@ class AffiliateViewSet(viewsets.ModelViewSet):
             
             # Serialize leads
             from apps.leads.serializers import LeadSerializer
-            leads = queryset.order_by('-created_at')[:50]
+            from apps.leads.fieldsets import parse_fieldsets, apply_fieldsets
+            
+            fields, expand = parse_fieldsets(request)
+            leads = apply_fieldsets(queryset, fields, expand).order_by('-created_at')[:50]
+            counts = count_metadata(queryset, request)
             
             return Response({
                 'affiliate_code': affiliate.affiliate_code,
-                'total_count': queryset.count(),
-                'leads': LeadSerializer(leads, many=True).data
+                'total_count': counts['count'],
+                'count_is_estimate': counts['count_is_estimate'],
+                'exact_count_url': counts.get('exact_count_url'),
+                'leads': LeadSerializer(leads, many=True, fields=fields, expand=expand).data
             })
         except Exception as e:
             logger.error(f"Error getting affiliate leads: {e}")
@@ -393,36 +355,16 @@ class AffiliateViewSet(viewsets.ModelViewSet):
             # Update assignments
             form_ids = request.data.get('form_ids', [])
             
+            if not isinstance(form_ids, list):
+                return Response({'error': 'form_ids must be a list'}, status=400)
+            
             try:
-                # Deactivate all current assignments
-                AffiliateFormAssignment.objects.filter(
-                    affiliate=affiliate
-                ).update(is_active=False)
-                
-                # Create/activate new assignments
-                for form_id in form_ids:
-                    try:
-                        form = Form.objects.get(id=form_id, is_active=True)
-                        assignment, created = AffiliateFormAssignment.objects.get_or_create(
-                            affiliate=affiliate,
-                            form=form,
-                            defaults={
-                                'assigned_by': request.user,
-                                'is_active': True
-                            }
-                        )
-                        if not created:
-                            assignment.is_active = True
-                            assignment.save()
-                        
-                        # Update stats
-                        assignment.update_stats()
-                    except Form.DoesNotExist:
-                        continue
+                # Diff against current assignments; only changed pairs are written
+                changes = replace_assignments(affiliate, form_ids, user=request.user)
                 
                 return Response({
                     'message': 'Form assignments updated successfully',
-                    'assigned_forms': len(form_ids)
+                    **changes
                 })
             except Exception as e:
                 logger.error(f"Error updating form assignments: {e}")
@@ -496,58 +438,63 @@ class FormAssignmentBulkView(APIView):
             form_ids = request.data.get('form_ids', [])
             action = request.data.get('action', 'assign')
             
-            results = []
+            if action not in ('assign', 'unassign'):
+                return Response({'error': 'action must be assign or unassign'}, status=400)
+            if not isinstance(affiliate_ids, list) or not isinstance(form_ids, list):
+                return Response({'error': 'affiliate_ids and form_ids must be lists'}, status=400)
             
-            for affiliate_id in affiliate_ids:
-                try:
-                    affiliate = Affiliate.objects.get(id=affiliate_id)
-                    assigned_count = 0
-                    
-                    for form_id in form_ids:
-                        try:
-                            form = Form.objects.get(id=form_id, is_active=True)
-                            
-                            if action == 'assign':
-                                assignment, created = AffiliateFormAssignment.objects.get_or_create(
-                                    affiliate=affiliate,
-                                    form=form,
-                                    defaults={
-                                        'assigned_by': request.user,
-                                        'is_active': True
-                                    }
-                                )
-                                if not created:
-                                    assignment.is_active = True
-                                    assignment.save()
-                                assigned_count += 1
-                            
-                            elif action == 'unassign':
-                                AffiliateFormAssignment.objects.filter(
-                                    affiliate=affiliate,
-                                    form=form
-                                ).update(is_active=False)
-                                assigned_count += 1
-                        
-                        except Form.DoesNotExist:
-                            continue
-                    
-                    results.append({
-                        'affiliate_id': str(affiliate.id),
-                        'affiliate_code': affiliate.affiliate_code,
-                        'processed_forms': assigned_count
-                    })
-                
-                except Affiliate.DoesNotExist:
-                    results.append({
-                        'affiliate_id': affiliate_id,
-                        'error': 'Affiliate not found'
-                    })
+            # Set-based: a handful of queries however many pairs are requested
+            results, skipped_forms = bulk_assign(
+                affiliate_ids, form_ids, action=action, user=request.user
+            )
             
             return Response({
                 'message': f'Bulk {action} completed',
-                'results': results
+                'results': results,
+                'skipped_forms': skipped_forms
             })
         
         except Exception as e:
             logger.error(f"Error in bulk assignment: {e}")
             return Response({'error': str(e)}, status=500)
+
+
+class AffiliateOnboardingView(APIView):
+    """
+    Create many affiliates in one request (Admin only).
+
+    Body: ``{"affiliates": [{"user_name", "email", "password", "affiliate_code",
+    "company_name", "website", "is_active"}, ...], "send_credentials": true}``.
+    Valid rows are created, invalid ones are reported by index. Passwords
+    left blank are generated; those that aren't emailed are returned in
+    ``created`` so they can be handed over.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        if request.user.user_type != 'admin':
+            return Response({'error': 'Admin access required'}, status=403)
+        
+        rows = request.data.get('affiliates')
+        if not isinstance(rows, list) or not rows:
+            return Response({'error': 'affiliates must be a non-empty list'}, status=400)
+        limit = onboarding_limit()
+        if len(rows) > limit:
+            return Response({'error': f'At most {limit} affiliates per request'}, status=400)
+        
+        try:
+            created, errors = onboard_affiliates(
+                rows, send_credentials=bool(request.data.get('send_credentials', False))
+            )
+            return Response({
+                'created': created,
+                'created_count': len(created),
+                'errors': errors,
+            }, status=status.HTTP_201_CREATED if created else status.HTTP_400_BAD_REQUEST)
+        except IntegrityError as e:
+            # Someone took a username or code between validation and insert
+            logger.error(f"Conflict onboarding affiliates: {e}")
+            return Response({'error': 'Username or affiliate code already exists, please retry'}, status=409)
+        except Exception as e:
+            logger.error(f"Error onboarding affiliates: {e}")
+            return Response({'error': str(e)}, status=500)
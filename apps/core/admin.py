@@ -1,6 +1,7 @@
 # apps/core/admin.py - COMPLETE VERSION
 from django.contrib import admin
-from .models import Setting, Analytics
+from .jobs import is_sensitive
+from .models import Setting, Analytics, Job
 
 @admin.register(Setting)
 class SettingAdmin(admin.ModelAdmin):
@@ -12,3 +13,38 @@ class AnalyticsAdmin(admin.ModelAdmin):
     list_display = ('form', 'date', 'views', 'submissions', 'conversion_rate')
     list_filter = ('date', 'form')
     date_hierarchy = 'date'
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'name', 'status', 'priority', 'attempts', 'max_attempts', 'run_after', 'finished_at')
+    list_filter = ('status', 'name')
+    search_fields = ('name', 'last_error')
+    readonly_fields = [field.name for field in Job._meta.fields]
+    actions = ['retry_jobs']
+    
+    def get_fields(self, request, obj=None):
+        fields = super().get_fields(request, obj)
+        # Arguments of credential emails stay out of the admin
+        if obj is not None and is_sensitive(obj.name):
+            fields = [field for field in fields if field != 'kwargs']
+        return fields
+    
+    @admin.action(description='Queue selected jobs again')
+    def retry_jobs(self, request, queryset):
+        from django.utils import timezone
+        from django.db.models import F
+        
+        queryset = queryset.exclude(status='running')
+        # Finished sensitive jobs had their arguments wiped; they can't run again
+        wiped = [
+            job.pk for job in queryset.filter(status__in=['succeeded', 'failed']).only('pk', 'name')
+            if is_sensitive(job.name)
+        ]
+        updated = queryset.exclude(pk__in=wiped).update(
+            status='queued', run_after=timezone.now(), finished_at=None,
+            max_attempts=F('attempts') + 1
+        )
+        message = f'{updated} jobs queued again'
+        if wiped:
+            message += f' ({len(wiped)} finished jobs with wiped arguments skipped)'
+        self.message_user(request, message)
@@ -0,0 +1,201 @@
+# apps/core/db_pool/__init__.py - In-process PostgreSQL connection pool
+"""
+ENGINE = 'apps.core.db_pool' (PostgreSQL only)
+
+Django keeps one connection per thread. With CONN_MAX_AGE > 0 and
+CONN_HEALTH_CHECKS (the default set up by the settings files) a sync worker
+reuses its connection across requests, which is all a process-per-worker
+server needs. Threaded and ASGI workers run requests on many short-lived
+threads, each of which would open (and TLS-handshake) its own connection;
+this backend hands those threads connections from one pool per process
+instead:
+
+- ``connect()`` takes an idle connection (newest first) or opens a new one
+  while the pool is below DB_POOL_MAX_SIZE; otherwise it waits up to
+  DB_POOL_TIMEOUT seconds
+- a connection idle longer than DB_POOL_CHECK_IDLE is pinged before reuse,
+  and one older than DB_POOL_MAX_LIFETIME is replaced
+- ``close()`` (end of request with CONN_MAX_AGE = 0) rolls back anything
+  left open and returns the connection to the pool; broken ones are dropped
+
+``stats()`` reports every pool of the process (also at /api/core/db-pool/).
+"""
+from django.conf import settings
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_SIZE = 10
+DEFAULT_TIMEOUT = 30
+DEFAULT_MAX_LIFETIME = 60 * 60
+DEFAULT_CHECK_IDLE = 30
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+class ConnectionPool:
+    """Thread-safe pool of DB-API connections made by ``connect``"""
+
+    def __init__(self, alias, connect, max_size=None, timeout=None, max_lifetime=None, check_idle=None):
+        self.alias = alias
+        self.connect = connect
+        self.max_size = max_size or _setting('DB_POOL_MAX_SIZE', DEFAULT_MAX_SIZE)
+        self.timeout = timeout if timeout is not None else _setting('DB_POOL_TIMEOUT', DEFAULT_TIMEOUT)
+        self.max_lifetime = max_lifetime or _setting('DB_POOL_MAX_LIFETIME', DEFAULT_MAX_LIFETIME)
+        self.check_idle = check_idle if check_idle is not None else _setting('DB_POOL_CHECK_IDLE', DEFAULT_CHECK_IDLE)
+        self.pid = os.getpid()
+
+        self.condition = threading.Condition()
+        # (connection, created_at, returned_at), most recently returned last
+        self.idle = []
+        self.created_at = {}
+        self.in_use = 0
+
+        self.counters = {
+            'connections_opened': 0,
+            'connections_closed': 0,
+            'checkouts': 0,
+            'reused': 0,
+            'waits': 0,
+            'timeouts': 0,
+            'failed_health_checks': 0,
+        }
+
+    @property
+    def size(self):
+        return len(self.idle) + self.in_use
+
+    def _healthy(self, connection, returned_at):
+        if connection.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_idle:
+            return True
+        try:
+            with connection.cursor() as cursor:
+                cursor.execute('SELECT 1')
+            connection.rollback()
+            return True
+        except Exception:
+            self.counters['failed_health_checks'] += 1
+            return False
+
+    def _discard(self, connection):
+        self.created_at.pop(id(connection), None)
+        self.counters['connections_closed'] += 1
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def getconn(self):
+        deadline = time.monotonic() + self.timeout
+        with self.condition:
+            self.counters['checkouts'] += 1
+            while True:
+                while self.idle:
+                    connection, created_at, returned_at = self.idle.pop()
+                    expired = time.monotonic() - created_at > self.max_lifetime
+                    if not expired and self._healthy(connection, returned_at):
+                        self.in_use += 1
+                        self.counters['reused'] += 1
+                        return connection
+                    self._discard(connection)
+
+                if self.size < self.max_size:
+                    # Reserve the slot, connect outside the lock
+                    self.in_use += 1
+                    break
+
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self.counters['timeouts'] += 1
+                    raise PoolTimeout(
+                        f"No connection to '{self.alias}' available within {self.timeout}s "
+                        f"({self.max_size} in use)"
+                    )
+                self.counters['waits'] += 1
+                self.condition.wait(remaining)
+
+        try:
+            connection = self.connect()
+        except Exception:
+            with self.condition:
+                self.in_use -= 1
+                self.condition.notify()
+            raise
+
+        with self.condition:
+            self.created_at[id(connection)] = time.monotonic()
+            self.counters['connections_opened'] += 1
+        return connection
+
+    def putconn(self, connection, discard=False):
+        """Give a connection back; anything left in a transaction is rolled back"""
+        if not discard and not connection.closed:
+            try:
+                connection.rollback()
+            except Exception:
+                discard = True
+
+        with self.condition:
+            self.in_use -= 1
+            created_at = self.created_at.get(id(connection), time.monotonic())
+            if discard or connection.closed or os.getpid() != self.pid:
+                self._discard(connection)
+            else:
+                self.idle.append((connection, created_at, time.monotonic()))
+            self.condition.notify()
+
+    def close_all(self):
+        with self.condition:
+            for connection, _, _ in self.idle:
+                self._discard(connection)
+            self.idle = []
+
+    def stats(self):
+        with self.condition:
+            return {
+                'alias': self.alias,
+                'size': self.size,
+                'idle': len(self.idle),
+                'in_use': self.in_use,
+                'max_size': self.max_size,
+                **self.counters,
+            }
+
+
+def get_pool(alias, connect):
+    """The pool for ``alias`` in this process, created on first use"""
+    pid = os.getpid()
+    with _pools_lock:
+        pool = _pools.get(alias)
+        if pool is None or pool.pid != pid:
+            # A forked worker must not share its parent's sockets
+            pool = _pools[alias] = ConnectionPool(alias, connect)
+        return pool
+
+
+def close_pool(alias):
+    """Close the idle connections of ``alias`` and forget its pool"""
+    with _pools_lock:
+        pool = _pools.pop(alias, None)
+    if pool is not None:
+        pool.close_all()
+
+
+def stats():
+    with _pools_lock:
+        pools = [pool for pool in _pools.values() if pool.pid == os.getpid()]
+    return [pool.stats() for pool in pools]
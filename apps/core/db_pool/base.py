@@ -0,0 +1,30 @@
+# apps/core/db_pool/base.py - PostgreSQL backend drawing connections from a pool
+from django.db.backends.postgresql import base
+from django.db.backends.postgresql.psycopg_any import IsolationLevel
+from . import get_pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    """
+    The stock PostgreSQL backend, except that connections come from and go
+    back to the process-wide pool (see apps.core.db_pool).
+    """
+
+    pool = None
+
+    def get_new_connection(self, conn_params):
+        parent = super()
+        self.pool = get_pool(self.alias, lambda: parent.get_new_connection(conn_params))
+        connection = self.pool.getconn()
+        # A reused connection skipped the parent's setup of these
+        self.isolation_level = IsolationLevel(
+            self.settings_dict['OPTIONS'].get('isolation_level', IsolationLevel.READ_COMMITTED)
+        )
+        return connection
+
+    def _close(self):
+        if self.connection is not None:
+            # Errors other than data / integrity ones may have broken the socket
+            discard = self.errors_occurred and not self.is_usable()
+            with self.wrap_database_errors:
+                self.pool.putconn(self.connection, discard=discard)
@@ -0,0 +1,190 @@
+# apps/core/db_routing.py - Send analytic reads to a read replica
+"""
+Long aggregate scans (dashboards, analytics, stats, exports) read from a
+replica instead of the primary that takes form submissions.
+
+    @replica_reads          on a view function, an APIView handler or a
+                            viewset action: its reads go to the replica
+    ReplicaRouter           DATABASE_ROUTERS entry doing the routing
+    ReadYourWritesMiddleware
+                            after a user's write request, their reads stay on
+                            the primary for REPLICA_READ_YOUR_WRITES_SECONDS
+                            so they see what they just saved despite
+                            replication lag. The pin is a short-lived signed
+                            cookie, so any worker can check it without a
+                            cache or database lookup; clients that drop
+                            cookies just read from the replica
+
+Only annotated views are routed, everything else (writes included) uses
+``default``. Without a DATABASE_REPLICA_ALIAS database configured this
+module does nothing, so development without a replica behaves as before.
+
+Locally, point the replica alias at the same database (two SQLite aliases
+on one file, or two Postgres aliases on one database) to exercise the
+routing; the replica alias is never migrated.
+"""
+from django.conf import settings
+from django.db import connections
+from django.http import HttpRequest, StreamingHttpResponse
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from contextvars import ContextVar
+from functools import wraps
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPLICA_ALIAS = 'replica'
+DEFAULT_READ_YOUR_WRITES_SECONDS = 10
+
+PIN_COOKIE = 'primary_pin'
+PIN_SALT = 'apps.core.db_routing.pin'
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+# Alias reads are sent to while an annotated view runs
+_read_alias = ContextVar('replica_read_alias', default=None)
+
+
+def replica_alias():
+    """The replica alias, or None when no replica is configured"""
+    alias = getattr(settings, 'DATABASE_REPLICA_ALIAS', DEFAULT_REPLICA_ALIAS)
+    return alias if alias in connections.databases else None
+
+
+def _window():
+    return getattr(settings, 'REPLICA_READ_YOUR_WRITES_SECONDS', DEFAULT_READ_YOUR_WRITES_SECONDS)
+
+
+def pin_to_primary(response, user_id):
+    """
+    Keep this user's reads on the primary for the read-your-writes window.
+
+    Sets a signed cookie naming the user; it expires with the window.
+    """
+    if _window() > 0:
+        response.set_signed_cookie(
+            PIN_COOKIE, str(user_id), salt=PIN_SALT, max_age=_window(),
+            secure=settings.SESSION_COOKIE_SECURE, httponly=True, samesite='Lax'
+        )
+
+
+def pinned_to_primary(request, user_id):
+    if not user_id:
+        return False
+    # Signed with a timestamp, so a replayed old cookie doesn't pin either
+    value = request.get_signed_cookie(PIN_COOKIE, default=None, salt=PIN_SALT, max_age=_window())
+    return value == str(user_id)
+
+
+def _request_from(args):
+    # view(request, ...) or handler(self, request, ...)
+    for arg in args[:2]:
+        if isinstance(arg, HttpRequest) or hasattr(arg, '_request'):
+            return arg
+    return None
+
+
+def read_alias_for(request):
+    alias = replica_alias()
+    if alias is None or request is None:
+        return None
+    user = getattr(request, 'user', None)
+    if user is not None and user.is_authenticated and pinned_to_primary(request, user.pk):
+        return None
+    return alias
+
+
+def _reading_from(alias, iterator):
+    """Keep streamed response bodies on the same database as their view"""
+    previous = _read_alias.get()
+    _read_alias.set(alias)
+    try:
+        yield from iterator
+    finally:
+        # Not reset(): the body may be consumed in another context
+        _read_alias.set(previous)
+
+
+def replica_reads(view):
+    """Route the reads of a view (or view method) to the replica"""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        alias = read_alias_for(_request_from(args))
+        if alias is None:
+            return view(*args, **kwargs)
+
+        token = _read_alias.set(alias)
+        try:
+            response = view(*args, **kwargs)
+        finally:
+            _read_alias.reset(token)
+
+        # Streaming bodies are produced after the view returns
+        if isinstance(response, StreamingHttpResponse):
+            response.streaming_content = _reading_from(alias, response.streaming_content)
+        return response
+
+    return wrapper
+
+
+class ReplicaRouter:
+    """Reads inside @replica_reads go to the replica; all else to default"""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        # Objects read from the replica are saved to the primary
+        instance = hints.get('instance')
+        if instance is not None and instance._state.db == replica_alias():
+            return 'default'
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Same data on both aliases
+        aliases = {'default', replica_alias()}
+        if obj1._state.db in aliases and obj2._state.db in aliases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db == replica_alias():
+            return False
+        return None
+
+
+class ReadYourWritesMiddleware:
+    """Pin users to the primary for a moment after any write request"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+
+        response = self.get_response(request)
+        if self.wrote(request, response):
+            self.pin(request, response)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        if self.wrote(request, response):
+            # Resolving request.user may query the database
+            await sync_to_async(self.pin)(request, response)
+        return response
+
+    def wrote(self, request, response):
+        return request.method not in SAFE_METHODS and response.status_code < 400 and replica_alias()
+
+    def pin(self, request, response):
+        # DRF copies the user it authenticated onto the Django request
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated:
+            pin_to_primary(response, user.pk)
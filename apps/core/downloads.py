@@ -0,0 +1,82 @@
+# apps/core/downloads.py - File downloads with HTTP Range support
+"""
+Serve a stored file with ``Accept-Ranges: bytes`` so interrupted downloads
+can resume. A single ``Range: bytes=start-end`` (or suffix ``bytes=-N``)
+gets a 206 with just that slice; anything unsatisfiable gets a 416.
+Multi-range requests are answered with the whole file.
+"""
+from django.http import HttpResponse, StreamingHttpResponse
+import re
+
+DOWNLOAD_BLOCK_SIZE = 64 * 1024
+
+RANGE_RE = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def parse_range(header, size):
+    """
+    Return ``(start, end)`` (inclusive) for a single byte range header.
+
+    None means serve the whole file; ``(None, None)`` means unsatisfiable.
+    """
+    if not header:
+        return None
+    match = RANGE_RE.match(header.strip())
+    if not match:
+        return None
+
+    first, last = match.groups()
+    if not first and not last:
+        return None
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0:
+            return None, None
+        return max(size - length, 0), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        return None, None
+    return start, min(end, size - 1)
+
+
+def _read_slice(fileobj, start, length):
+    try:
+        fileobj.seek(start)
+        remaining = length
+        while remaining > 0:
+            block = fileobj.read(min(DOWNLOAD_BLOCK_SIZE, remaining))
+            if not block:
+                break
+            remaining -= len(block)
+            yield block
+    finally:
+        fileobj.close()
+
+
+def ranged_file_response(request, fileobj, size, content_type, filename):
+    """Stream ``fileobj`` (``size`` bytes) honouring the request's Range header"""
+    byte_range = parse_range(request.META.get('HTTP_RANGE'), size)
+
+    if byte_range == (None, None):
+        fileobj.close()
+        response = HttpResponse(status=416)
+        response['Content-Range'] = f'bytes */{size}'
+        return response
+
+    start, end = byte_range or (0, size - 1)
+    length = end - start + 1 if size else 0
+
+    response = StreamingHttpResponse(
+        _read_slice(fileobj, start, length),
+        content_type=content_type,
+        status=206 if byte_range else 200
+    )
+    response['Content-Length'] = str(length)
+    response['Accept-Ranges'] = 'bytes'
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    if byte_range:
+        response['Content-Range'] = f'bytes {start}-{end}/{size}'
+    return response
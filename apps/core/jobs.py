@@ -0,0 +1,260 @@
+# apps/core/jobs.py - Database-backed background job queue
+"""
+Post-request work (emails, stats recounts, exports) without a broker.
+
+    @task                    register a function as runnable by the worker
+    enqueue()                add a Job row; it commits with the caller's
+                             transaction, so work is never queued for data
+                             that was rolled back
+    claim_next()             used by ``manage.py runworker``
+    run()                    call the task, then mark it succeeded or schedule
+                             a retry with exponential backoff
+
+Workers pick the highest priority job whose run_after has passed. On
+PostgreSQL (and MySQL 8) that is ``SELECT ... FOR UPDATE SKIP LOCKED`` so
+any number of workers never wait on or double-claim a row. SQLite has no row
+locks; there a conditional ``UPDATE ... WHERE status = 'queued'`` decides
+which worker gets a job (SQLite serializes writers, so exactly one wins).
+
+Claiming a job counts an attempt. Jobs left running by a worker that died
+are queued again once their lock is older than JOB_QUEUE_LOCK_TIMEOUT.
+
+Task arguments must be JSON serializable. Tasks registered with
+``sensitive=True`` (emails carrying credentials) have their arguments
+wiped as soon as they finish, are shown without them in the admin and can't
+be queued again once wiped. Prefer queueing ids and making secrets inside the
+task, as ``apps.affiliates.onboarding.issue_credentials`` does.
+"""
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from datetime import timedelta
+import logging
+import os
+import random
+import socket
+import traceback
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ATTEMPTS = 5
+DEFAULT_BACKOFF_SECONDS = 30
+DEFAULT_MAX_BACKOFF_SECONDS = 60 * 60
+DEFAULT_LOCK_TIMEOUT = 30 * 60
+DEFAULT_RETENTION = 7 * 24 * 60 * 60
+
+# Claimed with SKIP LOCKED / tried with a conditional UPDATE per poll
+CLAIM_CANDIDATES = 10
+
+# Named priorities; any int works
+PRIORITY_LOW = -10
+PRIORITY_DEFAULT = 0
+PRIORITY_HIGH = 10
+
+_registry = {}
+
+
+def _job_model():
+    from .models import Job
+    return Job
+
+
+def task(func=None, *, sensitive=False, max_attempts=None):
+    """
+    Register a function the worker may run.
+
+    Usable bare (``@task``) or with options (``@task(sensitive=True)``).
+    """
+    def register(func):
+        name = f'{func.__module__}.{func.__qualname__}'
+        _registry[name] = {'func': func, 'sensitive': sensitive, 'max_attempts': max_attempts}
+        func.job_name = name
+        return func
+
+    return register(func) if func is not None else register
+
+
+def resolve(name):
+    """The registered task for ``name`` (importing its module if needed)"""
+    if name not in _registry:
+        try:
+            import_string(name)
+        except ImportError:
+            pass
+    if name not in _registry:
+        raise LookupError(f'{name} is not a registered task')
+    return _registry[name]
+
+
+def is_sensitive(name):
+    """Whether jobs called ``name`` carry secrets (unknown names don't)"""
+    try:
+        return resolve(name)['sensitive']
+    except LookupError:
+        return False
+
+
+def enqueue(func, priority=PRIORITY_DEFAULT, delay=None, max_attempts=None, **kwargs):
+    """
+    Queue ``func(**kwargs)`` for the worker and return the Job.
+
+    ``func`` is a @task function or its dotted name. ``delay`` (seconds or a
+    timedelta) holds the job back.
+    """
+    Job = _job_model()
+    name = getattr(func, 'job_name', func)
+    entry = resolve(name)
+
+    if isinstance(delay, (int, float)):
+        delay = timedelta(seconds=delay)
+    job = Job.objects.create(
+        name=name,
+        kwargs=kwargs,
+        priority=priority,
+        run_after=timezone.now() + (delay or timedelta()),
+        max_attempts=max_attempts or entry['max_attempts'] or getattr(
+            settings, 'JOB_QUEUE_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS
+        ),
+    )
+
+    # Development / tests without a worker: run right after commit
+    if getattr(settings, 'JOB_QUEUE_EAGER', False) and not delay:
+        transaction.on_commit(lambda: run_now(job.pk))
+    return job
+
+
+def worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+def _runnable(now):
+    return _job_model().objects.filter(status='queued', run_after__lte=now).order_by(
+        '-priority', 'run_after', 'pk'
+    )
+
+
+def _claim_update(worker, now):
+    return {
+        'status': 'running',
+        'locked_by': worker,
+        'locked_at': now,
+        'attempts': F('attempts') + 1,
+    }
+
+
+def claim_next(worker=None):
+    """Claim the next runnable job, or None when there is nothing to do"""
+    Job = _job_model()
+    worker = worker or worker_id()
+    now = timezone.now()
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job_id = _runnable(now).select_for_update(skip_locked=True).values_list('pk', flat=True).first()
+            if job_id is None:
+                return None
+            Job.objects.filter(pk=job_id).update(**_claim_update(worker, now))
+        return Job.objects.get(pk=job_id)
+
+    # No SKIP LOCKED (SQLite): the conditional UPDATE decides who gets a job
+    for job_id in _runnable(now).values_list('pk', flat=True)[:CLAIM_CANDIDATES]:
+        if Job.objects.filter(pk=job_id, status='queued').update(**_claim_update(worker, now)):
+            return Job.objects.get(pk=job_id)
+    return None
+
+
+def run_now(job_id, worker=None):
+    """Claim and run one specific job if it is still queued"""
+    Job = _job_model()
+    now = timezone.now()
+    if Job.objects.filter(pk=job_id, status='queued').update(**_claim_update(worker or worker_id(), now)):
+        return run(Job.objects.get(pk=job_id))
+    return None
+
+
+def backoff(attempts):
+    """Seconds before retry number ``attempts``: doubling, capped, jittered"""
+    base = getattr(settings, 'JOB_QUEUE_BACKOFF_SECONDS', DEFAULT_BACKOFF_SECONDS)
+    cap = getattr(settings, 'JOB_QUEUE_MAX_BACKOFF_SECONDS', DEFAULT_MAX_BACKOFF_SECONDS)
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    return delay * random.uniform(0.75, 1.25)
+
+
+def run(job):
+    """Run a claimed job; returns it with its new status"""
+    Job = _job_model()
+    attempts = job.attempts
+
+    try:
+        entry = resolve(job.name)
+    except LookupError as e:
+        Job.objects.filter(pk=job.pk).update(
+            status='failed', last_error=str(e), locked_by='', locked_at=None,
+            finished_at=timezone.now()
+        )
+        logger.error(f"Job {job.pk} failed: {e}")
+        job.refresh_from_db()
+        return job
+
+    wipe = {'kwargs': {}} if entry['sensitive'] else {}
+    try:
+        entry['func'](**job.kwargs)
+    except Exception as e:
+        error = ''.join(traceback.format_exception_only(type(e), e)).strip()
+        if attempts >= job.max_attempts:
+            Job.objects.filter(pk=job.pk).update(
+                status='failed', last_error=error,
+                locked_by='', locked_at=None, finished_at=timezone.now(), **wipe
+            )
+            logger.error(f"Job {job.pk} ({job.name}) failed after {attempts} attempts: {error}")
+        else:
+            delay = backoff(attempts)
+            Job.objects.filter(pk=job.pk).update(
+                status='queued', last_error=error,
+                locked_by='', locked_at=None,
+                run_after=timezone.now() + timedelta(seconds=delay)
+            )
+            logger.warning(f"Job {job.pk} ({job.name}) attempt {attempts} failed, retrying in {delay:.0f}s: {error}")
+    else:
+        Job.objects.filter(pk=job.pk).update(
+            status='succeeded', last_error='',
+            locked_by='', locked_at=None, finished_at=timezone.now(), **wipe
+        )
+
+    job.refresh_from_db()
+    return job
+
+
+def requeue_stale(now=None):
+    """
+    Recover jobs whose worker stopped while running them.
+
+    They are queued again, or failed if that was their last attempt (a job
+    that keeps killing its worker must not loop forever).
+    Returns ``(requeued, failed)``.
+    """
+    Job = _job_model()
+    now = now or timezone.now()
+    timeout = getattr(settings, 'JOB_QUEUE_LOCK_TIMEOUT', DEFAULT_LOCK_TIMEOUT)
+    stale = Job.objects.filter(status='running', locked_at__lt=now - timedelta(seconds=timeout))
+    error = 'Worker stopped while running the job'
+
+    failed = stale.filter(attempts__gte=F('max_attempts')).update(
+        status='failed', locked_by='', locked_at=None, finished_at=now, last_error=error
+    )
+    requeued = stale.update(
+        status='queued', locked_by='', locked_at=None, run_after=now, last_error=error
+    )
+    return requeued, failed
+
+
+def prune(now=None):
+    """Delete succeeded and failed jobs older than JOB_QUEUE_RETENTION"""
+    now = now or timezone.now()
+    retention = getattr(settings, 'JOB_QUEUE_RETENTION', DEFAULT_RETENTION)
+    deleted, _ = _job_model().objects.filter(
+        status__in=('succeeded', 'failed'), finished_at__lt=now - timedelta(seconds=retention)
+    ).delete()
+    return deleted
@@ -0,0 +1,126 @@
+# apps/core/management/commands/benchmark_db_connections.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.db.utils import load_backend
+from apps.core import db_pool
+import copy
+import statistics
+import threading
+import time
+
+class Command(BaseCommand):
+    help = 'Measure per-request database connection overhead: connect per request vs persistent vs pooled'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--database', default='default', help='Database alias to benchmark')
+        parser.add_argument('--requests', type=int, default=200, help='Requests per mode')
+        parser.add_argument('--threads', type=int, default=4, help='Concurrent request threads')
+        parser.add_argument(
+            '--thread-per-request',
+            action='store_true',
+            help='Run every request on a new thread, like threaded / ASGI servers can',
+        )
+
+    def modes(self, settings_dict):
+        engine = settings_dict['ENGINE']
+        modes = [
+            ('connect per request', dict(settings_dict, CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)),
+            ('persistent + health checks', dict(settings_dict, CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)),
+        ]
+        if engine in ('django.db.backends.postgresql', 'apps.core.db_pool'):
+            modes.append(('pooled', dict(settings_dict, ENGINE='apps.core.db_pool', CONN_MAX_AGE=0)))
+        else:
+            self.stdout.write(f"ℹ️  Pool needs PostgreSQL, skipping it for {engine}")
+        return modes
+
+    def run_mode(self, name, settings_dict, requests, threads, thread_per_request):
+        alias = f"benchmark_{name.split()[0]}"
+        backend = load_backend(settings_dict['ENGINE'])
+        lock = threading.Lock()
+        connects = [0]
+        timings = []
+
+        def new_wrapper():
+            wrapper = backend.DatabaseWrapper(copy.deepcopy(settings_dict), alias)
+            get_new_connection = wrapper.get_new_connection
+
+            def counted(conn_params):
+                with lock:
+                    connects[0] += 1
+                return get_new_connection(conn_params)
+
+            wrapper.get_new_connection = counted
+            return wrapper
+
+        def handle_request(wrapper):
+            started = time.perf_counter()
+            # What the request_started / request_finished signals do
+            wrapper.close_if_unusable_or_obsolete()
+            with wrapper.cursor() as cursor:
+                cursor.execute('SELECT 1')
+                cursor.fetchone()
+            wrapper.close_if_unusable_or_obsolete()
+            elapsed = time.perf_counter() - started
+            with lock:
+                timings.append(elapsed)
+
+        def worker(count):
+            wrapper = new_wrapper()
+            try:
+                for _ in range(count):
+                    handle_request(wrapper)
+            finally:
+                # A persistent connection lives as long as its thread
+                wrapper.close()
+
+        if thread_per_request:
+            for start in range(0, requests, threads):
+                batch = [threading.Thread(target=worker, args=(1,)) for _ in range(min(threads, requests - start))]
+                for thread in batch:
+                    thread.start()
+                for thread in batch:
+                    thread.join()
+        else:
+            share, extra = divmod(requests, threads)
+            batch = [threading.Thread(target=worker, args=(share + (i < extra),)) for i in range(threads)]
+            for thread in batch:
+                thread.start()
+            for thread in batch:
+                thread.join()
+
+        pool_stats = next((stats for stats in db_pool.stats() if stats['alias'] == alias), None)
+        db_pool.close_pool(alias)
+
+        timings.sort()
+        return {
+            'connects': connects[0],
+            'pooled_opens': pool_stats['connections_opened'] if pool_stats else None,
+            'mean_ms': statistics.mean(timings) * 1000,
+            'p95_ms': timings[int(len(timings) * 0.95) - 1] * 1000,
+        }
+
+    def handle(self, *args, **options):
+        alias = options['database']
+        if alias not in connections.databases:
+            raise CommandError(f"Unknown database '{alias}'")
+        requests, threads = options['requests'], max(1, options['threads'])
+
+        self.stdout.write(
+            f"📊 {requests} requests on {threads} threads against '{alias}'"
+            f"{' (new thread per request)' if options['thread_per_request'] else ''}\n"
+        )
+        modes = self.modes(connections.databases[alias])
+        self.stdout.write(f"{'mode':<30}{'connects':>10}{'physical':>10}{'mean ms':>10}{'p95 ms':>10}")
+
+        for name, settings_dict in modes:
+            result = self.run_mode(name, settings_dict, requests, threads, options['thread_per_request'])
+            physical = result['pooled_opens'] if result['pooled_opens'] is not None else result['connects']
+            self.stdout.write(
+                f"{name:<30}{result['connects']:>10}{physical:>10}"
+                f"{result['mean_ms']:>10.3f}{result['p95_ms']:>10.3f}"
+            )
+
+        self.stdout.write(
+            '\nconnects: connections Django asked for; physical: sockets actually opened '
+            '(the pool hands out reused ones)'
+        )
@@ -0,0 +1,106 @@
+# apps/core/management/commands/benchmark_sessions.py
+from django.conf import settings
+from django.contrib.sessions.middleware import SessionMiddleware
+from django.core.cache import caches
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.http import HttpResponse
+from django.test import RequestFactory
+from django.test.utils import CaptureQueriesContext, override_settings
+import time
+
+ENGINES = (
+    'django.contrib.sessions.backends.db',
+    'django.contrib.sessions.backends.cached_db',
+    'apps.core.sessions',
+)
+
+class Command(BaseCommand):
+    help = (
+        'Compare queries per request (SESSION_SAVE_EVERY_REQUEST on) across session backends: '
+        'django_session reads and writes, database cache queries, and all queries'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per backend')
+        parser.add_argument(
+            '--change-every',
+            type=int,
+            default=50,
+            help='Every Nth request changes the session data (0 = never)',
+        )
+
+    def cache_tables(self):
+        """Tables of the database caches: their queries count against the backend too"""
+        return [
+            options['LOCATION'].upper() for options in settings.CACHES.values()
+            if options['BACKEND'] == 'django.core.cache.backends.db.DatabaseCache'
+        ]
+
+    def run_engine(self, engine, requests, change_every):
+        state = {'count': 0}
+        cache_tables = self.cache_tables()
+
+        def view(request):
+            # What authentication does on every request
+            request.session.get('_auth_user_id')
+            state['count'] += 1
+            if change_every and state['count'] % change_every == 0:
+                request.session['last_seen_page'] = state['count']
+            return HttpResponse('ok')
+
+        with override_settings(SESSION_ENGINE=engine, SESSION_SAVE_EVERY_REQUEST=True):
+            middleware = SessionMiddleware(view)
+            factory = RequestFactory()
+
+            # Log in once, like a browser session would
+            request = factory.get('/')
+            middleware.process_request(request)
+            request.session['_auth_user_id'] = '1'
+            request.session.save()
+            session_key = request.session.session_key
+
+            reads = writes = cache_queries = total = 0
+            started = time.perf_counter()
+            for _ in range(requests):
+                request = factory.get('/')
+                request.COOKIES[settings.SESSION_COOKIE_NAME] = session_key
+                with CaptureQueriesContext(connection) as queries:
+                    middleware(request)
+                total += len(queries.captured_queries)
+                for query in queries.captured_queries:
+                    sql = query['sql'].lstrip().upper()
+                    if any(table in sql for table in cache_tables):
+                        cache_queries += 1
+                    elif 'DJANGO_SESSION' not in sql:
+                        continue
+                    elif sql.startswith('SELECT'):
+                        reads += 1
+                    else:
+                        writes += 1
+            elapsed = time.perf_counter() - started
+
+            middleware.SessionStore(session_key).delete()
+
+        return reads, writes, cache_queries, total, elapsed
+
+    def handle(self, *args, **options):
+        requests = options['requests']
+        change_every = options['change_every']
+        self.stdout.write(
+            f"📊 {requests} requests per backend, session data changes every "
+            f"{change_every or 'never'} requests\n"
+        )
+        self.stdout.write(
+            f"{'backend':<42}{'reads/req':>10}{'writes/req':>12}{'cache/req':>11}"
+            f"{'total/req':>11}{'ms/req':>9}"
+        )
+
+        for engine in ENGINES:
+            caches[settings.SESSION_CACHE_ALIAS].clear()
+            reads, writes, cache_queries, total, elapsed = self.run_engine(engine, requests, change_every)
+            self.stdout.write(
+                f"{engine:<42}{reads / requests:>10.3f}{writes / requests:>12.3f}"
+                f"{cache_queries / requests:>11.3f}{total / requests:>11.3f}"
+                f"{elapsed * 1000 / requests:>9.3f}"
+            )
@@ -0,0 +1,84 @@
+# apps/core/management/commands/runworker.py
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+from apps.core import jobs
+from apps.leads import webhooks
+import signal
+import time
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (emails, stats, exports) until stopped'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run every job that is due, then exit',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=1.0,
+            help='Seconds to wait between polls when there is nothing to do',
+        )
+        parser.add_argument(
+            '--max-jobs',
+            type=int,
+            default=0,
+            help='Exit after this many jobs (0 = no limit), e.g. to recycle memory',
+        )
+    
+    def stop(self, signum, frame):
+        self.stdout.write('🛑 Finishing the current job, then stopping...')
+        self.running = False
+    
+    def maintenance(self):
+        requeued, failed = jobs.requeue_stale()
+        pruned = jobs.prune()
+        if requeued or failed or pruned:
+            self.stdout.write(
+                f"🧹 Requeued {requeued} stale jobs, failed {failed}, pruned {pruned} finished jobs"
+            )
+        
+        # Webhook events whose flush job was lost (or never queued)
+        swept = webhooks.schedule_due()
+        if swept:
+            self.stdout.write(f"📨 Queued flushes for {swept} webhook subscriptions")
+    
+    def handle(self, *args, **options):
+        self.running = True
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        
+        worker = jobs.worker_id()
+        self.stdout.write(f'⚙️  Worker {worker} started...')
+        processed = 0
+        last_maintenance = 0
+        
+        while self.running:
+            if time.monotonic() - last_maintenance > 60:
+                self.maintenance()
+                last_maintenance = time.monotonic()
+            
+            # Long-lived process: drop connections the database has closed
+            close_old_connections()
+            job = jobs.claim_next(worker)
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            
+            job = jobs.run(job)
+            processed += 1
+            if job.status == 'succeeded':
+                self.stdout.write(f"✅ {job.name} #{job.pk}")
+            elif job.status == 'queued':
+                self.stdout.write(f"🔁 {job.name} #{job.pk} will retry: {job.last_error}")
+            else:
+                self.stdout.write(f"❌ {job.name} #{job.pk} failed: {job.last_error}")
+            
+            if options['max_jobs'] and processed >= options['max_jobs']:
+                break
+        
+        self.stdout.write(f'✅ Worker stopped ({processed} jobs run)')
@@ -31,3 +31,43 @@ class Analytics(models.Model):
         if self.views > 0:
             return (self.submissions / self.views) * 100
         return 0
+
+
+class Job(models.Model):
+    """Unit of post-request work run by ``manage.py runworker`` (apps.core.jobs)"""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('succeeded', 'Succeeded'),
+        ('failed', 'Failed'),
+    )
+    
+    # Dotted path of a function registered with @jobs.task
+    name = models.CharField(max_length=200)
+    kwargs = models.JSONField(default=dict, blank=True)
+    
+    # Higher runs first; run_after delays a job (retries, scheduled work)
+    priority = models.SmallIntegerField(default=0)
+    run_after = models.DateTimeField()
+    
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=5)
+    last_error = models.TextField(blank=True)
+    
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            # Claim order of the worker: status = 'queued' ORDER BY -priority, run_after
+            models.Index(fields=['status', '-priority', 'run_after']),
+            models.Index(fields=['status', 'finished_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.name} #{self.pk} ({self.status})"
@@ -0,0 +1,226 @@
+# apps/core/pagination.py - Estimated counts for large list endpoints
+"""
+Counting strategy for list endpoints.
+
+Small result sets get an exact COUNT(*), bounded so we never count more than
+EXACT_COUNT_THRESHOLD rows. Above the threshold we answer with an estimate:
+the planner row estimate on PostgreSQL, or the last exact count we cached for
+the same query elsewhere. Estimated responses carry ``count_is_estimate`` and
+an ``exact_count_url`` the client can call afterwards for the real number.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator, Page, PageNotAnInteger, EmptyPage
+from django.db import connections
+from django.urls import reverse
+from django.utils.functional import cached_property
+from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+import hashlib
+import json
+import logging
+import secrets
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXACT_COUNT_THRESHOLD = 10000
+EXACT_COUNT_CACHE_TIMEOUT = 300  # 5 minutes
+COUNT_TOKEN_TIMEOUT = 600  # 10 minutes
+
+
+def _threshold():
+    return getattr(settings, 'EXACT_COUNT_THRESHOLD', DEFAULT_EXACT_COUNT_THRESHOLD)
+
+
+def _count_cache_key(queryset):
+    sql, params = queryset.order_by().query.sql_with_params()
+    digest = hashlib.sha1(f'{queryset.db}:{sql}:{params!r}'.encode()).hexdigest()
+    return f'exact_count:{digest}'
+
+
+def _planner_estimate(queryset):
+    """Row estimate from EXPLAIN on PostgreSQL, None elsewhere"""
+    connection = connections[queryset.db]
+    if connection.vendor != 'postgresql':
+        return None
+
+    sql, params = queryset.order_by().values('pk').query.sql_with_params()
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}', params)
+        plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def exact_count(queryset):
+    """Exact COUNT(*), cached briefly so repeated requests for it are cheap"""
+    key = _count_cache_key(queryset)
+    count = cache.get(key)
+    if count is None:
+        count = queryset.count()
+        cache.set(key, count, EXACT_COUNT_CACHE_TIMEOUT)
+    return count
+
+
+def estimate_count(queryset, threshold=None):
+    """
+    Return ``(count, is_estimate)`` for a queryset.
+
+    Counts at or below the threshold are always exact.
+    """
+    threshold = _threshold() if threshold is None else threshold
+
+    # COUNT(*) over a LIMITed subquery: cost is bounded by the threshold
+    bounded = queryset.order_by()[:threshold + 1].count()
+    if bounded <= threshold:
+        return bounded, False
+
+    try:
+        estimate = _planner_estimate(queryset)
+    except Exception as e:
+        logger.warning(f"Planner count estimate failed: {e}")
+        estimate = None
+
+    if estimate is None:
+        # Fall back to the last exact count taken for this query, if any
+        estimate = cache.get(_count_cache_key(queryset))
+        if estimate is None:
+            return exact_count(queryset), False
+
+    # The bounded count proves there are more rows than the threshold
+    return max(estimate, threshold + 1), True
+
+
+def register_count_request(queryset, user):
+    """Remember a queryset so its exact count can be fetched later by token"""
+    token = secrets.token_urlsafe(16)
+    cache.set(f'count_request:{token}', {
+        'model': queryset.model._meta.label,
+        'db': queryset.db,
+        'query': queryset.order_by().query,
+        'user_id': user.pk,
+    }, COUNT_TOKEN_TIMEOUT)
+    return token
+
+
+def load_count_request(token, user):
+    """Rebuild the queryset saved by register_count_request (None if expired)"""
+    from django.apps import apps
+
+    saved = cache.get(f'count_request:{token}')
+    if not saved or saved['user_id'] != user.pk:
+        return None
+
+    queryset = apps.get_model(saved['model']).objects.using(saved['db']).all()
+    queryset.query = saved['query']
+    return queryset
+
+
+def count_metadata(queryset, request):
+    """
+    Count fields to merge into a list response.
+
+    ``?count=exact`` forces an exact count inline.
+    """
+    if request.query_params.get('count') == 'exact':
+        return {'count': exact_count(queryset), 'count_is_estimate': False}
+
+    count, is_estimate = estimate_count(queryset)
+    data = {'count': count, 'count_is_estimate': is_estimate}
+    if is_estimate:
+        token = register_count_request(queryset, request.user)
+        data['exact_count_url'] = request.build_absolute_uri(
+            reverse('exact_count', args=[token])
+        )
+    return data
+
+
+class EstimatedPage(Page):
+    """Page whose has_next() comes from fetching one extra row, not the count"""
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self._has_more = has_more
+
+    def has_next(self):
+        return self._has_more
+
+
+class ExactCountPaginator(Paginator):
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        return exact_count(self.object_list)
+
+
+class EstimatedCountPaginator(Paginator):
+    count_is_estimate = False
+
+    @cached_property
+    def count(self):
+        count, self.count_is_estimate = estimate_count(self.object_list)
+        return count
+
+    def validate_number(self, number):
+        if not (self.count and self.count_is_estimate):
+            return super().validate_number(number)
+
+        # Don't cap page numbers by an estimated page count
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger('That page number is not an integer')
+        if number < 1:
+            raise EmptyPage('That page number is less than 1')
+        return number
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.count_is_estimate:
+            return super().page(number)
+
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows and number > 1:
+            raise EmptyPage('That page contains no results')
+        return EstimatedPage(rows[:self.per_page], number, self, len(rows) > self.per_page)
+
+
+class EstimatedCountPagination(PageNumberPagination):
+    """
+    PageNumberPagination with bounded / estimated counts.
+
+    Adds ``count_is_estimate`` to every page and ``exact_count_url`` when
+    the count is an estimate. ``?count=exact`` forces an exact count.
+    """
+    django_paginator_class = EstimatedCountPaginator
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if request.query_params.get('count') == 'exact':
+            self.django_paginator_class = ExactCountPaginator
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        paginator = self.page.paginator
+
+        response = {
+            'count': paginator.count,
+            'count_is_estimate': paginator.count_is_estimate,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if paginator.count_is_estimate:
+            token = register_count_request(paginator.object_list, self.request.user)
+            response['exact_count_url'] = self.request.build_absolute_uri(
+                reverse('exact_count', args=[token])
+            )
+        return Response(response)
+
+    def get_paginated_response_schema(self, schema):
+        schema = super().get_paginated_response_schema(schema)
+        schema['properties']['count_is_estimate'] = {'type': 'boolean'}
+        schema['properties']['exact_count_url'] = {'type': 'string', 'format': 'uri', 'nullable': True}
+        return schema
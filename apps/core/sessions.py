@@ -0,0 +1,135 @@
+# apps/core/sessions.py - Write-on-change session backend
+"""
+SESSION_ENGINE = 'apps.core.sessions'
+
+A database session store that only writes when it has to. With
+SESSION_SAVE_EVERY_REQUEST the stock ``db`` backend UPDATEs django_session on
+every request, just to push the expiry date forward. Here:
+
+- sessions are read from the cache (SESSION_CACHE_ALIAS) and fall back to
+  the database on a miss
+- ``save()`` writes through to the database only when the session data
+  differs from what was loaded, or when the stored expiry date is more than
+  SESSION_EXPIRY_REFRESH_INTERVAL seconds behind the one the request would
+  set, so a busy session is refreshed at most once per interval
+- the database stays the source of truth: a cache flush or restart just
+  costs one SELECT per session
+
+Cache entries live at most SESSION_CACHE_TTL seconds. With a per-process
+cache that bounds how long another process may serve a session that was
+changed or logged out elsewhere. A shared cache avoids that, but only pays
+off when reading it is cheaper than the SELECT it saves: production.py uses
+Redis when it has one, and otherwise a per-process cache with a short TTL
+rather than the database cache (a django_cache query per request, plus a
+COUNT and cull per write).
+
+``manage.py benchmark_sessions`` compares queries per request with the
+``db`` and ``cached_db`` backends.
+"""
+from django.conf import settings
+from django.contrib.sessions.backends.db import SessionStore as DBStore
+from django.core.cache import caches
+from django.utils import timezone
+import hashlib
+import logging
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = 'apps.core.sessions'
+
+DEFAULT_EXPIRY_REFRESH_INTERVAL = 15 * 60
+DEFAULT_CACHE_TTL = 5 * 60
+
+
+class SessionStore(DBStore):
+    cache_key_prefix = KEY_PREFIX
+
+    def __init__(self, session_key=None):
+        self._cache = caches[settings.SESSION_CACHE_ALIAS]
+        # What the store holds for this session, as of load() / the last write
+        self._stored_digest = None
+        self._stored_expiry = None
+        super().__init__(session_key)
+
+    @property
+    def cache_key(self):
+        return self.cache_key_prefix + self._get_or_create_session_key()
+
+    def _digest(self, data):
+        return hashlib.sha256(self.serializer().dumps(data)).hexdigest()
+
+    def _cache_timeout(self, expire_date):
+        remaining = (expire_date - timezone.now()).total_seconds()
+        return max(1, min(int(remaining), getattr(settings, 'SESSION_CACHE_TTL', DEFAULT_CACHE_TTL)))
+
+    def _remember(self, data, expire_date):
+        self._stored_digest = self._digest(data)
+        self._stored_expiry = expire_date
+        try:
+            self._cache.set(
+                self.cache_key,
+                {'data': data, 'expire_date': expire_date},
+                self._cache_timeout(expire_date)
+            )
+        except Exception as e:
+            # The database copy is enough
+            logger.warning(f"Session cache write failed: {e}")
+
+    def load(self):
+        entry = None
+        if self.session_key:
+            try:
+                entry = self._cache.get(self.cache_key)
+            except Exception:
+                entry = None
+
+        if entry is not None and entry['expire_date'] > timezone.now():
+            self._stored_digest = self._digest(entry['data'])
+            self._stored_expiry = entry['expire_date']
+            return entry['data']
+
+        session = self._get_session_from_db()
+        if session is None:
+            self._session_key = None
+            self._stored_digest = self._stored_expiry = None
+            return {}
+        data = self.decode(session.session_data)
+        self._remember(data, session.expire_date)
+        return data
+
+    def exists(self, session_key):
+        return (
+            bool(session_key) and self.cache_key_prefix + session_key in self._cache
+        ) or super().exists(session_key)
+
+    def _needs_write(self):
+        if self._stored_digest is None or self._stored_expiry is None:
+            return True
+        if self._digest(self._session) != self._stored_digest:
+            return True
+        interval = getattr(settings, 'SESSION_EXPIRY_REFRESH_INTERVAL', DEFAULT_EXPIRY_REFRESH_INTERVAL)
+        return (self.get_expiry_date() - self._stored_expiry).total_seconds() >= interval
+
+    def save(self, must_create=False):
+        if self.session_key is None:
+            return self.create()
+        if not must_create and not self._needs_write():
+            return
+
+        super().save(must_create=must_create)
+        data = self._get_session(no_load=must_create)
+        self._remember(data, self.get_expiry_date())
+
+    def delete(self, session_key=None):
+        super().delete(session_key)
+        if session_key is None:
+            if self.session_key is None:
+                return
+            session_key = self.session_key
+        self._cache.delete(self.cache_key_prefix + session_key)
+
+    def flush(self):
+        self.clear()
+        self.delete(self.session_key)
+        self._session_key = None
+        self._stored_digest = self._stored_expiry = None
@@ -0,0 +1,20 @@
+# apps/core/tasks.py - Background tasks shared by every app
+from django.conf import settings
+from django.core.mail import send_mail
+from .jobs import task
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@task(sensitive=True)
+def send_email(subject, message, recipient_list, from_email=None):
+    """Send one email; raising lets the queue retry it with backoff"""
+    send_mail(
+        subject,
+        message,
+        from_email or settings.DEFAULT_FROM_EMAIL,
+        recipient_list,
+        fail_silently=False,
+    )
+    logger.info(f"Email '{subject}' sent to {', '.join(recipient_list)}")
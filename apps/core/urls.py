@@ -6,4 +6,6 @@ urlpatterns = [
     path('dashboard/', views.DashboardView.as_view(), name='dashboard'),
     path('analytics/', views.AnalyticsView.as_view(), name='analytics'),
     path('settings/', views.SettingsView.as_view(), name='settings'),
+    path('counts/<str:token>/', views.ExactCountView.as_view(), name='exact_count'),
+    path('db-pool/', views.DatabaseConnectionsView.as_view(), name='db_pool_stats'),
 ]
@@ -8,6 +8,10 @@ from apps.forms.models import Form
 from apps.leads.models import Lead
 from apps.affiliates.models import Affiliate
 from django.db.models import Count
+from .pagination import exact_count, load_count_request
+from .db_routing import replica_reads
+from . import db_pool
+from django.db import connections
 import logging
 
 logger = logging.getLogger(__name__)
@@ -15,6 +19,7 @@ logger = logging.getLogger(__name__)
 class DashboardView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @replica_reads
     def get(self, request):
         try:
             user = request.user
@@ -142,6 +147,7 @@ class DashboardView(APIView):
 class AnalyticsView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @replica_reads
     def get(self, request):
         try:
             # Get date range from query params
@@ -225,3 +231,41 @@ class SettingsView(APIView):
         # Update settings (implement based on your requirements)
         # You might want to create a Settings model to store these
         return Response({'message': 'Settings updated successfully'})
+
+class ExactCountView(APIView):
+    """Exact count for a list response that returned an estimated count"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, token):
+        queryset = load_count_request(token, request.user)
+        if queryset is None:
+            return Response({'error': 'Count request expired or not found'}, status=404)
+        
+        try:
+            return Response({
+                'count': exact_count(queryset),
+                'count_is_estimate': False
+            })
+        except Exception as e:
+            logger.error(f"Exact count error: {e}")
+            return Response({'error': str(e)}, status=500)
+
+class DatabaseConnectionsView(APIView):
+    """Connection settings of every database and this process's pool statistics (admin only)"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        if request.user.user_type != 'admin':
+            return Response({'error': 'Admin access required'}, status=403)
+        
+        databases = []
+        for alias in connections:
+            settings_dict = connections.databases[alias]
+            databases.append({
+                'alias': alias,
+                'engine': settings_dict['ENGINE'],
+                'conn_max_age': settings_dict.get('CONN_MAX_AGE', 0),
+                'conn_health_checks': settings_dict.get('CONN_HEALTH_CHECKS', False),
+                'pooled': settings_dict['ENGINE'] == 'apps.core.db_pool',
+            })
+        return Response({'databases': databases, 'pools': db_pool.stats()})
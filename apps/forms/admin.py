@@ -1,6 +1,7 @@
 # apps/forms/admin.py
 from django.contrib import admin
 from .models import Form, FormField
+from .field_sync import bump_revision
 
 class FormFieldInline(admin.TabularInline):
     model = FormField
@@ -12,10 +13,23 @@ class FormAdmin(admin.ModelAdmin):
     list_filter = ('form_type', 'is_active', 'created_at')
     search_fields = ('name', 'description')
     inlines = [FormFieldInline]
-    readonly_fields = ('id', 'embed_code', 'created_at', 'updated_at')
+    readonly_fields = ('id', 'embed_code', 'revision', 'created_at', 'updated_at')
+    
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        if change:
+            bump_revision(form.instance.pk)
 
 @admin.register(FormField)
 class FormFieldAdmin(admin.ModelAdmin):
     list_display = ('form', 'label', 'field_type', 'is_required', 'order')
     list_filter = ('field_type', 'is_required')
     ordering = ('form', 'order')
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_revision(obj.form_id)
+    
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_revision(obj.form_id)
@@ -0,0 +1,163 @@
+# apps/forms/field_sync.py - Diff-based FormField updates
+"""
+Bring a form's FormField rows in line with an incoming field list.
+
+Incoming fields are matched to existing rows by ``id`` first and then by
+their stable key (``FormField.data_key``, the name answers are stored under
+in Lead.form_data), so renaming nothing keeps the same rows. Then:
+
+- changed rows: one bulk_update, of the attributes the payload carries
+  (an omitted key leaves the column as it is)
+- new fields: one bulk_create, with FIELD_DEFAULTS for omitted keys
+- fields no longer present: one DELETE
+
+When anything changed, Form.revision is bumped with a single UPDATE so
+caches and ETags keyed on it move on. bulk_create and bulk_update skip model
+signals, so the projection cache is invalidated here rather than by the
+FormField receivers. The queryset delete does send pre_delete / post_delete
+for every removed row, so those receivers still run for deletions.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from .models import Form, FormField
+import logging
+
+logger = logging.getLogger(__name__)
+
+FIELD_DEFAULTS = {
+    'field_type': 'text',
+    'label': '',
+    'placeholder': '',
+    'is_required': False,
+    'options': [],
+    'order': 0,
+    'projection_type': '',
+}
+
+DEFAULT_FIELDS = [
+    {
+        'field_type': 'text',
+        'label': 'Full Name',
+        'placeholder': 'Enter your full name',
+        'is_required': True,
+        'order': 1
+    },
+    {
+        'field_type': 'email',
+        'label': 'Email Address',
+        'placeholder': 'Enter your email address',
+        'is_required': True,
+        'order': 2
+    }
+]
+
+
+def _values(field_data):
+    """The FormField attributes present in ``field_data``"""
+    return {name: field_data[name] for name in FIELD_DEFAULTS if name in field_data}
+
+
+def _stable_key(values):
+    return FormField(**{**FIELD_DEFAULTS, **values}).data_key
+
+
+def _match(incoming, existing):
+    """Pair incoming values with existing rows: ``[(values, row or None)]``"""
+    by_id = {str(field.id): field for field in existing}
+    claimed = set()
+
+    pairs = []
+    for field_data in incoming:
+        field = by_id.get(str(field_data.get('id')))
+        if field is not None and field.id not in claimed:
+            claimed.add(field.id)
+            pairs.append((_values(field_data), field))
+        else:
+            pairs.append((_values(field_data), None))
+
+    # Whatever wasn't matched by id falls back to the stable key
+    by_key = {}
+    for field in existing:
+        if field.id not in claimed:
+            by_key.setdefault(field.data_key, []).append(field)
+
+    matched = []
+    for values, field in pairs:
+        if field is None:
+            candidates = by_key.get(_stable_key(values))
+            if candidates:
+                field = candidates.pop(0)
+                claimed.add(field.id)
+        matched.append((values, field))
+
+    removed = [field for field in existing if field.id not in claimed]
+    return matched, removed
+
+
+def bump_revision(form_id):
+    """Move Form.revision on by one (and touch updated_at)"""
+    Form.objects.filter(pk=form_id).update(
+        revision=F('revision') + 1, updated_at=timezone.now()
+    )
+
+
+def sync_fields(form, fields_data):
+    """
+    Make ``fields_data`` the form's fields.
+
+    Returns ``{'created': n, 'updated': n, 'deleted': n, 'unchanged': n,
+    'revision': n}``.
+    """
+    from apps.leads import projection
+
+    with transaction.atomic():
+        existing = list(FormField.objects.select_for_update().filter(form=form))
+        matched, removed = _match(fields_data, existing)
+
+        to_create, to_update, changed_columns = [], [], set()
+        for values, field in matched:
+            if field is None:
+                to_create.append(FormField(form=form, **{**FIELD_DEFAULTS, **values}))
+                continue
+            changed = [name for name, value in values.items() if getattr(field, name) != value]
+            if changed:
+                for name in changed:
+                    setattr(field, name, values[name])
+                changed_columns.update(changed)
+                to_update.append(field)
+
+        if removed:
+            FormField.objects.filter(pk__in=[field.pk for field in removed]).delete()
+        if to_update:
+            FormField.objects.bulk_update(to_update, sorted(changed_columns), batch_size=500)
+        if to_create:
+            FormField.objects.bulk_create(to_create, batch_size=500)
+
+        changed = bool(removed or to_update or to_create)
+        if changed:
+            bump_revision(form.pk)
+            transaction.on_commit(lambda: projection.invalidate_form(form.pk))
+
+    form.revision = Form.objects.filter(pk=form.pk).values_list('revision', flat=True).get()
+    if changed:
+        logger.info(
+            f"Synced fields for form {form.pk}: {len(to_create)} created, "
+            f"{len(to_update)} updated, {len(removed)} deleted (revision {form.revision})"
+        )
+
+    return {
+        'created': len(to_create),
+        'updated': len(to_update),
+        'deleted': len(removed),
+        'unchanged': len(matched) - len(to_create) - len(to_update),
+        'revision': form.revision,
+    }
+
+
+def copy_fields(source, target):
+    """Copy every field of ``source`` onto ``target`` with one bulk_create"""
+    FormField.objects.bulk_create([
+        FormField(form=target, **{name: getattr(field, name) for name in FIELD_DEFAULTS})
+        for field in source.fields.all()
+    ], batch_size=500)
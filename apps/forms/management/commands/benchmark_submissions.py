@@ -0,0 +1,175 @@
+# apps/forms/management/commands/benchmark_submissions.py
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from django.urls import path
+from apps.forms.models import Form
+from apps.forms.views import AsyncFormSubmissionView, FormSubmissionView
+from apps.leads.models import Lead
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import io
+import json
+import time
+
+# Both submission views side by side, whatever ASYNC_PUBLIC_VIEWS says
+urlpatterns = [
+    path('wsgi/<uuid:form_id>/submit/', FormSubmissionView.as_view()),
+    path('asgi/<uuid:form_id>/submit/', AsyncFormSubmissionView.as_view()),
+]
+
+class SlowInput(io.BytesIO):
+    """A request body that takes ``delay`` seconds to arrive, like a slow client's"""
+
+    def __init__(self, body, delay):
+        super().__init__(body)
+        self.delay = delay
+
+    def read(self, *args):
+        if self.delay:
+            time.sleep(self.delay)
+            self.delay = 0
+        return super().read(*args)
+
+class Command(BaseCommand):
+    help = 'Compare concurrent form submission throughput: sync workers (WSGI) vs the async view (ASGI)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--form', help='Form id to submit to (default: the newest active form)')
+        parser.add_argument('--requests', type=int, default=200, help='Submissions per path')
+        parser.add_argument('--workers', type=int, default=2, help='Sync workers, like WEB_CONCURRENCY')
+        parser.add_argument('--concurrency', type=int, default=50, help='Clients in flight at once')
+        parser.add_argument(
+            '--client-delay-ms',
+            type=int,
+            default=100,
+            help='Time each client takes to send its request body',
+        )
+
+    def body(self, index):
+        return json.dumps({
+            'form_data': {'email': f'benchmark-{index}@example.com', 'name': 'Benchmark'},
+            'utm_params': {'utm_source': 'benchmark'},
+        }).encode()
+
+    def run_wsgi(self, form_id, requests, workers, delay):
+        handler = WSGIHandler()
+        statuses = []
+
+        def submit(index):
+            body = self.body(index)
+            environ = {
+                'REQUEST_METHOD': 'POST',
+                'PATH_INFO': f'/wsgi/{form_id}/submit/',
+                'QUERY_STRING': '',
+                'CONTENT_TYPE': 'application/json',
+                'CONTENT_LENGTH': str(len(body)),
+                'SERVER_NAME': 'testserver',
+                'SERVER_PORT': '80',
+                'SERVER_PROTOCOL': 'HTTP/1.1',
+                'REMOTE_ADDR': '127.0.0.1',
+                'wsgi.input': SlowInput(body, delay),
+                'wsgi.url_scheme': 'http',
+                'wsgi.errors': io.StringIO(),
+            }
+            response = handler(environ, lambda status, headers, exc_info=None: statuses.append(int(status[:3])))
+            content = b''.join(response)
+            response.close()
+            return content
+
+        # Each sync worker serves one request at a time, slow upload included
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return statuses, list(pool.map(submit, range(requests)))
+
+    async def run_asgi(self, form_id, requests, concurrency, delay):
+        handler = ASGIHandler()
+        slots = asyncio.Semaphore(concurrency)
+        statuses = []
+
+        async def submit(index):
+            body = self.body(index)
+            scope = {
+                'type': 'http',
+                'asgi': {'version': '3.0'},
+                'http_version': '1.1',
+                'method': 'POST',
+                'scheme': 'http',
+                'path': f'/asgi/{form_id}/submit/',
+                'root_path': '',
+                'query_string': b'',
+                'headers': [
+                    (b'host', b'testserver'),
+                    (b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode()),
+                ],
+                'client': ('127.0.0.1', 0),
+                'server': ('testserver', 80),
+            }
+            sent = {'delay': delay}
+            chunks = []
+
+            async def receive():
+                if sent['delay'] is None:
+                    # Nothing more is coming; just wait to be cancelled
+                    await asyncio.sleep(3600)
+                    return {'type': 'http.disconnect'}
+                # The server awaits the upload without tying anything up
+                await asyncio.sleep(sent['delay'])
+                sent['delay'] = None
+                return {'type': 'http.request', 'body': body, 'more_body': False}
+
+            async def send(message):
+                if message['type'] == 'http.response.start':
+                    statuses.append(message['status'])
+                elif message['type'] == 'http.response.body':
+                    chunks.append(message.get('body', b''))
+
+            async with slots:
+                await handler(scope, receive, send)
+            return b''.join(chunks)
+
+        return statuses, await asyncio.gather(*(submit(index) for index in range(requests)))
+
+    def report(self, name, requests, elapsed, statuses, contents):
+        ok = sum(1 for status in statuses if status == 200)
+        self.stdout.write(
+            f"{name:<30}{requests / elapsed:>12.1f}{elapsed * 1000 / requests:>10.2f}"
+            f"{ok:>8}{len(statuses) - ok:>8}"
+        )
+        return [
+            json.loads(content)['lead_id'] for content in contents
+            if content.startswith(b'{') and b'lead_id' in content
+        ]
+
+    def handle(self, *args, **options):
+        forms = Form.objects.filter(is_active=True)
+        form = forms.filter(id=options['form']).first() if options['form'] else forms.order_by('-created_at').first()
+        if form is None:
+            raise CommandError('No active form to submit to')
+
+        requests = options['requests']
+        delay = options['client_delay_ms'] / 1000
+        self.stdout.write(
+            f"📊 {requests} submissions to '{form.name}', clients taking {options['client_delay_ms']}ms to upload; "
+            f"{options['workers']} sync workers vs {options['concurrency']} concurrent async requests\n"
+        )
+        self.stdout.write(f"{'path':<30}{'req/s':>12}{'ms/req':>10}{'ok':>8}{'failed':>8}")
+
+        lead_ids = []
+        with override_settings(ROOT_URLCONF=__name__, ALLOWED_HOSTS=['testserver'], DEBUG=False):
+            started = time.perf_counter()
+            statuses, contents = self.run_wsgi(form.id, requests, options['workers'], delay)
+            lead_ids += self.report(
+                f"WSGI ({options['workers']} sync workers)", requests,
+                time.perf_counter() - started, statuses, contents
+            )
+
+            started = time.perf_counter()
+            statuses, contents = asyncio.run(self.run_asgi(form.id, requests, options['concurrency'], delay))
+            lead_ids += self.report(
+                'ASGI (async view)', requests, time.perf_counter() - started, statuses, contents
+            )
+
+        Lead.objects.filter(id__in=lead_ids).delete()
+        self.stdout.write(f"\n🧹 Removed {len(lead_ids)} benchmark leads")
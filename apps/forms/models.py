@@ -1,6 +1,7 @@
 # apps/forms/models.py - FIXED VERSION
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils.text import slugify
 import uuid
 
 User = get_user_model()
@@ -25,6 +26,9 @@ class Form(models.Model):
     embed_code = models.TextField(blank=True)
     is_active = models.BooleanField(default=True)
     
+    # Bumped whenever the form or its fields change; caches / ETags key on it
+    revision = models.PositiveIntegerField(default=0)
+    
     # Tracking
     created_by = models.ForeignKey(User, on_delete=models.CASCADE)
     created_at = models.DateTimeField(auto_now_add=True)
@@ -54,6 +58,14 @@ class FormField(models.Model):
         ('radio', 'Radio Button'),
     )
     
+    PROJECTION_TYPES = (
+        ('', 'Not projected'),
+        ('text', 'Text'),
+        ('number', 'Number'),
+        ('boolean', 'Yes / No'),
+        ('date', 'Date'),
+    )
+    
     form = models.ForeignKey(Form, related_name='fields', on_delete=models.CASCADE)
     field_type = models.CharField(max_length=20, choices=FIELD_TYPES)
     label = models.CharField(max_length=200)
@@ -62,8 +74,19 @@ class FormField(models.Model):
     options = models.JSONField(default=list, blank=True)  # For select/radio/checkbox
     order = models.PositiveIntegerField(default=0)
     
+    # Copy answers into typed, indexed LeadFieldValue rows for filtering/grouping
+    projection_type = models.CharField(max_length=10, choices=PROJECTION_TYPES, blank=True, default='')
+    
     class Meta:
         ordering = ['order']
     
     def __str__(self):
         return f"{self.form.name} - {self.label}"
+
+    @property
+    def data_key(self):
+        """Key this field's answer is stored under in Lead.form_data"""
+        # Mirrors the input names rendered by templates/embed/form.html
+        if self.field_type in ('email', 'phone'):
+            return self.field_type
+        return slugify(self.label.lower())
@@ -20,7 +20,7 @@ class FormSerializer(serializers.ModelSerializer):
     class Meta:
         model = Form
         fields = '__all__'
-        read_only_fields = ('id', 'embed_code', 'created_by', 'created_at', 'updated_at')
+        read_only_fields = ('id', 'embed_code', 'revision', 'created_by', 'created_at', 'updated_at')
     
     def get_total_submissions(self, obj):
         """Get total number of submissions for this form"""
@@ -1,4 +1,5 @@
 # apps/forms/urls.py - FIXED URL patterns
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
@@ -6,11 +7,19 @@ from . import views
 router = DefaultRouter()
 router.register(r'forms', views.FormViewSet)
 
+# Public embed endpoints: native async views under ASGI (ASYNC_PUBLIC_VIEWS)
+if getattr(settings, 'ASYNC_PUBLIC_VIEWS', False):
+    embed_form_view = views.AsyncEmbedFormView.as_view()
+    form_submit_view = views.AsyncFormSubmissionView.as_view()
+else:
+    embed_form_view = views.EmbedFormView.as_view()
+    form_submit_view = views.FormSubmissionView.as_view()
+
 urlpatterns = [
     # API routes
     path('', include(router.urls)),
     
     # Embed routes - FIXED: These should be separate from API routes
-    path('<uuid:form_id>/', views.EmbedFormView.as_view(), name='embed_form'),
-    path('<uuid:form_id>/submit/', views.FormSubmissionView.as_view(), name='form_submit'),
+    path('<uuid:form_id>/', embed_form_view, name='embed_form'),
+    path('<uuid:form_id>/submit/', form_submit_view, name='form_submit'),
 ]
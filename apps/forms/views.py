@@ -5,22 +5,35 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
 from django.shortcuts import render, get_object_or_404
-from django.http import JsonResponse, HttpResponse
+from django.http import JsonResponse, HttpResponse, Http404
 from django.views.decorators.csrf import csrf_exempt
 from django.views.decorators.clickjacking import xframe_options_exempt
+from django.views.decorators.http import condition
 from django.utils.decorators import method_decorator
-from django.db.models import Count, Q
+from django.utils.cache import get_conditional_response
+from django.core.cache import cache
+from django.db.models import Count, F, Q
 from django.utils import timezone
+from django.views import View
+from asgiref.sync import sync_to_async
 from datetime import timedelta, datetime
-from .models import Form, FormField
+from .models import Form
 from .serializers import FormSerializer, FormFieldSerializer
+from .field_sync import DEFAULT_FIELDS, bump_revision, copy_fields, sync_fields
 from apps.leads.models import Lead
 from apps.affiliates.models import Affiliate
+from apps.affiliates.tasks import refresh_assignment_stats
+from apps.core.jobs import enqueue, PRIORITY_LOW
+from apps.core.pagination import count_metadata
+from apps.core.db_routing import replica_reads
 import logging
 import json
 
 logger = logging.getLogger(__name__)
 
+# Embed pages cache the form and its fields per revision
+EMBED_FORM_CACHE_TIMEOUT = 300
+
 class FormViewSet(viewsets.ModelViewSet):
     serializer_class = FormSerializer
     permission_classes = [IsAuthenticated]
@@ -65,68 +78,30 @@ class FormViewSet(viewsets.ModelViewSet):
         # Save the form first
         form = serializer.save(created_by=self.request.user)
         
-        # Handle fields from the request data
+        # Handle fields from the request data, default fields if none provided
         fields_data = self.request.data.get('fields', [])
-        if fields_data:
-            # Clear existing fields if updating
-            form.fields.all().delete()
-            
-            # Create new fields
-            for field_data in fields_data:
-                FormField.objects.create(
-                    form=form,
-                    field_type=field_data.get('field_type', 'text'),
-                    label=field_data.get('label', ''),
-                    placeholder=field_data.get('placeholder', ''),
-                    is_required=field_data.get('is_required', False),
-                    options=field_data.get('options', []),
-                    order=field_data.get('order', 0)
-                )
-        else:
-            # Create default form fields if none provided
-            default_fields = [
-                {
-                    'field_type': 'text',
-                    'label': 'Full Name',
-                    'placeholder': 'Enter your full name',
-                    'is_required': True,
-                    'order': 1
-                },
-                {
-                    'field_type': 'email',
-                    'label': 'Email Address',
-                    'placeholder': 'Enter your email address',
-                    'is_required': True,
-                    'order': 2
-                }
-            ]
-            
-            for field_data in default_fields:
-                FormField.objects.create(form=form, **field_data)
+        sync_fields(form, fields_data or DEFAULT_FIELDS)
     
     def perform_update(self, serializer):
+        instance = serializer.instance
+        before = {name: getattr(instance, name) for name in serializer.validated_data}
+        
         # Save the form first
         form = serializer.save()
         
-        # Handle fields from the request data
+        # Handle fields from the request data; unchanged rows are left alone
         fields_data = self.request.data.get('fields', [])
-        if fields_data:
-            # Clear existing fields
-            form.fields.all().delete()
-            
-            # Create new fields
-            for field_data in fields_data:
-                FormField.objects.create(
-                    form=form,
-                    field_type=field_data.get('field_type', 'text'),
-                    label=field_data.get('label', ''),
-                    placeholder=field_data.get('placeholder', ''),
-                    is_required=field_data.get('is_required', False),
-                    options=field_data.get('options', []),
-                    order=field_data.get('order', 0)
-                )
+        result = sync_fields(form, fields_data) if fields_data else None
+        
+        fields_changed = bool(result and (result['created'] or result['updated'] or result['deleted']))
+        form_changed = any(getattr(form, name) != value for name, value in before.items())
+        # sync_fields already bumped the revision if any field moved
+        if form_changed and not fields_changed:
+            bump_revision(form.pk)
+            form.refresh_from_db(fields=['revision', 'updated_at'])
     
     @action(detail=True, methods=['get'])
+    @replica_reads
     def stats(self, request, pk=None):
         """Get comprehensive form statistics with affiliate-specific data"""
         try:
@@ -265,17 +240,8 @@ class FormViewSet(viewsets.ModelViewSet):
                 created_by=request.user
             )
             
-            # Copy all form fields
-            for field in original_form.fields.all():
-                FormField.objects.create(
-                    form=new_form,
-                    field_type=field.field_type,
-                    label=field.label,
-                    placeholder=field.placeholder,
-                    is_required=field.is_required,
-                    options=field.options,
-                    order=field.order
-                )
+            # Copy all form fields in one insert
+            copy_fields(original_form, new_form)
             
             return Response(FormSerializer(new_form).data, status=status.HTTP_201_CREATED)
         except Exception as e:
@@ -315,24 +281,68 @@ class FormViewSet(viewsets.ModelViewSet):
             page_size = int(request.query_params.get('page_size', 20))
             offset = int(request.query_params.get('offset', 0))
             
-            total_count = queryset.count()
-            leads = queryset.select_related('affiliate').order_by('-created_at')[offset:offset + page_size]
+            counts = count_metadata(queryset, request)
             
             from apps.leads.serializers import LeadSerializer
+            from apps.leads.fieldsets import parse_fieldsets, apply_fieldsets
+            
+            fields, expand = parse_fieldsets(request)
+            queryset = apply_fieldsets(queryset, fields, expand)
+            
+            # Fetch one extra row so has_more doesn't depend on an estimated count
+            leads = list(queryset.order_by('-created_at')[offset:offset + page_size + 1])
             
             return Response({
                 'form_id': str(form.id),
-                'total_count': total_count,
-                'results': LeadSerializer(leads, many=True).data,
-                'has_more': offset + page_size < total_count,
+                'total_count': counts['count'],
+                'count_is_estimate': counts['count_is_estimate'],
+                'exact_count_url': counts.get('exact_count_url'),
+                'results': LeadSerializer(
+                    leads[:page_size], many=True, fields=fields, expand=expand
+                ).data,
+                'has_more': len(leads) > page_size,
                 'affiliate_filtered': user.user_type == 'affiliate'
             })
         except Exception as e:
             logger.error(f"Error getting form submissions: {e}")
             return Response({'error': str(e)}, status=500)
 
-# Keep existing EmbedFormView and FormSubmissionView unchanged
+def embed_form_etag(request, form_id):
+    """The embed page only changes when the form's revision does"""
+    revision = Form.objects.filter(id=form_id, is_active=True).values_list('revision', flat=True).first()
+    return None if revision is None else f'"{form_id}-{revision}"'
+
+def submission_payload(request):
+    """``(form_data, affiliate_id, utm_params)`` from a JSON or form-encoded submission"""
+    if request.content_type == 'application/json':
+        data = json.loads(request.body)
+        return data.get('form_data', {}), data.get('affiliate_id'), data.get('utm_params', {})
+    
+    utm_params = {
+        'utm_source': request.POST.get('utm_source', ''),
+        'utm_medium': request.POST.get('utm_medium', ''),
+        'utm_campaign': request.POST.get('utm_campaign', ''),
+        'utm_term': request.POST.get('utm_term', ''),
+        'utm_content': request.POST.get('utm_content', ''),
+    }
+    return dict(request.POST), request.POST.get('affiliate_id'), utm_params
+
+def client_ip(request):
+    x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
+    if x_forwarded_for:
+        return x_forwarded_for.split(',')[0]
+    return request.META.get('REMOTE_ADDR')
+
+def contact_details(form_data):
+    """``(email, name, phone)`` under the keys embed forms commonly use"""
+    email = form_data.get('email') or form_data.get('Email') or form_data.get('email_address')
+    name = form_data.get('name') or form_data.get('full_name') or form_data.get('Name')
+    phone = form_data.get('phone') or form_data.get('Phone')
+    return email, name, phone
+
+# Synchronous embed and submission views (WSGI); async versions follow them
 @method_decorator(xframe_options_exempt, name='dispatch')
+@method_decorator(condition(etag_func=embed_form_etag), name='get')
 class EmbedFormView(APIView):
     """Render embeddable form"""
     permission_classes = []
@@ -366,28 +376,10 @@ class FormSubmissionView(APIView):
             form = get_object_or_404(Form, id=form_id, is_active=True)
             
             # Extract form data
-            if request.content_type == 'application/json':
-                data = json.loads(request.body)
-                form_data = data.get('form_data', {})
-                affiliate_id = data.get('affiliate_id')
-                utm_params = data.get('utm_params', {})
-            else:
-                form_data = dict(request.POST)
-                affiliate_id = request.POST.get('affiliate_id')
-                utm_params = {
-                    'utm_source': request.POST.get('utm_source', ''),
-                    'utm_medium': request.POST.get('utm_medium', ''),
-                    'utm_campaign': request.POST.get('utm_campaign', ''),
-                    'utm_term': request.POST.get('utm_term', ''),
-                    'utm_content': request.POST.get('utm_content', ''),
-                }
+            form_data, affiliate_id, utm_params = submission_payload(request)
             
             # Get client IP
-            x_forwarded_for = request.META.get('HTTP_X_FORWARDED_FOR')
-            if x_forwarded_for:
-                ip_address = x_forwarded_for.split(',')[0]
-            else:
-                ip_address = request.META.get('REMOTE_ADDR')
+            ip_address = client_ip(request)
             
             # Create lead from form submission
             from apps.affiliates.models import Affiliate
@@ -401,9 +393,7 @@ class FormSubmissionView(APIView):
                     logger.warning(f"Affiliate not found: {affiliate_id}")
             
             # Extract email and name from form data
-            email = form_data.get('email') or form_data.get('Email') or form_data.get('email_address')
-            name = form_data.get('name') or form_data.get('full_name') or form_data.get('Name')
-            phone = form_data.get('phone') or form_data.get('Phone')
+            email, name, phone = contact_details(form_data)
             
             if not email:
                 return JsonResponse({'error': 'Email is required'}, status=400)
@@ -431,12 +421,12 @@ class FormSubmissionView(APIView):
                 affiliate.total_leads += 1
                 affiliate.save()
                 
-                # Update assignment stats
+                # Recount assignment stats in the background
                 try:
-                    assignment = affiliate.affiliateformassignment_set.get(form=form)
-                    assignment.update_stats()
-                except:
-                    pass
+                    enqueue(refresh_assignment_stats, priority=PRIORITY_LOW,
+                            pairs=[[str(affiliate.id), str(form.id)]])
+                except Exception as e:
+                    logger.error(f"Error queueing assignment stats refresh: {e}")
             
             logger.info(f"Lead created successfully: {lead.id}")
             
@@ -451,3 +441,117 @@ class FormSubmissionView(APIView):
             import traceback
             traceback.print_exc()
             return JsonResponse({'error': 'Submission failed'}, status=500)
+
+# Native async versions of the public endpoints, used when ASYNC_PUBLIC_VIEWS
+# is on (ASGI deployments). DRF views are synchronous, so these are plain
+# Django views; their database work goes through the async ORM and they
+# answer exactly like EmbedFormView / FormSubmissionView.
+class AsyncEmbedFormView(View):
+    """Render embeddable form"""
+    
+    async def get(self, request, form_id):
+        try:
+            revision = await Form.objects.filter(id=form_id, is_active=True).values_list(
+                'revision', flat=True
+            ).afirst()
+            if revision is None:
+                raise Http404('No Form matches the given query.')
+            
+            etag = f'"{form_id}-{revision}"'
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                # Key on the revision: any change to the form or its fields moves it
+                key = f'embed_form:{form_id}:{revision}'
+                form = await cache.aget(key)
+                if form is None:
+                    form = await Form.objects.prefetch_related('fields').aget(id=form_id)
+                    await cache.aset(key, form, EMBED_FORM_CACHE_TIMEOUT)
+                
+                context = {
+                    'form': form,
+                    'request': request,
+                }
+                response = render(request, 'embed/form.html', context)
+            
+            response['ETag'] = etag
+            response['X-Frame-Options'] = 'ALLOWALL'
+            response['Content-Security-Policy'] = "frame-ancestors *;"
+            # xframe_options_exempt only wraps synchronous views on Django 4.2
+            response.xframe_options_exempt = True
+            return response
+            
+        except Exception as e:
+            return HttpResponse(f"Form not available: {str(e)}", status=500)
+
+class AsyncFormSubmissionView(View):
+    """Handle form submissions"""
+    
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Posted to from other sites; csrf_exempt only wraps synchronous views on Django 4.2
+        view.csrf_exempt = True
+        return view
+    
+    async def post(self, request, form_id):
+        try:
+            logger.info(f"Form submission for form: {form_id}")
+            
+            form = await Form.objects.filter(id=form_id, is_active=True).only('id').afirst()
+            if form is None:
+                raise Http404('No Form matches the given query.')
+            
+            form_data, affiliate_id, utm_params = submission_payload(request)
+            ip_address = client_ip(request)
+            
+            # Find affiliate if provided
+            affiliate_pk = None
+            if affiliate_id:
+                affiliate_pk = await Affiliate.objects.filter(affiliate_code=affiliate_id).values_list(
+                    'id', flat=True
+                ).afirst()
+                if affiliate_pk is None:
+                    logger.warning(f"Affiliate not found: {affiliate_id}")
+            
+            email, name, phone = contact_details(form_data)
+            if not email:
+                return JsonResponse({'error': 'Email is required'}, status=400)
+            
+            lead = await Lead.objects.acreate(
+                form=form,
+                affiliate_id=affiliate_pk,
+                form_data=form_data,
+                email=email,
+                name=name or '',
+                phone=phone or '',
+                utm_source=utm_params.get('utm_source', ''),
+                utm_medium=utm_params.get('utm_medium', ''),
+                utm_campaign=utm_params.get('utm_campaign', ''),
+                utm_term=utm_params.get('utm_term', ''),
+                utm_content=utm_params.get('utm_content', ''),
+                ip_address=ip_address,
+                user_agent=request.META.get('HTTP_USER_AGENT', ''),
+                status='new'
+            )
+            
+            if affiliate_pk:
+                # One UPDATE instead of loading and saving the affiliate
+                await Affiliate.objects.filter(pk=affiliate_pk).aupdate(total_leads=F('total_leads') + 1)
+                
+                try:
+                    await sync_to_async(enqueue)(refresh_assignment_stats, priority=PRIORITY_LOW,
+                                                 pairs=[[str(affiliate_pk), str(form.id)]])
+                except Exception as e:
+                    logger.error(f"Error queueing assignment stats refresh: {e}")
+            
+            logger.info(f"Lead created successfully: {lead.id}")
+            
+            return JsonResponse({
+                'status': 'success', 
+                'message': 'Thank you! Your submission has been received.',
+                'lead_id': str(lead.id)
+            })
+            
+        except Exception as e:
+            logger.error(f"Error in form submission: {e}")
+            return JsonResponse({'error': 'Submission failed'}, status=500)
@@ -1,6 +1,11 @@
 # apps/leads/admin.py
 from django.contrib import admin
-from .models import Lead, LeadNote
+from django.db.models import Q
+from .models import (
+    Lead, LeadNote, ExportJob, WebhookSubscription, WebhookDelivery, WebhookDeadLetter, LeadSubmissionKey
+)
+from .contact_search import contact_match_q
+from . import webhooks
 
 class LeadNoteInline(admin.TabularInline):
     model = LeadNote
@@ -14,8 +19,60 @@ class LeadAdmin(admin.ModelAdmin):
     search_fields = ('email', 'name', 'form__name')
     readonly_fields = ('id', 'created_at', 'updated_at')
     inlines = [LeadNoteInline]
+    
+    def get_search_results(self, request, queryset, search_term):
+        """
+        Use the trigram / token indexes instead of icontains on every field;
+        contact_match_q covers email, name and phone, search_fields only
+        switches the search box on
+        """
+        if not search_term:
+            return queryset, False
+        queryset = queryset.filter(
+            contact_match_q(search_term, queryset.db) |
+            Q(form__name__icontains=search_term)
+        )
+        return queryset, False
 
 @admin.register(LeadNote)
 class LeadNoteAdmin(admin.ModelAdmin):
     list_display = ('lead', 'user', 'created_at')
     list_filter = ('created_at', 'user')
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'file_format', 'status', 'rows_done', 'rows_total', 'created_by', 'created_at', 'expires_at')
+    list_filter = ('status', 'file_format', 'created_at')
+    readonly_fields = [field.name for field in ExportJob._meta.fields]
+
+@admin.register(WebhookSubscription)
+class WebhookSubscriptionAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'url', 'form', 'affiliate', 'batch_size', 'is_active', 'created_at')
+    list_filter = ('is_active', 'created_at')
+    search_fields = ('name', 'url')
+    readonly_fields = ('id', 'created_at', 'updated_at')
+
+@admin.register(WebhookDelivery)
+class WebhookDeliveryAdmin(admin.ModelAdmin):
+    list_display = ('event', 'subscription', 'attempts', 'next_attempt_at', 'created_at')
+    list_filter = ('event', 'subscription')
+    readonly_fields = [field.name for field in WebhookDelivery._meta.fields]
+
+@admin.register(WebhookDeadLetter)
+class WebhookDeadLetterAdmin(admin.ModelAdmin):
+    list_display = ('event', 'subscription', 'attempts', 'failed_at')
+    list_filter = ('event', 'subscription', 'failed_at')
+    readonly_fields = [field.name for field in WebhookDeadLetter._meta.fields]
+    actions = ['replay']
+    
+    @admin.action(description='Queue selected events for delivery again')
+    def replay(self, request, queryset):
+        replayed = webhooks.replay_dead_letters(queryset)
+        self.message_user(request, f'{replayed} events queued again')
+
+@admin.register(LeadSubmissionKey)
+class LeadSubmissionKeyAdmin(admin.ModelAdmin):
+    list_display = ('key', 'user', 'lead', 'created_at')
+    list_filter = ('created_at',)
+    search_fields = ('key', 'user__username')
+    readonly_fields = [field.name for field in LeadSubmissionKey._meta.fields]
@@ -1,6 +1,24 @@
 # apps/leads/apps.py
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
+import logging
+
+logger = logging.getLogger(__name__)
+
+def setup_search_backend(sender, using='default', **kwargs):
+    """Create the GIN / trigram indexes and FTS5 table once the leads tables exist"""
+    from .search import ensure_search_backend
+    from .contact_search import ensure_trigram_indexes
+    try:
+        ensure_search_backend(using)
+        ensure_trigram_indexes(using)
+    except Exception as e:
+        logger.warning(f"Lead search backend not set up: {e}")
 
 class LeadsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.leads'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        post_migrate.connect(setup_search_backend, sender=self)
@@ -0,0 +1,250 @@
+# apps/leads/batch_submit.py - Server-to-server batch lead submission
+"""
+Lets partners post many leads per call from their own backends instead of
+one request per lead through /embed/<form>/submit/.
+
+Body of POST /api/leads/submit/batch/ (at most LEAD_BATCH_SUBMIT_LIMIT items):
+
+    {"items": [{
+        "idempotency_key": "order-1234",     required, unique per user
+        "form_id": "<uuid>",                 any form the user may post to
+        "form_data": {"email": ..., ...},    answers, as the embed form sends them
+        "utm_params": {"utm_source": ...},   optional
+        "ip_address": "...", "user_agent": "...",   optional, the lead's own
+        "affiliate_code": "..."              admins only; affiliates post as themselves
+    }, ...]}
+
+Every item is checked against its form's fields (required answers, email
+format, select / radio options). Valid items are written together:
+
+- forms and their fields: two SELECTs
+- idempotency keys already used: one SELECT
+- the new leads: one bulk_create (imports.insert_leads), with affiliate and
+  assignment counters moved by one grouped UPDATE per table
+- their keys: one bulk_create
+
+An item whose key was seen before is not inserted again; it reports the
+lead it created the first time, so partners can retry a whole batch after a
+timeout. Two retries racing each other both insert nothing twice: the
+unique key makes the later transaction fail, and it is replayed once.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import IntegrityError, transaction
+from apps.forms.models import Form, FormField
+from apps.forms.views import contact_details
+from .models import LeadSubmissionKey
+from . import imports
+import logging
+import uuid
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BATCH_SUBMIT_LIMIT = 500
+
+UTM_FIELDS = ('utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content')
+CHOICE_TYPES = ('select', 'radio')
+
+
+def limit():
+    return getattr(settings, 'LEAD_BATCH_SUBMIT_LIMIT', DEFAULT_BATCH_SUBMIT_LIMIT)
+
+
+def _form_id(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def load_forms(form_ids, affiliate=None):
+    """{form_id: (form, [fields])} for the active forms among ``form_ids`` the poster may use"""
+    forms = Form.objects.filter(id__in=form_ids, is_active=True)
+    if affiliate is not None:
+        forms = forms.filter(
+            affiliateformassignment__affiliate=affiliate,
+            affiliateformassignment__is_active=True
+        )
+
+    schemas = {form.id: (form, []) for form in forms}
+    for field in FormField.objects.filter(form_id__in=schemas.keys()):
+        schemas[field.form_id][1].append(field)
+    return schemas
+
+
+def _blank(value):
+    return value is None or value is False or (isinstance(value, (str, list, dict)) and not value)
+
+
+def validate_answers(fields, form_data):
+    """{data_key: message} for answers that don't fit the form's fields"""
+    errors = {}
+    for field in fields:
+        value = form_data.get(field.data_key)
+        if isinstance(value, str):
+            value = value.strip()
+
+        if _blank(value):
+            if field.is_required:
+                errors[field.data_key] = 'This field is required.'
+            continue
+
+        if field.field_type == 'email':
+            try:
+                validate_email(str(value))
+            except ValidationError:
+                errors[field.data_key] = 'Enter a valid email address.'
+        elif field.field_type in CHOICE_TYPES and field.options:
+            if str(value) not in {str(option) for option in field.options}:
+                errors[field.data_key] = f'"{value}" is not one of the options.'
+    return errors
+
+
+def build_lead(item, form, fields):
+    """An unsaved Lead for a valid item; raises ValueError with the item's errors"""
+    form_data = item.get('form_data') or {}
+    utm_params = item.get('utm_params') or {}
+    if not isinstance(form_data, dict) or not isinstance(utm_params, dict):
+        raise ValueError({'item': 'form_data and utm_params must be objects.'})
+
+    errors = validate_answers(fields, form_data)
+    if errors:
+        raise ValueError(errors)
+
+    email, name, phone = contact_details(form_data)
+    record = {
+        'form_data': form_data,
+        'email': email or '',
+        'name': name,
+        'phone': phone,
+        'ip_address': item.get('ip_address'),
+        'user_agent': item.get('user_agent'),
+        **{field: utm_params.get(field) for field in UTM_FIELDS},
+    }
+    try:
+        lead, _ = imports.build_lead(form, record)
+    except ValueError as e:
+        raise ValueError({'email': str(e)})
+
+    # Stored as posted, like a submission through the embed form
+    lead.form_data = form_data
+    return lead
+
+
+class BatchSubmission:
+    """
+    One batch posted by ``user``; ``affiliate`` is set for affiliate users
+    and is the affiliate all their leads are credited to.
+    """
+
+    def __init__(self, user, affiliate=None):
+        self.user = user
+        self.affiliate = affiliate
+        self.affiliates = imports.AffiliateMap()
+
+    def _affiliate_id(self, item):
+        if self.affiliate is not None:
+            return self.affiliate.pk
+        code = str(item.get('affiliate_code') or '').strip()
+        if not code:
+            return None
+        self.affiliates.load([code])
+        affiliate_id = self.affiliates.get(code)
+        if affiliate_id is None:
+            raise ValueError({'affiliate_code': f'Unknown affiliate: "{code}"'})
+        return affiliate_id
+
+    def submit(self, items):
+        results = [{'index': index} for index in range(len(items))]
+        first_with_key = {}
+        valid = []
+
+        for index, item in enumerate(items):
+            result = results[index]
+            if not isinstance(item, dict):
+                result.update(status='invalid', errors={'item': 'Each item must be an object.'})
+                continue
+
+            key = str(item.get('idempotency_key') or '').strip()
+            result['idempotency_key'] = key
+            if not key or len(key) > LeadSubmissionKey._meta.get_field('key').max_length:
+                result.update(status='invalid', errors={'idempotency_key': 'A key of up to 255 characters is required.'})
+                continue
+            if key in first_with_key:
+                # Sent twice in one batch: the first one counts
+                result.update(status='duplicate', duplicate_of=first_with_key[key])
+                continue
+            first_with_key[key] = index
+            valid.append((index, key, item))
+
+        self.affiliates.load(
+            str(item.get('affiliate_code') or '').strip() for _, _, item in valid
+            if self.affiliate is None
+        )
+        schemas = load_forms({_form_id(item.get('form_id')) for _, _, item in valid} - {None}, self.affiliate)
+
+        pending = []
+        for index, key, item in valid:
+            form_id = _form_id(item.get('form_id'))
+            if form_id not in schemas:
+                results[index].update(status='invalid', errors={'form_id': 'Form not found or not available.'})
+                continue
+            try:
+                lead = build_lead(item, *schemas[form_id])
+                lead.affiliate_id = self._affiliate_id(item)
+            except ValueError as e:
+                results[index].update(status='invalid', errors=e.args[0])
+                continue
+            pending.append((index, key, lead))
+
+        try:
+            created = self.write(pending, results)
+        except IntegrityError:
+            # A concurrent retry claimed some of the keys first
+            logger.info(f"Batch submission by {self.user} raced another one, replaying")
+            created = self.write(pending, results)
+
+        for result in results:
+            if 'duplicate_of' in result:
+                first = results[result['duplicate_of']]
+                if first.get('lead_id'):
+                    result['lead_id'] = first['lead_id']
+
+        counts = {'created': 0, 'duplicate': 0, 'invalid': 0}
+        for result in results:
+            counts[result['status']] += 1
+        imports.index_leads(created)
+
+        return {
+            'created': counts['created'],
+            'duplicates': counts['duplicate'],
+            'invalid': counts['invalid'],
+            'results': results,
+        }
+
+    def write(self, pending, results):
+        """Insert the leads whose keys are new; returns the created leads"""
+        existing = dict(
+            LeadSubmissionKey.objects.filter(user=self.user, key__in=[key for _, key, _ in pending])
+            .values_list('key', 'lead_id')
+        )
+
+        fresh = []
+        for index, key, lead in pending:
+            if key in existing:
+                results[index].update(status='duplicate', lead_id=str(existing[key]))
+            else:
+                fresh.append((index, key, lead))
+
+        leads = [lead for _, _, lead in fresh]
+        if leads:
+            with transaction.atomic():
+                imports.insert_leads(leads)
+                LeadSubmissionKey.objects.bulk_create([
+                    LeadSubmissionKey(user=self.user, key=key, lead=lead) for _, key, lead in fresh
+                ])
+
+        for index, _, lead in fresh:
+            results[index].update(status='created', lead_id=str(lead.id))
+        return leads
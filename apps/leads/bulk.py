@@ -0,0 +1,83 @@
+# apps/leads/bulk.py - Set-based bulk operations on leads
+"""
+Bulk status changes.
+
+A batch of leads moves to a new status with one UPDATE. The previous
+statuses are read first (row locked where the database supports it) so
+history rows can be written with one bulk_create and affiliate / assignment
+conversion counters adjusted by grouped deltas instead of recounting.
+Webhook subscribers get one lead.status_changed event per lead.
+"""
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from apps.affiliates import stats
+from .models import Lead, LeadStatusChange
+from . import webhooks
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BULK_STATUS_LIMIT = 10000
+
+
+def bulk_limit():
+    return getattr(settings, 'LEAD_BULK_STATUS_LIMIT', DEFAULT_BULK_STATUS_LIMIT)
+
+
+def record_status_changes(changes, user=None):
+    """
+    Write history and adjust counters for ``(lead_id, affiliate_id, form_id,
+    old_status, new_status)`` tuples.
+    """
+    changes = [change for change in changes if change[3] != change[4]]
+    if not changes:
+        return 0
+
+    LeadStatusChange.objects.bulk_create([
+        LeadStatusChange(lead_id=lead_id, from_status=old, to_status=new, changed_by=user)
+        for lead_id, _, _, old, new in changes
+    ], batch_size=1000)
+
+    per_affiliate, per_assignment = stats.conversion_deltas(
+        ((affiliate_id, form_id, old, new) for _, affiliate_id, form_id, old, new in changes),
+        Lead.CONVERSION_STATUSES
+    )
+    stats.apply_conversion_deltas(per_affiliate, per_assignment)
+
+    webhooks.status_changed(changes, user)
+    return len(changes)
+
+
+def bulk_update_status(queryset, new_status, user=None, limit=None):
+    """
+    Move every lead in ``queryset`` to ``new_status``.
+
+    Returns ``(updated, unchanged)``. Raises ValueError if more than
+    ``limit`` leads would change.
+    """
+    limit = limit or bulk_limit()
+    matching = Lead.objects.filter(pk__in=queryset.order_by().values('pk'))
+
+    with transaction.atomic():
+        rows = list(
+            matching.exclude(status=new_status)
+            .select_for_update()
+            .values_list('id', 'affiliate_id', 'form_id', 'status')[:limit + 1]
+        )
+        if len(rows) > limit:
+            raise ValueError(f'Too many leads for one bulk update (limit {limit})')
+
+        unchanged = matching.filter(status=new_status).count()
+        ids = [row[0] for row in rows]
+        if ids:
+            # updated_at is set explicitly: update() skips auto_now
+            Lead.objects.filter(pk__in=ids).update(status=new_status, updated_at=timezone.now())
+            record_status_changes(
+                [(lead_id, affiliate_id, form_id, old, new_status)
+                 for lead_id, affiliate_id, form_id, old in rows],
+                user
+            )
+
+    logger.info(f"Bulk status update to {new_status}: {len(ids)} leads")
+    return len(ids), unchanged
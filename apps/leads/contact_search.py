@@ -0,0 +1,128 @@
+# apps/leads/contact_search.py - Index-backed partial matching on contact fields
+"""
+Substring / prefix lookups on Lead.email, Lead.name and Lead.phone.
+
+- PostgreSQL: plain icontains, served by pg_trgm GIN indexes on UPPER(field)
+  (the exact expression Django emits for icontains)
+- Anything else: a LeadContactToken table holding every suffix of the
+  normalized value, so a substring match becomes an indexed prefix match
+"""
+from django.db import connections, router
+from django.db.models import Q
+import logging
+import re
+
+logger = logging.getLogger(__name__)
+
+CONTACT_FIELDS = ('email', 'name', 'phone')
+
+# Longest suffix we store; longer search terms are re-checked with icontains
+TOKEN_LENGTH = 32
+
+
+def _token_model():
+    from .models import LeadContactToken
+    return LeadContactToken
+
+
+def normalize(value):
+    """Lowercase and collapse whitespace so tokens and queries line up"""
+    return re.sub(r'\s+', ' ', (value or '').strip().lower())
+
+
+def ensure_trigram_indexes(using='default'):
+    """Create pg_trgm and the contact field trigram indexes (PostgreSQL only)"""
+    connection = connections[using]
+    if connection.vendor != 'postgresql':
+        return
+
+    from .models import Lead
+    table = Lead._meta.db_table
+
+    with connection.cursor() as cursor:
+        cursor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+        for field in CONTACT_FIELDS:
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {table}_{field}_trgm '
+                f'ON {table} USING GIN (UPPER({field}::text) gin_trgm_ops)'
+            )
+
+
+def build_tokens(lead):
+    """Every (field, suffix) pair for a lead, suffixes capped at TOKEN_LENGTH"""
+    tokens = set()
+    for field in CONTACT_FIELDS:
+        value = normalize(getattr(lead, field))
+        for start in range(len(value)):
+            suffix = value[start:start + TOKEN_LENGTH].strip()
+            if suffix:
+                tokens.add((field, suffix))
+    return tokens
+
+
+def index_contacts(leads, using=None):
+    """
+    Sync LeadContactToken rows for the given leads.
+
+    Only the difference is written, so a status change on a lead costs a
+    single SELECT and no writes.
+    """
+    leads = list(leads)
+    LeadContactToken = _token_model()
+    using = using or router.db_for_write(LeadContactToken)
+    if not leads or connections[using].vendor == 'postgresql':
+        return
+
+    wanted = {lead.pk: build_tokens(lead) for lead in leads}
+    existing = {pk: {} for pk in wanted}
+    for token_id, lead_id, field, token in LeadContactToken.objects.using(using).filter(
+        lead_id__in=wanted.keys()
+    ).values_list('id', 'lead_id', 'field', 'token'):
+        existing[lead_id][(field, token)] = token_id
+
+    stale_ids = []
+    new_tokens = []
+    for lead_id, tokens in wanted.items():
+        current = existing[lead_id]
+        stale_ids.extend(token_id for key, token_id in current.items() if key not in tokens)
+        new_tokens.extend(
+            LeadContactToken(lead_id=lead_id, field=field, token=token)
+            for field, token in tokens if (field, token) not in current
+        )
+
+    if stale_ids:
+        LeadContactToken.objects.using(using).filter(id__in=stale_ids).delete()
+    if new_tokens:
+        LeadContactToken.objects.using(using).bulk_create(new_tokens, batch_size=1000)
+
+
+def contact_match_q(term, using='default', fields=CONTACT_FIELDS):
+    """
+    Q matching leads whose email, name or phone contains ``term``.
+
+    Combine it with other filters like any Q object; the lookup is index
+    backed on both PostgreSQL and the token table fallback.
+    """
+    term = normalize(term)
+    if not term:
+        return Q()
+
+    contains = Q()
+    for field in fields:
+        contains |= Q(**{f'{field}__icontains': term})
+
+    if connections[using].vendor == 'postgresql':
+        return contains
+
+    # Prefix match as a range scan: LIKE 'x%' can't use the index on SQLite
+    prefix = term[:TOKEN_LENGTH]
+    matching = _token_model().objects.filter(
+        field__in=fields,
+        token__gte=prefix,
+        token__lt=prefix[:-1] + chr(ord(prefix[-1]) + 1)
+    ).values('lead_id')
+    q = Q(id__in=matching)
+    if len(term) > TOKEN_LENGTH:
+        # Token only proves the first TOKEN_LENGTH characters matched
+        q &= contains
+    return q
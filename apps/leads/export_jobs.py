@@ -0,0 +1,332 @@
+# apps/leads/export_jobs.py - Background lead exports
+"""
+Lead exports that run outside the request.
+
+    request_export()   create (or reuse) an ExportJob for a user + filters
+    run_job()          build the artifact, reporting rows_done as it goes
+    claim_next_job()   used by ``manage.py run_export_jobs`` workers
+    cleanup_expired()  delete artifacts and jobs past their expiry
+
+Jobs are deduplicated by a hash of the requester's scope, the filters and
+the format: an identical request while a job is pending or running returns
+that job instead of starting another. Completed jobs are never reused, since
+leads may have arrived since; every later request exports afresh. A partial
+unique constraint on filter_hash keeps concurrent requests, on any worker,
+from creating two active jobs.
+
+CSV / TSV / NDJSON artifacts are gzipped, XLSX is already a zip container.
+Exports of EXPORT_PARALLEL_MIN_ROWS rows or more are rendered on a process
+pool by apps.leads.parallel_export. Artifacts
+live in a Django storage (EXPORT_STORAGE, a local directory by default) so a
+blob store backend can be dropped in through settings.
+
+With EXPORT_JOB_RUNNER = 'thread' (the default) each job starts on a
+background thread in the web process as soon as it is created. 'queue'
+enqueues it for ``manage.py runworker`` (apps.core.jobs) and 'worker'
+leaves pending jobs to ``manage.py run_export_jobs``. The thread and queue
+runners clean up expired exports after a job finishes, at most once per
+EXPORT_JOB_CLEANUP_INTERVAL seconds.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files import File
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from datetime import timedelta
+from apps.core.jobs import enqueue, task
+from . import exports, parallel_export
+import gzip
+import hashlib
+import json
+import logging
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_JOB_TTL = 24 * 60 * 60  # seconds an artifact stays downloadable
+DEFAULT_EXPORT_JOB_TIMEOUT = 2 * 60 * 60  # running jobs older than this are failed
+DEFAULT_CLEANUP_INTERVAL = 10 * 60  # seconds between cleanups after finished jobs
+
+ACTIVE_STATUSES = ('pending', 'running')
+
+EXTENSIONS = {
+    'csv': 'csv.gz',
+    'tsv': 'tsv.gz',
+    'ndjson': 'ndjson.gz',
+    'xlsx': 'xlsx',
+}
+
+DOWNLOAD_CONTENT_TYPES = {
+    'csv': 'application/gzip',
+    'tsv': 'application/gzip',
+    'ndjson': 'application/gzip',
+    'xlsx': exports.CONTENT_TYPES['xlsx'],
+}
+
+
+def _job_model():
+    from .models import ExportJob
+    return ExportJob
+
+
+def get_storage():
+    """Storage holding export artifacts (EXPORT_STORAGE = {'BACKEND', 'OPTIONS'})"""
+    config = getattr(settings, 'EXPORT_STORAGE', None) or {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': settings.BASE_DIR / 'exports'},
+    }
+    return import_string(config['BACKEND'])(**config.get('OPTIONS', {}))
+
+
+def _ttl():
+    return timedelta(seconds=getattr(settings, 'EXPORT_JOB_TTL', DEFAULT_EXPORT_JOB_TTL))
+
+
+def export_scope(user):
+    """Which leads a user can export: one affiliate's, or all of them"""
+    from apps.affiliates.models import Affiliate
+
+    if user.user_type != 'affiliate':
+        return 'all'
+    affiliate = Affiliate.objects.filter(user=user).values_list('pk', flat=True).first()
+    return f'affiliate:{affiliate}' if affiliate else f'user:{user.pk}'
+
+
+def normalize_filters(params):
+    return {
+        name: str(params.get(name)).strip()
+        for name in exports.FILTER_PARAMS
+        if params.get(name)
+    }
+
+
+def filter_hash(scope, filters, file_format):
+    payload = json.dumps([scope, filters, file_format], sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def visible_jobs(user):
+    """Jobs a user may see and download: everything in their export scope"""
+    return _job_model().objects.filter(scope=export_scope(user))
+
+
+def _reusable(job_hash):
+    return _job_model().objects.filter(filter_hash=job_hash, status__in=ACTIVE_STATUSES).first()
+
+
+def request_export(user, params, file_format):
+    """Return ``(job, created)``, reusing an identical pending or running job"""
+    ExportJob = _job_model()
+    scope = export_scope(user)
+    filters = normalize_filters(params)
+    job_hash = filter_hash(scope, filters, file_format)
+
+    job = _reusable(job_hash)
+    if job:
+        return job, False
+
+    try:
+        with transaction.atomic():
+            job = ExportJob.objects.create(
+                created_by=user,
+                scope=scope,
+                filters=filters,
+                file_format=file_format,
+                filter_hash=job_hash,
+            )
+    except IntegrityError:
+        # An identical request created its job first (unique_active_export_job)
+        job = _reusable(job_hash)
+        if job is None:
+            raise
+        return job, False
+
+    transaction.on_commit(lambda: dispatch(job))
+    return job, True
+
+
+def dispatch(job):
+    """Start a job right away unless a separate worker process runs them"""
+    runner = getattr(settings, 'EXPORT_JOB_RUNNER', 'thread')
+    if runner == 'queue':
+        enqueue(run_export_job, job_id=str(job.pk))
+        return
+    if runner != 'thread':
+        return
+    thread = threading.Thread(
+        target=_run_in_thread,
+        args=(job.pk,),
+        name=f'export-job-{job.pk}',
+        daemon=True
+    )
+    thread.start()
+
+
+def cleanup_if_due():
+    """cleanup_expired(), unless another process ran it within the interval"""
+    interval = getattr(settings, 'EXPORT_JOB_CLEANUP_INTERVAL', DEFAULT_CLEANUP_INTERVAL)
+    if not cache.add('export_jobs_cleanup', 1, interval):
+        return
+    try:
+        removed, stuck = cleanup_expired()
+        if removed or stuck:
+            logger.info(f"Removed {removed} expired exports, failed {stuck} stuck jobs")
+    except Exception as e:
+        logger.error(f"Error cleaning up expired exports: {e}")
+
+
+def _run_in_thread(job_id):
+    try:
+        job = claim_job(job_id)
+        if job:
+            run_job(job)
+        cleanup_if_due()
+    finally:
+        # Threads get their own connection; don't leave it open
+        connection.close()
+
+
+@task(max_attempts=1)
+def run_export_job(job_id):
+    """Queue entry point; run_job records failures on the ExportJob itself"""
+    job = claim_job(job_id)
+    if job:
+        run_job(job)
+    cleanup_if_due()
+
+
+def claim_job(job_id):
+    """Move one pending job to running; None if someone else got it first"""
+    ExportJob = _job_model()
+    claimed = ExportJob.objects.filter(pk=job_id, status='pending').update(
+        status='running',
+        started_at=timezone.now()
+    )
+    return ExportJob.objects.get(pk=job_id) if claimed else None
+
+
+def claim_next_job():
+    """Claim the oldest pending job for a worker process"""
+    ExportJob = _job_model()
+    pending = ExportJob.objects.filter(status='pending').order_by('created_at')
+
+    if connection.features.has_select_for_update_skip_locked:
+        with transaction.atomic():
+            job = pending.select_for_update(skip_locked=True).first()
+            if job is None:
+                return None
+            job.status = 'running'
+            job.started_at = timezone.now()
+            job.save(update_fields=['status', 'started_at'])
+            return job
+
+    # No SKIP LOCKED (SQLite): the conditional UPDATE in claim_job decides
+    for job_id in pending.values_list('pk', flat=True)[:10]:
+        job = claim_job(job_id)
+        if job:
+            return job
+    return None
+
+
+def write_artifact(job, queryset, fileobj):
+    """Write the export for ``job`` into a binary file object"""
+    ExportJob = _job_model()
+
+    def progress(rows_done):
+        ExportJob.objects.filter(pk=job.pk).update(rows_done=rows_done)
+
+    if job.file_format == 'xlsx':
+        exports.write_xlsx(queryset, fileobj, progress=progress)
+        return
+
+    if job.file_format == 'ndjson':
+        lines = exports.stream_ndjson(queryset, progress=progress)
+    else:
+        lines = exports.stream_delimited(queryset, job.file_format, progress=progress)
+
+    with gzip.GzipFile(fileobj=fileobj, mode='wb') as archive:
+        for line in lines:
+            archive.write(line.encode('utf-8'))
+
+
+def run_job(job):
+    """Build a claimed job's artifact and mark it completed (or failed)"""
+    from apps.core.pagination import estimate_count
+
+    ExportJob = _job_model()
+    storage = get_storage()
+
+    try:
+        queryset = exports.export_queryset(job.created_by, job.filters)
+        rows_total, _ = estimate_count(queryset)
+        ExportJob.objects.filter(pk=job.pk).update(rows_total=rows_total)
+
+        with tempfile.TemporaryFile() as fileobj:
+            if parallel_export.should_parallelize(rows_total):
+                parallel_export.write_parallel(
+                    job.created_by, job.filters, job.file_format, fileobj, job_id=job.pk
+                )
+            else:
+                write_artifact(job, queryset, fileobj)
+            fileobj.seek(0)
+            file_name = storage.save(f'{job.pk}.{EXTENSIONS[job.file_format]}', File(fileobj))
+
+        finished = timezone.now()
+        stamp = finished.strftime('%Y%m%d_%H%M%S')
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='completed',
+            file_name=file_name,
+            file_size=storage.size(file_name),
+            download_name=f'leads_export_{stamp}.{EXTENSIONS[job.file_format]}',
+            finished_at=finished,
+            expires_at=finished + _ttl(),
+        )
+        logger.info(f"Export job {job.pk} completed ({rows_total} rows)")
+
+    except Exception as e:
+        logger.error(f"Export job {job.pk} failed: {e}")
+        ExportJob.objects.filter(pk=job.pk).update(
+            status='failed',
+            error=str(e),
+            finished_at=timezone.now(),
+            expires_at=timezone.now() + _ttl(),
+        )
+
+    job.refresh_from_db()
+    return job
+
+
+def open_artifact(job):
+    """``(file object, size)`` for a completed job's artifact"""
+    storage = get_storage()
+    return storage.open(job.file_name, 'rb'), job.file_size or storage.size(job.file_name)
+
+
+def cleanup_expired(now=None):
+    """Delete expired jobs and their artifacts; fail jobs stuck running"""
+    ExportJob = _job_model()
+    now = now or timezone.now()
+    storage = get_storage()
+
+    timeout = timedelta(seconds=getattr(settings, 'EXPORT_JOB_TIMEOUT', DEFAULT_EXPORT_JOB_TIMEOUT))
+    stuck = ExportJob.objects.filter(status='running', started_at__lt=now - timeout).update(
+        status='failed',
+        error='Export timed out',
+        finished_at=now,
+        expires_at=now + _ttl(),
+    )
+
+    expired = ExportJob.objects.filter(expires_at__lte=now)
+    removed = 0
+    for job in expired.only('id', 'file_name'):
+        if job.file_name:
+            try:
+                storage.delete(job.file_name)
+            except Exception as e:
+                logger.warning(f"Could not delete export artifact {job.file_name}: {e}")
+        job.delete()
+        removed += 1
+
+    return removed, stuck
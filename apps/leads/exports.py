@@ -0,0 +1,363 @@
+# apps/leads/exports.py - Streaming lead exports
+"""
+Constant-memory lead exports.
+
+Rows are read in chunks with ``.iterator(chunk_size=...)`` (a server-side
+cursor on PostgreSQL) and through ``values_list`` so no Lead instances are
+built. Each row is encoded and handed to the response as soon as it is read.
+
+CSV / TSV: form_data answers get one column per form field of the exported
+forms; any answers not covered by a field definition are kept as JSON in a
+trailing "Other Form Data" column, so the columns are known before the first
+row.
+
+XLSX: the union of form_data keys is gathered up front with one JSON key
+aggregation query, then rows go through an openpyxl write-only workbook into
+a temp file. Column widths are estimated from a sample of the first rows.
+"""
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+from openpyxl.styles import Font, PatternFill
+from openpyxl.utils import get_column_letter
+import csv
+import json
+import logging
+import tempfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_EXPORT_CHUNK_SIZE = 2000
+
+# Rows looked at when sizing XLSX columns, and the widest column we allow
+WIDTH_SAMPLE_ROWS = 500
+MAX_COLUMN_WIDTH = 50
+
+# (header, values_list lookup)
+BASE_COLUMNS = (
+    ('Email', 'email'),
+    ('Name', 'name'),
+    ('Phone', 'phone'),
+    ('Form', 'form__name'),
+    ('Status', 'status'),
+    ('Affiliate', 'affiliate__affiliate_code'),
+    ('UTM Source', 'utm_source'),
+    ('UTM Medium', 'utm_medium'),
+    ('UTM Campaign', 'utm_campaign'),
+    ('Created', 'created_at'),
+    ('Updated', 'updated_at'),
+    ('IP Address', 'ip_address'),
+)
+
+# Already exported as their own columns
+CONTACT_KEYS = ('email', 'name', 'phone')
+
+DELIMITERS = {
+    'csv': ',',
+    'tsv': '\t',
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'tsv': 'text/tab-separated-values',
+    'ndjson': 'application/x-ndjson',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+# Query params that narrow an export (shared by inline exports and ExportJob)
+FILTER_PARAMS = ('search', 'status', 'utm_source', 'form')
+
+
+def chunk_size():
+    return getattr(settings, 'EXPORT_CHUNK_SIZE', DEFAULT_EXPORT_CHUNK_SIZE)
+
+
+def export_queryset(user, params):
+    """Leads a user may export, narrowed by the FILTER_PARAMS in ``params``"""
+    from apps.affiliates.models import Affiliate
+    from .contact_search import contact_match_q
+    from .models import Lead
+
+    queryset = Lead.objects.select_related('form', 'affiliate')
+
+    # Apply role-based filtering
+    if user.user_type == 'affiliate':
+        try:
+            affiliate = Affiliate.objects.get(user=user)
+            queryset = queryset.filter(affiliate=affiliate)
+        except Affiliate.DoesNotExist:
+            queryset = Lead.objects.none()
+
+    # Apply search and filters
+    search = params.get('search')
+    if search:
+        queryset = queryset.filter(contact_match_q(search, queryset.db))
+
+    status_filter = params.get('status')
+    if status_filter:
+        queryset = queryset.filter(status=status_filter)
+
+    utm_source = params.get('utm_source')
+    if utm_source:
+        queryset = queryset.filter(utm_source=utm_source)
+
+    form_id = params.get('form')
+    if form_id:
+        queryset = queryset.filter(form__id=form_id)
+
+    return queryset
+
+
+def form_data_keys(queryset):
+    """form_data keys defined by the form fields of the exported leads"""
+    from apps.forms.models import FormField
+
+    fields = FormField.objects.filter(
+        form_id__in=queryset.order_by().values('form_id').distinct()
+    ).order_by('form_id', 'order')
+
+    keys = []
+    for field in fields:
+        key = field.data_key
+        if key not in keys and key not in CONTACT_KEYS:
+            keys.append(key)
+    return keys
+
+
+def _aggregated_keys(queryset):
+    """Distinct top-level form_data keys, aggregated in the database"""
+    connection = connections[queryset.db]
+    table = queryset.model._meta.db_table
+    ids_sql, params = queryset.order_by().values('pk').query.sql_with_params()
+
+    if connection.vendor == 'postgresql':
+        sql = (
+            f'SELECT DISTINCT jsonb_object_keys(form_data) FROM {table} '
+            f'WHERE jsonb_typeof(form_data) = \'object\' AND id IN ({ids_sql})'
+        )
+    elif connection.vendor == 'sqlite':
+        sql = (
+            f'SELECT DISTINCT j.key FROM {table}, json_each({table}.form_data) AS j '
+            f'WHERE json_type({table}.form_data) = \'object\' AND {table}.id IN ({ids_sql})'
+        )
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return {row[0] for row in cursor.fetchall()}
+
+
+def form_data_key_union(queryset):
+    """
+    Every form_data key used by the exported leads.
+
+    Keys defined by form fields come first in field order, then any others
+    alphabetically.
+    """
+    keys = form_data_keys(queryset)
+
+    try:
+        found = _aggregated_keys(queryset)
+    except Exception as e:
+        logger.warning(f"form_data key aggregation failed, scanning rows: {e}")
+        found = None
+
+    if found is None:
+        found = set()
+        for form_data in queryset.order_by().values_list('form_data', flat=True).iterator(chunk_size=chunk_size()):
+            if isinstance(form_data, dict):
+                found.update(form_data)
+
+    known = set(keys) | set(CONTACT_KEYS)
+    return keys + sorted(key for key in found if key not in known)
+
+
+def format_value(value):
+    """Cell text for one form_data answer"""
+    if value is None:
+        return ''
+    if isinstance(value, (list, tuple)):
+        # request.POST submissions store every answer as a list
+        return ', '.join(str(item) for item in value if item is not None)
+    if isinstance(value, dict):
+        return json.dumps(value)
+    return str(value)
+
+
+def _format_timestamp(value):
+    return value.strftime('%Y-%m-%d %H:%M:%S') if value else ''
+
+
+class Echo:
+    """File-like object whose write() just returns the line for csv.writer"""
+
+    def write(self, value):
+        return value
+
+
+def iter_rows(queryset, keys, other_column=True, progress=None):
+    """
+    Yield header + data rows as lists of cell values.
+
+    ``progress(rows_done)`` is called after every chunk and once at the end.
+    """
+    from .models import Lead
+
+    statuses = dict(Lead.STATUS_CHOICES)
+    known = set(keys) | set(CONTACT_KEYS)
+    lookups = [lookup for _, lookup in BASE_COLUMNS] + ['form_data']
+
+    yield [header for header, _ in BASE_COLUMNS] + [
+        f'Form_{key.title()}' for key in keys
+    ] + (['Other Form Data'] if other_column else [])
+
+    size = chunk_size()
+    done = 0
+    rows = queryset.order_by('-created_at').values_list(*lookups).iterator(chunk_size=size)
+    for (email, name, phone, form_name, status, affiliate_code, utm_source, utm_medium,
+         utm_campaign, created_at, updated_at, ip_address, form_data) in rows:
+        form_data = form_data if isinstance(form_data, dict) else {}
+        row = [
+            email, name, phone, form_name or '', statuses.get(status, status),
+            affiliate_code or '', utm_source, utm_medium, utm_campaign,
+            _format_timestamp(created_at), _format_timestamp(updated_at), ip_address or '',
+        ] + [format_value(form_data.get(key)) for key in keys]
+        if other_column:
+            other = {key: value for key, value in form_data.items() if key not in known}
+            row.append(json.dumps(other) if other else '')
+        yield row
+
+        done += 1
+        if progress and done % size == 0:
+            progress(done)
+
+    if progress:
+        progress(done)
+
+
+def iter_records(queryset, progress=None):
+    """Yield one dict per lead, form_data kept as-is (for NDJSON)"""
+    from .models import Lead
+
+    statuses = dict(Lead.STATUS_CHOICES)
+    lookups = [lookup for _, lookup in BASE_COLUMNS] + ['form_data']
+    names = [header.lower().replace(' ', '_') for header, _ in BASE_COLUMNS] + ['form_data']
+
+    size = chunk_size()
+    done = 0
+    rows = queryset.order_by('-created_at').values_list(*lookups).iterator(chunk_size=size)
+    for row in rows:
+        record = dict(zip(names, row))
+        record['status'] = statuses.get(record['status'], record['status'])
+        yield record
+
+        done += 1
+        if progress and done % size == 0:
+            progress(done)
+
+    if progress:
+        progress(done)
+
+
+def stream_ndjson(queryset, progress=None):
+    """Yield one JSON line per lead"""
+    for record in iter_records(queryset, progress=progress):
+        yield json.dumps(record, cls=DjangoJSONEncoder) + '\n'
+
+
+def stream_delimited(queryset, file_format='csv', progress=None):
+    """Yield encoded CSV / TSV lines for a Lead queryset"""
+    writer = csv.writer(Echo(), delimiter=DELIMITERS[file_format])
+    keys = form_data_keys(queryset)
+
+    # BOM so Excel opens UTF-8 exports correctly
+    yield '\ufeff'
+    try:
+        for row in iter_rows(queryset, keys, progress=progress):
+            yield writer.writerow(row)
+    except Exception as e:
+        # Headers are already sent, all we can do is log and cut the stream short
+        logger.error(f"Streaming export error: {e}")
+        raise
+
+
+def _clean(value):
+    # openpyxl refuses control characters that some form submissions contain
+    if isinstance(value, str):
+        return ILLEGAL_CHARACTERS_RE.sub('', value)
+    return value
+
+
+def column_widths(headers, sample, widths=None):
+    """Widest text per column over the headers and a sample of rows"""
+    widths = list(widths) if widths else [len(header) for header in headers]
+    for row in sample:
+        for index, value in enumerate(row):
+            length = len(str(value)) if value is not None else 0
+            if length > widths[index]:
+                widths[index] = length
+    return widths
+
+
+def add_sheet(wb, title, headers, widths):
+    """Write-only sheet with sized columns and the styled header row"""
+    ws = wb.create_sheet(title)
+    for index, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(index)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+    header_font = Font(bold=True)
+    header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
+    header_row = []
+    for header in headers:
+        cell = WriteOnlyCell(ws, value=header)
+        cell.font = header_font
+        cell.fill = header_fill
+        header_row.append(cell)
+    ws.append(header_row)
+    return ws
+
+
+def write_xlsx(queryset, fileobj, progress=None):
+    """Write a Lead queryset as an XLSX workbook into ``fileobj``"""
+    keys = form_data_key_union(queryset)
+    rows = iter_rows(queryset, keys, other_column=False, progress=progress)
+    headers = next(rows)
+
+    # Column widths must be set before the first row in write-only mode,
+    # so size them from a sample of the leading rows
+    sample = []
+    for row in rows:
+        sample.append([_clean(value) for value in row])
+        if len(sample) >= WIDTH_SAMPLE_ROWS:
+            break
+
+    wb = Workbook(write_only=True)
+    ws = add_sheet(wb, "Leads Export", headers, column_widths(headers, sample))
+
+    count = 0
+    for row in sample:
+        ws.append(row)
+        count += 1
+    for row in rows:
+        ws.append([_clean(value) for value in row])
+        count += 1
+
+    wb.save(fileobj)
+    return count
+
+
+def xlsx_tempfile(queryset):
+    """XLSX export spooled to an anonymous temp file, rewound for reading"""
+    fileobj = tempfile.TemporaryFile(suffix='.xlsx')
+    try:
+        write_xlsx(queryset, fileobj)
+    except Exception:
+        fileobj.close()
+        raise
+    fileobj.seek(0)
+    return fileobj
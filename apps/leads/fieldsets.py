@@ -0,0 +1,65 @@
+# apps/leads/fieldsets.py - Sparse fieldsets for lead endpoints
+"""
+``?fields=`` and ``?expand=`` support for lead endpoints.
+
+    ?fields=id,email,status,form_name   only these keys in each lead
+    ?expand=lead_notes                  include nested notes (off by default)
+
+The same choice drives the queryset: only the needed columns are selected,
+related rows are joined only when a field needs them, and notes are
+prefetched only when expanded.
+"""
+from django.db.models import Prefetch
+
+# Fields that are left out unless asked for with ?expand=
+EXPANDABLE_FIELDS = ('lead_notes',)
+
+# Serializer fields backed by a related row: (select_related path, only() column)
+RELATED_FIELDS = {
+    'form_name': ('form', 'form__name'),
+    'affiliate_code': ('affiliate', 'affiliate__affiliate_code'),
+}
+
+
+def _split(value):
+    return {item.strip() for item in (value or '').split(',') if item.strip()}
+
+
+def parse_fieldsets(request):
+    """Return ``(fields, expand)`` from the query string (fields is None for all)"""
+    if request is None:
+        return None, set()
+
+    fields = _split(request.query_params.get('fields')) or None
+    expand = _split(request.query_params.get('expand'))
+    if fields:
+        # Asking for an expandable field by name expands it
+        expand |= fields & set(EXPANDABLE_FIELDS)
+    return fields, expand
+
+
+def apply_fieldsets(queryset, fields=None, expand=()):
+    """Trim a Lead queryset to what the serializer will actually read"""
+    from .models import LeadNote
+
+    wanted = set(RELATED_FIELDS) if fields is None else fields
+    related = [path for name, (path, _) in RELATED_FIELDS.items() if name in wanted]
+    queryset = queryset.select_related(None)
+    if related:
+        queryset = queryset.select_related(*related)
+
+    if fields is not None:
+        model_fields = {f.name for f in queryset.model._meta.concrete_fields}
+        columns = {'id'} | (fields & model_fields)
+        for name, (path, column) in RELATED_FIELDS.items():
+            if name in fields:
+                # The FK itself can't be deferred while it is select_related
+                columns |= {path, column}
+        queryset = queryset.only(*columns)
+
+    if 'lead_notes' in expand:
+        queryset = queryset.prefetch_related(
+            Prefetch('lead_notes', queryset=LeadNote.objects.select_related('user'))
+        )
+
+    return queryset
@@ -0,0 +1,354 @@
+# apps/leads/imports.py - Streaming bulk lead imports
+"""
+Bring leads in from CSV / TSV / NDJSON files without the per-lead submit path.
+
+The file is parsed row by row (csv.DictReader / one JSON object per line),
+so memory stays flat however large the upload is. Rows are collected into
+batches and every batch costs a fixed number of queries:
+
+- affiliate codes not seen yet in this import: one SELECT
+- existing leads with the same email on the target form: one SELECT
+- the new leads: one bulk_create
+- search document / contact tokens / projected fields: the batch indexers
+- affiliate and assignment counters: one grouped UPDATE per table
+- lead.created webhook deliveries: one SELECT and one bulk_create
+
+Columns named like a Lead field (``email``, ``utm_source``, ``status``, ...)
+fill that field; ``affiliate`` / ``affiliate_code`` is resolved to an
+affiliate; everything else lands in ``form_data``. The headers written by
+the lead exports are understood too, so an export can be imported again.
+"""
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email, validate_ipv46_address
+from django.db import transaction
+from django.db.models.functions import Lower
+from apps.affiliates import stats
+from .models import Lead
+from . import search, contact_search, projection, webhooks
+import csv
+import io
+import json
+import logging
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMPORT_BATCH_SIZE = 1000
+MAX_REPORTED_ERRORS = 100
+
+FORMATS = ('csv', 'tsv', 'ndjson')
+DELIMITERS = {'csv': ',', 'tsv': '\t'}
+
+# Normalized column name -> Lead field
+LEAD_COLUMNS = {
+    'email': 'email',
+    'email_address': 'email',
+    'name': 'name',
+    'full_name': 'name',
+    'phone': 'phone',
+    'utm_source': 'utm_source',
+    'utm_medium': 'utm_medium',
+    'utm_campaign': 'utm_campaign',
+    'utm_term': 'utm_term',
+    'utm_content': 'utm_content',
+    'referrer_url': 'referrer_url',
+    'ip_address': 'ip_address',
+    'user_agent': 'user_agent',
+    'status': 'status',
+    'notes': 'notes',
+}
+
+AFFILIATE_COLUMNS = ('affiliate', 'affiliate_code', 'affiliate_id')
+
+# Answers that also stay in form_data, like a submission through the embed form
+CONTACT_COLUMNS = ('email', 'name', 'phone')
+
+# Written by the exports but owned by the target form / the database
+IGNORED_COLUMNS = ('id', 'form', 'form_id', 'created', 'created_at', 'updated', 'updated_at')
+
+# Catch-all JSON column of the CSV / TSV exports
+OTHER_DATA_COLUMN = 'other_form_data'
+
+
+def batch_size():
+    return getattr(settings, 'LEAD_IMPORT_BATCH_SIZE', DEFAULT_IMPORT_BATCH_SIZE)
+
+
+def guess_format(filename, default='csv'):
+    extension = (filename or '').rsplit('.', 1)[-1].lower()
+    if extension in ('jsonl', 'json'):
+        return 'ndjson'
+    return extension if extension in FORMATS else default
+
+
+def _normalize(column):
+    return str(column or '').strip().lower().replace(' ', '_').replace('-', '_')
+
+
+def iter_records(fileobj, file_format='csv'):
+    """Yield ``(line_number, dict)`` from a binary file, one row at a time"""
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        if file_format == 'ndjson':
+            for number, line in enumerate(text, 1):
+                if line.strip():
+                    try:
+                        record = json.loads(line)
+                    except ValueError as e:
+                        yield number, ValueError(f'Invalid JSON: {e}')
+                        continue
+                    if not isinstance(record, dict):
+                        record = ValueError('Each line must be a JSON object')
+                    yield number, record
+        else:
+            reader = csv.DictReader(text, delimiter=DELIMITERS[file_format])
+            for record in reader:
+                yield reader.line_num, record
+    finally:
+        # Leave the underlying file to its owner
+        text.detach()
+
+
+class AffiliateMap:
+    """affiliate_code -> affiliate id, filled one SELECT per batch of new codes"""
+
+    def __init__(self):
+        self.ids = {}
+
+    def load(self, codes):
+        from apps.affiliates.models import Affiliate
+
+        missing = {code for code in codes if code and code not in self.ids}
+        if not missing:
+            return
+        found = dict(
+            Affiliate.objects.filter(affiliate_code__in=missing, is_active=True)
+            .values_list('affiliate_code', 'id')
+        )
+        for code in missing:
+            self.ids[code] = found.get(code)
+
+    def get(self, code):
+        return self.ids.get(code)
+
+
+def _status(value):
+    statuses = dict(Lead.STATUS_CHOICES)
+    if value in statuses:
+        return value
+    # The exports write display names ("Closed Won")
+    by_label = {label.lower(): key for key, label in statuses.items()}
+    return by_label.get(str(value).strip().lower())
+
+
+def build_lead(form, record):
+    """
+    Map one record onto an unsaved Lead.
+
+    Returns ``(lead, affiliate_code)``; raises ValueError for rows that can't
+    be imported.
+    """
+    fields = {}
+    form_data = {}
+    affiliate_code = ''
+
+    for column, value in record.items():
+        if column is None:
+            # csv.DictReader puts surplus cells under None
+            continue
+        key = _normalize(column)
+        if value is None or key in IGNORED_COLUMNS:
+            continue
+
+        if key == 'form_data' and isinstance(value, dict):
+            form_data.update(value)
+        elif key == OTHER_DATA_COLUMN:
+            if value:
+                try:
+                    form_data.update(json.loads(value))
+                except (ValueError, TypeError):
+                    raise ValueError(f'"{column}" is not a JSON object')
+        elif key in AFFILIATE_COLUMNS:
+            affiliate_code = str(value).strip()
+        elif key in LEAD_COLUMNS:
+            field = LEAD_COLUMNS[key]
+            fields.setdefault(field, value if isinstance(value, str) else str(value))
+            if key in CONTACT_COLUMNS:
+                form_data[key] = value
+        elif value != '':
+            form_data[key] = value
+
+    email = (fields.get('email') or '').strip()
+    try:
+        validate_email(email)
+    except ValidationError:
+        raise ValueError(f'Invalid email: "{email}"' if email else 'Email is required')
+    fields['email'] = email
+
+    status = fields.get('status')
+    if status:
+        fields['status'] = _status(status)
+        if not fields['status']:
+            raise ValueError(f'Unknown status: "{status}"')
+    else:
+        fields.pop('status', None)
+
+    ip_address = (fields.get('ip_address') or '').strip()
+    if ip_address:
+        try:
+            validate_ipv46_address(ip_address)
+        except ValidationError:
+            ip_address = ''
+    fields['ip_address'] = ip_address or None
+
+    # Keep within the column sizes instead of failing the whole batch
+    for name in ('name', 'phone', 'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content'):
+        if name in fields:
+            fields[name] = fields[name].strip()[:Lead._meta.get_field(name).max_length]
+
+    return Lead(form=form, form_data=form_data, **fields), affiliate_code
+
+
+def insert_leads(leads, size=None):
+    """
+    Write new leads with one bulk_create, then add them to the affiliate and
+    assignment counters and queue their lead.created webhooks. Run it inside
+    a transaction so the counters never drift from the rows.
+    """
+    Lead.objects.bulk_create(leads, batch_size=size or batch_size())
+
+    per_affiliate, per_assignment = stats.lead_deltas(
+        (lead.affiliate_id, lead.form_id) for lead in leads
+    )
+    stats.apply_lead_deltas(per_affiliate, per_assignment)
+
+    stats.apply_conversion_deltas(*stats.conversion_deltas(
+        ((lead.affiliate_id, lead.form_id, None, lead.status) for lead in leads),
+        Lead.CONVERSION_STATUSES
+    ))
+
+    webhooks.leads_created(leads)
+
+
+def index_leads(leads):
+    """Same bookkeeping the post_save receivers do for single leads"""
+    try:
+        search.index_leads(leads)
+        contact_search.index_contacts(leads)
+        projection.project_leads(leads)
+    except Exception as e:
+        logger.error(f"Error indexing {len(leads)} bulk-created leads: {e}")
+
+
+class LeadImport:
+    """
+    One import run into a single form.
+
+    Feed records with ``add()`` (or ``run()`` for a whole file); full
+    batches are written as they fill up. ``result()`` is the running report.
+    """
+
+    def __init__(self, form, user=None, skip_duplicates=True, size=None, progress=None):
+        self.form = form
+        self.user = user
+        self.skip_duplicates = skip_duplicates
+        self.size = size or batch_size()
+        self.progress = progress
+        self.affiliates = AffiliateMap()
+
+        # Lower-cased emails already imported in this run
+        self.seen = set()
+        self.pending = []
+
+        self.rows = 0
+        self.created = 0
+        self.duplicates = 0
+        self.invalid = 0
+        self.unknown_affiliates = set()
+        self.batches = 0
+        self.errors = []
+
+    def error(self, line, message):
+        self.invalid += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line, 'error': message})
+
+    def add(self, line, record):
+        self.rows += 1
+        if isinstance(record, Exception):
+            self.error(line, str(record))
+            return
+        try:
+            lead, affiliate_code = build_lead(self.form, record)
+        except ValueError as e:
+            self.error(line, str(e))
+            return
+
+        self.pending.append((lead, affiliate_code))
+        if len(self.pending) >= self.size:
+            self.flush()
+
+    def run(self, fileobj, file_format='csv'):
+        for line, record in iter_records(fileobj, file_format):
+            self.add(line, record)
+        self.flush()
+        return self.result()
+
+    def _drop_duplicates(self, pending):
+        emails = {lead.email.lower() for lead, _ in pending}
+        existing = set()
+        if self.skip_duplicates:
+            existing = set(
+                Lead.objects.filter(form=self.form)
+                .annotate(email_lower=Lower('email'))
+                .filter(email_lower__in=emails)
+                .values_list('email_lower', flat=True)
+            )
+
+        kept = []
+        for lead, affiliate_code in pending:
+            email = lead.email.lower()
+            if self.skip_duplicates and (email in existing or email in self.seen):
+                self.duplicates += 1
+                continue
+            self.seen.add(email)
+            kept.append((lead, affiliate_code))
+        return kept
+
+    def flush(self):
+        pending, self.pending = self.pending, []
+        if not pending:
+            return
+
+        pending = self._drop_duplicates(pending)
+        self.affiliates.load(code for _, code in pending)
+
+        leads = []
+        for lead, affiliate_code in pending:
+            if affiliate_code:
+                lead.affiliate_id = self.affiliates.get(affiliate_code)
+                if lead.affiliate_id is None:
+                    self.unknown_affiliates.add(affiliate_code)
+            leads.append(lead)
+
+        if leads:
+            with transaction.atomic():
+                insert_leads(leads, size=self.size)
+            index_leads(leads)
+
+        self.created += len(leads)
+        self.batches += 1
+        if self.progress:
+            self.progress(self.result())
+
+    def result(self):
+        return {
+            'form_id': str(self.form.pk),
+            'rows': self.rows,
+            'created': self.created,
+            'duplicates': self.duplicates,
+            'invalid': self.invalid,
+            'batches': self.batches,
+            'unknown_affiliates': sorted(self.unknown_affiliates),
+            'errors': self.errors,
+        }
@@ -0,0 +1,45 @@
+# apps/leads/management/commands/backfill_lead_projections.py
+from django.core.management.base import BaseCommand
+from apps.leads.models import Lead
+from apps.leads import projection
+
+class Command(BaseCommand):
+    help = 'Materialize projected form fields into LeadFieldValue rows (run after changing projection_type)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--form',
+            help='Only backfill leads for this form id',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of leads projected per batch',
+        )
+    
+    def handle(self, *args, **options):
+        self.stdout.write('🧩 Backfilling projected form fields...')
+        
+        queryset = Lead.objects.order_by('pk').only('id', 'form_id', 'form_data')
+        if options['form']:
+            queryset = queryset.filter(form_id=options['form'])
+            projection.invalidate_form(options['form'])
+        
+        batch_size = options['batch_size']
+        batch = []
+        leads = 0
+        values = 0
+        
+        for lead in queryset.iterator(chunk_size=batch_size):
+            batch.append(lead)
+            if len(batch) >= batch_size:
+                values += projection.project_leads(batch)
+                leads += len(batch)
+                batch = []
+                self.stdout.write(f"   Projected {leads} leads...")
+        
+        values += projection.project_leads(batch)
+        leads += len(batch)
+        
+        self.stdout.write(f"✅ Backfill complete ({leads} leads, {values} values)")
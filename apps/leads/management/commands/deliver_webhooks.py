@@ -0,0 +1,10 @@
+# apps/leads/management/commands/deliver_webhooks.py
+from django.core.management.base import BaseCommand
+from apps.leads import webhooks
+
+class Command(BaseCommand):
+    help = 'Deliver every due lead webhook event now (sweeper for events whose flush job was lost)'
+    
+    def handle(self, *args, **options):
+        flushed = webhooks.flush_due()
+        self.stdout.write(self.style.SUCCESS(f'📨 Flushed {flushed} webhook subscriptions'))
@@ -0,0 +1,69 @@
+# apps/leads/management/commands/import_leads.py
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from apps.forms.models import Form
+from apps.leads import imports
+
+class Command(BaseCommand):
+    help = 'Import leads from a CSV, TSV or NDJSON file into a form'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='File to import')
+        parser.add_argument(
+            '--form',
+            required=True,
+            help='Form id the leads belong to',
+        )
+        parser.add_argument(
+            '--format',
+            dest='file_format',
+            choices=imports.FORMATS,
+            help='File format (guessed from the extension by default)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Number of leads inserted per batch',
+        )
+        parser.add_argument(
+            '--keep-duplicates',
+            action='store_true',
+            help='Import rows whose email the form already has',
+        )
+    
+    def handle(self, *args, **options):
+        try:
+            form = Form.objects.get(pk=options['form'])
+        except (Form.DoesNotExist, ValueError, ValidationError):
+            raise CommandError(f"Form not found: {options['form']}")
+        
+        file_format = options['file_format'] or imports.guess_format(options['path'])
+        self.stdout.write(f"📥 Importing {file_format} leads into '{form.name}'...")
+        
+        def progress(result):
+            self.stdout.write(
+                f"   {result['rows']} rows read, {result['created']} created, "
+                f"{result['duplicates']} duplicates, {result['invalid']} invalid"
+            )
+        
+        lead_import = imports.LeadImport(
+            form,
+            skip_duplicates=not options['keep_duplicates'],
+            size=options['batch_size'],
+            progress=progress
+        )
+        try:
+            with open(options['path'], 'rb') as fileobj:
+                result = lead_import.run(fileobj, file_format)
+        except OSError as e:
+            raise CommandError(str(e))
+        
+        for error in result['errors']:
+            self.stdout.write(f"   ⚠️  Line {error['line']}: {error['error']}")
+        if result['unknown_affiliates']:
+            self.stdout.write(f"   ⚠️  Unknown affiliate codes: {', '.join(result['unknown_affiliates'])}")
+        
+        self.stdout.write(
+            f"✅ Import complete ({result['created']} created, {result['duplicates']} duplicates, "
+            f"{result['invalid']} invalid)"
+        )
@@ -0,0 +1,46 @@
+# apps/leads/management/commands/rebuild_lead_search_index.py
+from django.core.management.base import BaseCommand
+from apps.leads.models import Lead
+from apps.leads import search, contact_search
+
+class Command(BaseCommand):
+    help = 'Build or rebuild the full-text and contact field search indexes for leads'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='Only index leads that have no search document yet',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of leads indexed per batch',
+        )
+    
+    def handle(self, *args, **options):
+        self.stdout.write('🔍 Building lead search index...')
+        search.ensure_search_backend()
+        contact_search.ensure_trigram_indexes()
+        
+        queryset = Lead.objects.order_by('pk')
+        if options['missing_only']:
+            queryset = queryset.filter(search_document__isnull=True)
+        
+        batch_size = options['batch_size']
+        batch = []
+        indexed = 0
+        
+        for lead in queryset.iterator(chunk_size=batch_size):
+            batch.append(lead)
+            if len(batch) >= batch_size:
+                indexed += search.index_leads(batch)
+                contact_search.index_contacts(batch)
+                batch = []
+                self.stdout.write(f"   Indexed {indexed} leads...")
+        
+        indexed += search.index_leads(batch)
+        contact_search.index_contacts(batch)
+        
+        self.stdout.write(f"✅ Search index ready ({indexed} leads indexed)")
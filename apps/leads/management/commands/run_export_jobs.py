@@ -0,0 +1,59 @@
+# apps/leads/management/commands/run_export_jobs.py
+from django.core.management.base import BaseCommand
+from apps.leads import export_jobs
+import time
+
+class Command(BaseCommand):
+    help = 'Run pending lead export jobs and clean up expired exports (use with EXPORT_JOB_RUNNER=worker)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Run every pending job, clean up, then exit',
+        )
+        parser.add_argument(
+            '--cleanup-only',
+            action='store_true',
+            help='Only delete expired exports and fail stuck jobs',
+        )
+        parser.add_argument(
+            '--sleep',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between polls when there is nothing to do',
+        )
+    
+    def cleanup(self):
+        removed, stuck = export_jobs.cleanup_expired()
+        if removed or stuck:
+            self.stdout.write(f"🧹 Removed {removed} expired exports, failed {stuck} stuck jobs")
+    
+    def handle(self, *args, **options):
+        if options['cleanup_only']:
+            self.cleanup()
+            return
+        
+        self.stdout.write('📦 Export worker started...')
+        last_cleanup = 0
+        
+        while True:
+            if time.monotonic() - last_cleanup > 60:
+                self.cleanup()
+                last_cleanup = time.monotonic()
+            
+            job = export_jobs.claim_next_job()
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            
+            self.stdout.write(f"   Running export {job.pk} ({job.file_format})...")
+            job = export_jobs.run_job(job)
+            if job.status == 'completed':
+                self.stdout.write(f"✅ Export {job.pk} done ({job.rows_done} rows)")
+            else:
+                self.stdout.write(f"❌ Export {job.pk} failed: {job.error}")
+        
+        self.stdout.write('✅ No pending exports')
@@ -0,0 +1,56 @@
+# apps/leads/management/commands/webhook_receiver.py
+from django.core.management.base import BaseCommand
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from apps.leads.webhooks import verify_signature
+import json
+
+class Command(BaseCommand):
+    help = 'Local stand-in endpoint that checks and prints incoming lead webhooks (for development)'
+    
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8765)
+        parser.add_argument('--secret', default='', help='Subscription secret to verify signatures with')
+        parser.add_argument(
+            '--fail',
+            type=int,
+            default=0,
+            help='Answer the first N requests with HTTP 500 to exercise retries',
+        )
+    
+    def handle(self, *args, **options):
+        command = self
+        secret = options['secret']
+        failures = {'left': options['fail']}
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+                signature = self.headers.get('X-Webhook-Signature', '')
+                
+                if secret and not verify_signature(secret, body, signature):
+                    command.stdout.write(command.style.ERROR('❌ Bad signature'))
+                    self.send_response(401)
+                elif failures['left'] > 0:
+                    failures['left'] -= 1
+                    command.stdout.write(command.style.WARNING('⚠️ Failing on purpose'))
+                    self.send_response(500)
+                else:
+                    payload = json.loads(body or b'{}')
+                    events = payload.get('events', [payload])
+                    command.stdout.write(f"📨 {self.headers.get('X-Webhook-Event')}: {len(events)} events")
+                    for event in events:
+                        command.stdout.write(f"   {event.get('event')} {json.dumps(event.get('data'))[:200]}")
+                    self.send_response(204)
+                self.end_headers()
+            
+            def log_message(self, *args):
+                pass
+        
+        server = ThreadingHTTPServer(('127.0.0.1', options['port']), Handler)
+        self.stdout.write(f"👂 Listening on http://127.0.0.1:{options['port']}/")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
@@ -1,6 +1,7 @@
 # apps/leads/models.py - FIXED VERSION
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.search import SearchVectorField
 import uuid
 
 User = get_user_model()
@@ -18,6 +19,9 @@ class Lead(models.Model):
         ('closed_lost', 'Closed Lost'),
     )
     
+    # Statuses counted as conversions in affiliate / assignment stats
+    CONVERSION_STATUSES = ('qualified', 'demo_completed', 'closed_won')
+    
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     
     # Use string references to avoid circular imports
@@ -68,6 +72,8 @@ class Lead(models.Model):
             models.Index(fields=['status']),
             models.Index(fields=['created_at']),
             models.Index(fields=['affiliate']),
+            # Keyset order of the change feed (apps.leads.change_feed)
+            models.Index(fields=['updated_at', 'id']),
         ]
     
     def __str__(self):
@@ -83,9 +89,291 @@ class LeadNote(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     note = models.TextField()
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['updated_at', 'id']),
+        ]
     
     def __str__(self):
         return f"Note for {self.lead.email} by {self.user.username}"
+
+
+class LeadStatusChange(models.Model):
+    """History of lead status changes"""
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='status_changes')
+    from_status = models.CharField(max_length=20, choices=Lead.STATUS_CHOICES)
+    to_status = models.CharField(max_length=20, choices=Lead.STATUS_CHOICES)
+    changed_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    changed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-changed_at']
+        indexes = [
+            models.Index(fields=['lead', 'changed_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.lead_id}: {self.from_status} -> {self.to_status}"
+
+
+class LeadSearchDocument(models.Model):
+    """Searchable text for a lead, maintained by apps.leads.search"""
+    lead = models.OneToOneField(
+        Lead,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='search_document'
+    )
+    document = models.TextField(blank=True)
+    # Only populated on PostgreSQL (GIN indexed, see search.ensure_search_backend)
+    search_vector = SearchVectorField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"Search document for {self.lead_id}"
+
+
+class LeadContactToken(models.Model):
+    """
+    Suffixes of a lead's normalized email / name / phone.
+
+    Used for substring search on databases without pg_trgm: "%gmail%"
+    becomes a btree prefix scan on token (see apps.leads.contact_search).
+    """
+    FIELD_CHOICES = (
+        ('email', 'Email'),
+        ('name', 'Name'),
+        ('phone', 'Phone'),
+    )
+    
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='contact_tokens')
+    field = models.CharField(max_length=10, choices=FIELD_CHOICES)
+    token = models.CharField(max_length=32)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['token']),
+            models.Index(fields=['lead', 'field']),
+        ]
+    
+    def __str__(self):
+        return f"{self.field}:{self.token}"
+
+
+class LeadFieldValue(models.Model):
+    """
+    Typed copy of one projected form_data answer (see apps.leads.projection).
+
+    Only fields with FormField.projection_type set are materialized. Every
+    value is kept as text for grouping plus in its typed column for ranges.
+    """
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='field_values')
+    form = models.ForeignKey('forms.Form', on_delete=models.CASCADE, related_name='lead_field_values')
+    key = models.CharField(max_length=100)
+    value_text = models.CharField(max_length=255, blank=True)
+    value_number = models.FloatField(null=True, blank=True)
+    value_boolean = models.BooleanField(null=True, blank=True)
+    value_date = models.DateField(null=True, blank=True)
+    
+    class Meta:
+        unique_together = ['lead', 'key']
+        indexes = [
+            models.Index(fields=['key', 'value_text']),
+            models.Index(fields=['key', 'value_number']),
+            models.Index(fields=['key', 'value_boolean']),
+            models.Index(fields=['key', 'value_date']),
+            models.Index(fields=['form', 'key', 'value_text']),
+        ]
+    
+    def __str__(self):
+        return f"{self.key}={self.value_text}"
+
+
+class ExportJob(models.Model):
+    """
+    Lead export run in the background (see apps.leads.export_jobs).
+
+    Identical requests from the same scope share a job through filter_hash
+    while it is pending or running.
+    """
+    STATUS_CHOICES = (
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('completed', 'Completed'),
+        ('failed', 'Failed'),
+    )
+    FORMAT_CHOICES = (
+        ('csv', 'CSV'),
+        ('tsv', 'TSV'),
+        ('ndjson', 'NDJSON'),
+        ('xlsx', 'Excel'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='export_jobs')
+    
+    # Which leads are exported: the requester's visibility plus the query filters
+    scope = models.CharField(max_length=50)
+    filters = models.JSONField(default=dict)
+    file_format = models.CharField(max_length=10, choices=FORMAT_CHOICES, default='xlsx')
+    filter_hash = models.CharField(max_length=64, db_index=True)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending')
+    rows_total = models.PositiveIntegerField(null=True, blank=True)
+    rows_done = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True)
+    
+    # Artifact in export storage
+    file_name = models.CharField(max_length=255, blank=True)
+    file_size = models.PositiveBigIntegerField(null=True, blank=True)
+    download_name = models.CharField(max_length=255, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+            models.Index(fields=['filter_hash', 'status']),
+            models.Index(fields=['expires_at']),
+        ]
+        constraints = [
+            # One pending / running job per hash, however many requests race
+            models.UniqueConstraint(
+                fields=['filter_hash'],
+                condition=models.Q(status__in=['pending', 'running']),
+                name='unique_active_export_job',
+            ),
+        ]
+    
+    def __str__(self):
+        return f"{self.file_format} export {self.id} ({self.status})"
+    
+    @property
+    def progress(self):
+        if not self.rows_total:
+            return 100 if self.status == 'completed' else 0
+        return min(100, round(self.rows_done * 100 / self.rows_total))
+
+
+def _webhook_secret():
+    import secrets
+    return secrets.token_hex(32)
+
+
+class WebhookSubscription(models.Model):
+    """
+    Endpoint notified of lead events (see apps.leads.webhooks).
+
+    Scoped to one form and/or one affiliate; leaving both empty subscribes
+    to every lead. An empty ``events`` list means every event.
+    """
+    EVENT_CHOICES = (
+        ('lead.created', 'Lead created'),
+        ('lead.status_changed', 'Lead status changed'),
+    )
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    name = models.CharField(max_length=200, blank=True)
+    url = models.URLField(max_length=500)
+    # Shared secret for the X-Webhook-Signature HMAC
+    secret = models.CharField(max_length=64, default=_webhook_secret)
+    
+    form = models.ForeignKey(
+        'forms.Form',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='webhook_subscriptions'
+    )
+    affiliate = models.ForeignKey(
+        'affiliates.Affiliate',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='webhook_subscriptions'
+    )
+    events = models.JSONField(default=list, blank=True)
+    
+    # Events per POST; above 1 events are grouped for WEBHOOK_BATCH_WINDOW seconds
+    batch_size = models.PositiveSmallIntegerField(default=1)
+    
+    is_active = models.BooleanField(default=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['is_active', 'form']),
+            models.Index(fields=['is_active', 'affiliate']),
+        ]
+    
+    def __str__(self):
+        return self.name or self.url
+
+
+class WebhookDelivery(models.Model):
+    """One event waiting to be delivered; deleted once the endpoint accepts it"""
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='deliveries')
+    event = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField()
+    last_error = models.TextField(blank=True)
+    
+    # Set while a sender holds the row
+    claim = models.UUIDField(null=True, blank=True)
+    claimed_until = models.DateTimeField(null=True, blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['created_at']
+        indexes = [
+            models.Index(fields=['subscription', 'next_attempt_at']),
+            models.Index(fields=['claim']),
+        ]
+    
+    def __str__(self):
+        return f"{self.event} -> {self.subscription_id} (attempt {self.attempts})"
+
+
+class WebhookDeadLetter(models.Model):
+    """Event given up on after WEBHOOK_MAX_ATTEMPTS; can be replayed"""
+    subscription = models.ForeignKey(WebhookSubscription, on_delete=models.CASCADE, related_name='dead_letters')
+    event = models.CharField(max_length=50)
+    payload = models.JSONField(default=dict)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField()
+    failed_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-failed_at']
+    
+    def __str__(self):
+        return f"{self.event} -> {self.subscription_id} (dead)"
+
+
+class LeadSubmissionKey(models.Model):
+    """Idempotency key of a lead posted through the batch submission API"""
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='lead_submission_keys')
+    key = models.CharField(max_length=255)
+    lead = models.ForeignKey(Lead, on_delete=models.CASCADE, related_name='submission_keys')
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        ordering = ['-created_at']
+        unique_together = ['user', 'key']
+    
+    def __str__(self):
+        return f"{self.user_id}:{self.key} -> {self.lead_id}"
@@ -0,0 +1,262 @@
+# apps/leads/parallel_export.py - Partitioned lead exports over a process pool
+"""
+Render large exports on several cores.
+
+The filtered lead set is cut into ``created_at`` ranges holding roughly the
+same number of rows. Each range is rendered by a ProcessPoolExecutor worker
+(spawned, so it sets Django up and opens its own DB connection) into a part
+file, and the parts are joined in order, newest first like every export.
+
+- csv / tsv / ndjson: each part is a gzip member; concatenated gzip members
+  are one valid gzip stream, so joining is a plain byte copy
+- xlsx: each part is a run of <sheetData> rows written without row / cell
+  references (both optional in SpreadsheetML, positions follow document
+  order), so the parts are spliced one after another into the single
+  "Leads Export" sheet, as in a sequential export
+
+Columns (form_data keys) are worked out once up front and handed to every
+worker so all parts line up.
+"""
+from django.conf import settings
+from django.db import connections
+from django.db.models import F
+from multiprocessing import get_context
+from concurrent.futures import ProcessPoolExecutor
+from openpyxl import Workbook
+from xml.sax.saxutils import escape
+from . import exports
+import csv
+import gzip
+import io
+import logging
+import os
+import shutil
+import tempfile
+import zipfile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MIN_ROWS = 50000
+COPY_BUFFER_SIZE = 1024 * 1024
+
+SHEET_NAME = 'xl/worksheets/sheet1.xml'
+SHEET_DATA_END = '</sheetData>'
+
+
+def worker_count():
+    default = min(4, os.cpu_count() or 1)
+    return getattr(settings, 'EXPORT_PARALLEL_WORKERS', default)
+
+
+def should_parallelize(rows_total):
+    min_rows = getattr(settings, 'EXPORT_PARALLEL_MIN_ROWS', DEFAULT_MIN_ROWS)
+    return worker_count() > 1 and rows_total is not None and rows_total >= min_rows
+
+
+def partition_bounds(queryset, parts):
+    """
+    ``[(lower, upper), ...]`` created_at ranges, newest first.
+
+    ``lower`` is inclusive and ``upper`` exclusive (None is open ended), so
+    every lead falls in exactly one range even when timestamps repeat.
+    """
+    total = queryset.count()
+    if parts <= 1 or total == 0:
+        return [(None, None)]
+
+    ordered = queryset.order_by('-created_at').values_list('created_at', flat=True)
+    cuts = []
+    for index in range(1, parts):
+        cut = ordered[total * index // parts]
+        if not cuts or cut < cuts[-1]:
+            cuts.append(cut)
+
+    bounds = [(cuts[0], None)]
+    for newer, older in zip(cuts, cuts[1:]):
+        bounds.append((older, newer))
+    bounds.append((None, cuts[-1]))
+    return bounds
+
+
+def _init_worker():
+    import django
+    django.setup()
+
+
+def _partition_queryset(task):
+    from django.contrib.auth import get_user_model
+
+    user = get_user_model().objects.get(pk=task['user_id'])
+    queryset = exports.export_queryset(user, task['filters'])
+    lower, upper = task['bounds']
+    if lower is not None:
+        queryset = queryset.filter(created_at__gte=lower)
+    if upper is not None:
+        queryset = queryset.filter(created_at__lt=upper)
+    return queryset
+
+
+def _job_progress(job_id):
+    """Progress callback adding each worker's rows to the job's rows_done"""
+    from .models import ExportJob
+
+    reported = [0]
+
+    def progress(rows_done):
+        delta = rows_done - reported[0]
+        if delta:
+            ExportJob.objects.filter(pk=job_id).update(rows_done=F('rows_done') + delta)
+            reported[0] = rows_done
+
+    return progress
+
+
+def _write_delimited_part(queryset, task, fileobj, progress):
+    writer = csv.writer(exports.Echo(), delimiter=exports.DELIMITERS[task['file_format']])
+    rows = exports.iter_rows(queryset, task['keys'], progress=progress)
+    next(rows)  # the parent writes the header once
+    with gzip.GzipFile(fileobj=fileobj, mode='wb') as archive:
+        for row in rows:
+            archive.write(writer.writerow(row).encode('utf-8'))
+
+
+def _write_ndjson_part(queryset, task, fileobj, progress):
+    with gzip.GzipFile(fileobj=fileobj, mode='wb') as archive:
+        for line in exports.stream_ndjson(queryset, progress=progress):
+            archive.write(line.encode('utf-8'))
+
+
+def _cell_xml(value):
+    if value in (None, ''):
+        # Keeps the following cells in their columns
+        return '<c/>'
+    text = exports._clean(str(value))
+    space = ' xml:space="preserve"' if text != text.strip() else ''
+    return f'<c t="inlineStr"><is><t{space}>{escape(text)}</t></is></c>'
+
+
+def _write_sheet_part(queryset, task, fileobj, progress):
+    """Worksheet <row> elements (header excluded); returns sampled widths"""
+    rows = exports.iter_rows(queryset, task['keys'], other_column=False, progress=progress)
+    headers = next(rows)
+
+    sample = []
+    out = io.TextIOWrapper(fileobj, encoding='utf-8')
+    for row in rows:
+        if len(sample) < exports.WIDTH_SAMPLE_ROWS:
+            sample.append(row)
+        out.write(f'<row>{"".join(_cell_xml(value) for value in row)}</row>')
+    out.flush()
+    out.detach()
+
+    return exports.column_widths(headers, sample)
+
+
+PART_WRITERS = {
+    'csv': _write_delimited_part,
+    'tsv': _write_delimited_part,
+    'ndjson': _write_ndjson_part,
+    'xlsx': _write_sheet_part,
+}
+
+
+def _render_part(task):
+    """Worker entry point: render one partition into its part file"""
+    try:
+        queryset = _partition_queryset(task)
+        progress = _job_progress(task['job_id']) if task.get('job_id') else None
+        with open(task['path'], 'wb') as fileobj:
+            widths = PART_WRITERS[task['file_format']](queryset, task, fileobj, progress)
+        return task['path'], widths
+    finally:
+        connections.close_all()
+
+
+def _copy(path, destination):
+    with open(path, 'rb') as source:
+        shutil.copyfileobj(source, destination, COPY_BUFFER_SIZE)
+
+
+def _join_gzip(parts, header, fileobj):
+    """Header member followed by every part member, byte for byte"""
+    fileobj.write(gzip.compress(header.encode('utf-8')))
+    for path, _ in parts:
+        _copy(path, fileobj)
+
+
+def _join_sheets(parts, headers, fileobj):
+    """One worksheet: a write-only template with every part's rows spliced in"""
+    template = io.BytesIO()
+    wb = Workbook(write_only=True)
+    # Widths from the newest rows, like write_xlsx samples its leading rows
+    exports.add_sheet(wb, "Leads Export", headers, parts[0][1])
+    wb.save(template)
+
+    with zipfile.ZipFile(template) as source, \
+            zipfile.ZipFile(fileobj, 'w', zipfile.ZIP_DEFLATED) as target:
+        for item in source.infolist():
+            data = source.read(item.filename)
+            if item.filename != SHEET_NAME:
+                target.writestr(item, data)
+                continue
+
+            head, tail = data.decode('utf-8').split(SHEET_DATA_END, 1)
+            with target.open(item.filename, 'w', force_zip64=True) as sheet:
+                sheet.write(head.encode('utf-8'))
+                for path, _ in parts:
+                    _copy(path, sheet)
+                sheet.write((SHEET_DATA_END + tail).encode('utf-8'))
+
+
+def write_parallel(user, filters, file_format, fileobj, workers=None, job_id=None):
+    """
+    Render an export on a process pool into ``fileobj``.
+
+    CSV / TSV / NDJSON come out gzipped, XLSX as a single-sheet workbook.
+    Returns the number of partitions used.
+    """
+    workers = workers or worker_count()
+    queryset = exports.export_queryset(user, filters)
+
+    if file_format == 'xlsx':
+        keys = exports.form_data_key_union(queryset)
+    elif file_format == 'ndjson':
+        keys = []
+    else:
+        keys = exports.form_data_keys(queryset)
+    headers = next(exports.iter_rows(queryset.none(), keys, other_column=file_format != 'xlsx'))
+
+    bounds = partition_bounds(queryset, workers)
+
+    with tempfile.TemporaryDirectory(prefix='lead-export-') as directory:
+        tasks = [{
+            'user_id': user.pk,
+            'filters': filters,
+            'file_format': file_format,
+            'keys': keys,
+            'bounds': part_bounds,
+            'path': os.path.join(directory, f'part-{index:04d}'),
+            'job_id': job_id,
+        } for index, part_bounds in enumerate(bounds)]
+
+        # Don't hand open connections to the pool
+        connections.close_all()
+        with ProcessPoolExecutor(
+            max_workers=min(workers, len(tasks)),
+            mp_context=get_context('spawn'),
+            initializer=_init_worker
+        ) as pool:
+            # map() yields results in task order, i.e. newest partition first
+            parts = list(pool.map(_render_part, tasks))
+
+        if file_format == 'xlsx':
+            _join_sheets(parts, headers, fileobj)
+        elif file_format == 'ndjson':
+            for path, _ in parts:
+                _copy(path, fileobj)
+        else:
+            writer = csv.writer(exports.Echo(), delimiter=exports.DELIMITERS[file_format])
+            _join_gzip(parts, '\ufeff' + writer.writerow(headers), fileobj)
+
+    logger.info(f"Parallel {file_format} export finished in {len(bounds)} partitions")
+    return len(bounds)
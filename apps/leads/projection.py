@@ -0,0 +1,213 @@
+# apps/leads/projection.py - Typed, indexed projection of form_data answers
+"""
+Materializes selected form_data answers into LeadFieldValue rows.
+
+A FormField opts in by setting ``projection_type``. When a lead is written
+its answers for those fields are copied into a narrow key/value table with
+typed columns (text, number, boolean, date) and per-key indexes, so filters
+like "company size = 11-50" or "budget >= 5000" never decode form_data.
+
+Query params understood by ``filter_by_fields``:
+
+    ?field.company-size=11-50           exact match on the text value
+    ?field.company-size__in=1-10,11-50  any of several values
+    ?field.budget__gte=5000             number (or date) ranges: gt/gte/lt/lte
+"""
+from django.core.cache import cache
+from django.db import router
+from django.db.models import Count, Exists, OuterRef
+from django.utils.dateparse import parse_date
+import logging
+
+logger = logging.getLogger(__name__)
+
+FIELD_PARAM_PREFIX = 'field.'
+RANGE_LOOKUPS = ('gt', 'gte', 'lt', 'lte')
+PROJECTION_CACHE_TIMEOUT = 3600
+MAX_TEXT_LENGTH = 255
+VALUE_COLUMNS = ('value_text', 'value_number', 'value_boolean', 'value_date')
+
+TRUE_VALUES = {'1', 'true', 'yes', 'on', 'y', 't'}
+FALSE_VALUES = {'0', 'false', 'no', 'off', 'n', 'f'}
+
+
+def _value_model():
+    from .models import LeadFieldValue
+    return LeadFieldValue
+
+
+def _cache_key(form_id):
+    return f'form_projection:{form_id}'
+
+
+def projected_fields(form_id):
+    """{data_key: projection_type} for a form, cached until its fields change"""
+    from apps.forms.models import FormField
+
+    key = _cache_key(form_id)
+    fields = cache.get(key)
+    if fields is None:
+        fields = {
+            field.data_key: field.projection_type
+            for field in FormField.objects.filter(form_id=form_id).exclude(projection_type='')
+        }
+        cache.set(key, fields, PROJECTION_CACHE_TIMEOUT)
+    return fields
+
+
+def invalidate_form(form_id):
+    cache.delete(_cache_key(form_id))
+
+
+def _scalar(value):
+    # request.POST submissions store every answer as a list
+    if isinstance(value, (list, tuple)):
+        value = value[0] if value else None
+    if value is None:
+        return ''
+    return str(value).strip()
+
+
+def coerce(raw, projection_type):
+    """Return the typed column values for one answer"""
+    text = _scalar(raw)
+    values = {
+        'value_text': text[:MAX_TEXT_LENGTH],
+        'value_number': None,
+        'value_boolean': None,
+        'value_date': None,
+    }
+    if not text:
+        return values
+
+    if projection_type == 'number':
+        try:
+            values['value_number'] = float(text.replace(',', ''))
+        except ValueError:
+            pass
+    elif projection_type == 'boolean':
+        if text.lower() in TRUE_VALUES:
+            values['value_boolean'] = True
+        elif text.lower() in FALSE_VALUES:
+            values['value_boolean'] = False
+    elif projection_type == 'date':
+        try:
+            values['value_date'] = parse_date(text)
+        except ValueError:
+            pass
+
+    return values
+
+
+def build_values(lead):
+    """Unsaved LeadFieldValue rows for a lead's projected answers"""
+    LeadFieldValue = _value_model()
+    form_data = lead.form_data or {}
+    rows = []
+    for key, projection_type in projected_fields(lead.form_id).items():
+        if key not in form_data:
+            continue
+        rows.append(LeadFieldValue(
+            lead_id=lead.pk,
+            form_id=lead.form_id,
+            key=key,
+            **coerce(form_data[key], projection_type)
+        ))
+    return rows
+
+
+def project_leads(leads, using=None):
+    """
+    Sync the projected values for the given leads.
+
+    Only the difference is written, so saving a lead whose projected answers
+    did not change (a status update, a note) costs a single SELECT.
+    """
+    leads = list(leads)
+    if not leads:
+        return 0
+
+    LeadFieldValue = _value_model()
+    using = using or router.db_for_write(LeadFieldValue)
+
+    wanted = {lead.pk: {row.key: row for row in build_values(lead)} for lead in leads}
+    existing = {pk: {} for pk in wanted}
+    for row in LeadFieldValue.objects.using(using).filter(lead_id__in=wanted.keys()):
+        existing[row.lead_id][row.key] = row
+
+    stale_ids = []
+    changed = []
+    new_rows = []
+    for lead_id, rows in wanted.items():
+        current = existing[lead_id]
+        stale_ids.extend(row.pk for key, row in current.items() if key not in rows)
+        for key, row in rows.items():
+            if key not in current:
+                new_rows.append(row)
+                continue
+            stored = current[key]
+            if any(getattr(stored, column) != getattr(row, column) for column in VALUE_COLUMNS):
+                for column in VALUE_COLUMNS:
+                    setattr(stored, column, getattr(row, column))
+                changed.append(stored)
+
+    if stale_ids:
+        LeadFieldValue.objects.using(using).filter(id__in=stale_ids).delete()
+    if changed:
+        LeadFieldValue.objects.using(using).bulk_update(changed, VALUE_COLUMNS, batch_size=1000)
+    if new_rows:
+        LeadFieldValue.objects.using(using).bulk_create(new_rows, batch_size=1000)
+    return sum(len(rows) for rows in wanted.values())
+
+
+def _parse_range_value(value):
+    """Range filters compare numbers when possible, else dates"""
+    try:
+        return 'value_number', float(value)
+    except ValueError:
+        pass
+    try:
+        parsed = parse_date(value)
+    except ValueError:
+        parsed = None
+    if parsed:
+        return 'value_date', parsed
+    return None, None
+
+
+def filter_by_fields(queryset, params):
+    """Apply ``field.<key>[__lookup]`` query params to a Lead queryset"""
+    LeadFieldValue = _value_model()
+
+    for param, value in params.items():
+        if not param.startswith(FIELD_PARAM_PREFIX) or value == '':
+            continue
+
+        key, _, lookup = param[len(FIELD_PARAM_PREFIX):].partition('__')
+        conditions = {'lead': OuterRef('pk'), 'key': key}
+
+        if lookup in RANGE_LOOKUPS:
+            column, parsed = _parse_range_value(value)
+            if column is None:
+                return queryset.none()
+            conditions[f'{column}__{lookup}'] = parsed
+        elif lookup == 'in':
+            conditions['value_text__in'] = [v.strip() for v in value.split(',')]
+        elif lookup in ('', 'exact'):
+            conditions['value_text'] = value
+        else:
+            continue
+
+        queryset = queryset.filter(Exists(LeadFieldValue.objects.filter(**conditions)))
+
+    return queryset
+
+
+def field_breakdown(queryset, key, limit=50):
+    """Lead counts per answer for one projected field, over a Lead queryset"""
+    return list(
+        _value_model().objects.filter(lead__in=queryset.order_by().values('pk'), key=key)
+        .values('value_text')
+        .annotate(count=Count('id'))
+        .order_by('-count')[:limit]
+    )
@@ -0,0 +1,219 @@
+# apps/leads/search.py - Full-text lead search
+"""
+Full-text search over leads.
+
+Each lead has a LeadSearchDocument holding the text we search on (contact
+fields, UTM values and every value in form_data). The document is rebuilt
+whenever a lead is saved, so searching never has to decode form_data.
+
+- PostgreSQL: the document is compiled into a tsvector column with a GIN index
+- SQLite: the document is mirrored into an FTS5 virtual table
+- Anything else: icontains over the stored document (no JSON casting)
+
+Searches also match email / name / phone fragments through
+apps.leads.contact_search, since full-text terms only match word prefixes.
+"""
+from django.db import connections, router
+from django.db.models import F, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from .contact_search import contact_match_q
+import logging
+import re
+import uuid
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = 'simple'
+FTS_TABLE = 'leads_lead_fts'
+GIN_INDEX = 'leads_searchdoc_vector_gin'
+
+MAX_QUERY_TERMS = 8
+
+_fts_ready = set()
+
+
+def _document_model():
+    from .models import LeadSearchDocument
+    return LeadSearchDocument
+
+
+def _flatten(value):
+    """Yield every scalar inside a form_data value as text"""
+    if value is None or value == '':
+        return
+    if isinstance(value, dict):
+        for item in value.values():
+            yield from _flatten(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _flatten(item)
+    else:
+        yield str(value)
+
+
+def build_document(lead):
+    """Build the searchable text for a single lead"""
+    parts = [lead.email, lead.name, lead.phone]
+
+    # Index the pieces of the email too so "gmail" or "john" find john@gmail.com
+    if lead.email:
+        parts.append(re.sub(r'[@.+_-]+', ' ', lead.email))
+
+    parts.extend([lead.utm_source, lead.utm_medium, lead.utm_campaign])
+    parts.extend(_flatten(lead.form_data or {}))
+
+    return ' '.join(part for part in parts if part)
+
+
+def query_terms(term):
+    """Split user input into search terms safe to hand to tsquery / FTS5"""
+    return re.findall(r'\w+', (term or '').lower())[:MAX_QUERY_TERMS]
+
+
+def _vendor(using):
+    return connections[using].vendor
+
+
+def ensure_search_backend(using='default'):
+    """Create the backend specific search structures (safe to call repeatedly)"""
+    connection = connections[using]
+    table = _document_model()._meta.db_table
+
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(
+                f'CREATE INDEX IF NOT EXISTS {GIN_INDEX} ON {table} USING GIN (search_vector)'
+            )
+        elif connection.vendor == 'sqlite':
+            cursor.execute(
+                f'CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} '
+                f'USING fts5(lead_id UNINDEXED, document)'
+            )
+            _fts_ready.add(using)
+
+
+def _fts_available(using):
+    """True when the SQLite FTS5 table exists (FTS5 may be compiled out)"""
+    if using in _fts_ready:
+        return True
+    try:
+        ensure_search_backend(using)
+    except Exception as e:
+        logger.warning(f"SQLite FTS5 unavailable, falling back to icontains search: {e}")
+        return False
+    return True
+
+
+def index_leads(leads, using=None):
+    """Create or refresh the search documents for the given leads"""
+    leads = list(leads)
+    if not leads:
+        return 0
+
+    LeadSearchDocument = _document_model()
+    using = using or router.db_for_write(LeadSearchDocument)
+
+    documents = {lead.pk: build_document(lead) for lead in leads}
+    LeadSearchDocument.objects.using(using).bulk_create(
+        [LeadSearchDocument(lead_id=pk, document=text) for pk, text in documents.items()],
+        update_conflicts=True,
+        unique_fields=['lead'],
+        update_fields=['document', 'updated_at'],
+    )
+
+    vendor = _vendor(using)
+    if vendor == 'postgresql':
+        LeadSearchDocument.objects.using(using).filter(lead_id__in=documents.keys()).update(
+            search_vector=SearchVector('document', config=SEARCH_CONFIG)
+        )
+    elif vendor == 'sqlite' and _fts_available(using):
+        keys = [pk.hex for pk in documents]
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE lead_id IN ({", ".join(["%s"] * len(keys))})',
+                keys
+            )
+            cursor.executemany(
+                f'INSERT INTO {FTS_TABLE} (lead_id, document) VALUES (%s, %s)',
+                [(pk.hex, text) for pk, text in documents.items()]
+            )
+
+    return len(documents)
+
+
+def index_lead(lead, using=None):
+    """Refresh the search document for one lead"""
+    return index_leads([lead], using=using)
+
+
+def remove_leads(lead_ids, using=None):
+    """Drop leads from the search index (documents cascade with the lead)"""
+    lead_ids = list(lead_ids)
+    using = using or router.db_for_write(_document_model())
+    if not lead_ids or _vendor(using) != 'sqlite' or not _fts_available(using):
+        return
+
+    keys = [uuid.UUID(str(pk)).hex for pk in lead_ids]
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE lead_id IN ({", ".join(["%s"] * len(keys))})',
+            keys
+        )
+
+
+def _unranked(queryset):
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+def search_leads(queryset, term):
+    """
+    Filter a Lead queryset down to leads matching ``term``.
+
+    Every term is prefix matched ("jo gma" finds john@gmail.com), the raw
+    term is also substring matched against email / name / phone, and the
+    returned queryset is annotated with ``search_rank`` (higher is better).
+    """
+    terms = query_terms(term)
+    if not terms:
+        return _unranked(queryset)
+
+    vendor = _vendor(queryset.db)
+    contact_q = contact_match_q(term, queryset.db)
+
+    if vendor == 'postgresql':
+        query = SearchQuery(
+            ' & '.join(f'{t}:*' for t in terms),
+            search_type='raw',
+            config=SEARCH_CONFIG
+        )
+        return queryset.filter(Q(search_document__search_vector=query) | contact_q).annotate(
+            search_rank=Coalesce(
+                SearchRank(F('search_document__search_vector'), query),
+                Value(0.0),
+                output_field=FloatField()
+            )
+        )
+
+    if vendor == 'sqlite' and _fts_available(queryset.db):
+        # Match inside the leads query (not a capped id list pulled into
+        # Python), so counts and every page see all matches
+        match = ' '.join(f'"{t}"*' for t in terms)
+        lead_id = f'"{queryset.model._meta.db_table}"."id"'
+        matched = RawSQL(f'SELECT lead_id FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        # bm25() is lower-is-better, flip it so ranks sort like ts_rank
+        rank = RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND lead_id = {lead_id}',
+            [match],
+            output_field=FloatField()
+        )
+        return queryset.filter(Q(id__in=matched) | contact_q).annotate(
+            search_rank=Coalesce(rank, Value(0.0), output_field=FloatField())
+        )
+
+    document_q = Q()
+    for t in terms:
+        document_q &= Q(search_document__document__icontains=t)
+    return _unranked(queryset.filter(document_q | contact_q))
@@ -1,6 +1,9 @@
 # apps/leads/serializers.py
 from rest_framework import serializers
-from .models import Lead, LeadNote
+from django.urls import reverse
+from .models import Lead, LeadNote, ExportJob, WebhookSubscription, WebhookDeadLetter
+from .webhooks import MAX_BATCH_SIZE
+from .fieldsets import EXPANDABLE_FIELDS
 
 class LeadNoteSerializer(serializers.ModelSerializer):
     user_name = serializers.CharField(source='user.username', read_only=True)
@@ -11,6 +14,12 @@ class LeadNoteSerializer(serializers.ModelSerializer):
         read_only_fields = ('user', 'created_at')
 
 class LeadSerializer(serializers.ModelSerializer):
+    """
+    Lead with optional sparse fieldsets.
+    
+    Pass ``fields`` to limit the output and ``expand`` to include nested
+    notes, which are left out by default (see apps.leads.fieldsets).
+    """
     lead_notes = LeadNoteSerializer(many=True, read_only=True)
     affiliate_code = serializers.CharField(read_only=True)
     form_name = serializers.CharField(source='form.name', read_only=True)
@@ -19,3 +28,65 @@ class LeadSerializer(serializers.ModelSerializer):
         model = Lead
         fields = '__all__'
         read_only_fields = ('id', 'created_at', 'updated_at')
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        expand = kwargs.pop('expand', ())
+        super().__init__(*args, **kwargs)
+        
+        for name in EXPANDABLE_FIELDS:
+            if name not in expand:
+                self.fields.pop(name, None)
+        
+        if fields:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    progress = serializers.IntegerField(read_only=True)
+    download_url = serializers.SerializerMethodField()
+    
+    class Meta:
+        model = ExportJob
+        fields = (
+            'id', 'status', 'file_format', 'filters', 'rows_total', 'rows_done',
+            'progress', 'error', 'file_size', 'download_url',
+            'created_at', 'started_at', 'finished_at', 'expires_at',
+        )
+        read_only_fields = fields
+    
+    def get_download_url(self, obj):
+        if obj.status != 'completed':
+            return None
+        url = reverse('export_job_download', args=[obj.pk])
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
+
+class WebhookSubscriptionSerializer(serializers.ModelSerializer):
+    pending_events = serializers.IntegerField(read_only=True, default=None)
+    dead_letter_count = serializers.IntegerField(read_only=True, default=None)
+    
+    class Meta:
+        model = WebhookSubscription
+        fields = (
+            'id', 'name', 'url', 'secret', 'form', 'affiliate', 'events', 'batch_size',
+            'is_active', 'pending_events', 'dead_letter_count', 'created_by', 'created_at', 'updated_at',
+        )
+        read_only_fields = ('id', 'secret', 'created_by', 'created_at', 'updated_at')
+    
+    def validate_events(self, value):
+        known = dict(WebhookSubscription.EVENT_CHOICES)
+        if not isinstance(value, list) or any(event not in known for event in value):
+            raise serializers.ValidationError(f"Events must be a list of: {', '.join(known)}")
+        return sorted(set(value))
+    
+    def validate_batch_size(self, value):
+        if not 1 <= value <= MAX_BATCH_SIZE:
+            raise serializers.ValidationError(f'Batch size must be between 1 and {MAX_BATCH_SIZE}')
+        return value
+
+class WebhookDeadLetterSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = WebhookDeadLetter
+        fields = ('id', 'event', 'payload', 'attempts', 'last_error', 'created_at', 'failed_at')
+        read_only_fields = fields
@@ -0,0 +1,53 @@
+# apps/leads/signals.py - Keep lead search indexes in sync
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from apps.forms.models import FormField
+from .models import Lead
+from . import search, contact_search, projection, webhooks
+import logging
+
+logger = logging.getLogger(__name__)
+
+@receiver(post_save, sender=Lead)
+def update_lead_search_document(sender, instance, raw=False, using=None, **kwargs):
+    """Re-index a lead whenever it is created or edited"""
+    if raw:
+        return
+    try:
+        search.index_lead(instance, using=using)
+    except Exception as e:
+        # Never fail a submission because the search index is behind
+        logger.error(f"Error indexing lead {instance.pk} for search: {e}")
+    
+    try:
+        contact_search.index_contacts([instance], using=using)
+    except Exception as e:
+        logger.error(f"Error indexing contact fields for lead {instance.pk}: {e}")
+    
+    try:
+        projection.project_leads([instance], using=using)
+    except Exception as e:
+        logger.error(f"Error projecting form data for lead {instance.pk}: {e}")
+
+@receiver(post_save, sender=Lead)
+def queue_lead_created_webhooks(sender, instance, created=False, raw=False, **kwargs):
+    """Status changes are sent by bulk.record_status_changes"""
+    if raw or not created:
+        return
+    try:
+        webhooks.leads_created([instance])
+    except Exception as e:
+        logger.error(f"Error queueing webhooks for lead {instance.pk}: {e}")
+
+@receiver(post_delete, sender=Lead)
+def remove_lead_search_document(sender, instance, using=None, **kwargs):
+    try:
+        search.remove_leads([instance.pk], using=using)
+    except Exception as e:
+        logger.error(f"Error removing lead {instance.pk} from search: {e}")
+
+@receiver(post_save, sender=FormField)
+@receiver(post_delete, sender=FormField)
+def invalidate_form_projection(sender, instance, **kwargs):
+    """Projected field definitions are cached per form"""
+    projection.invalidate_form(instance.form_id)
@@ -5,9 +5,16 @@ from . import views
 
 router = DefaultRouter()
 router.register(r'leads', views.LeadViewSet)
+router.register(r'webhooks', views.WebhookSubscriptionViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('import/', views.LeadImportView.as_view(), name='import_leads'),
+    path('submit/batch/', views.LeadBatchSubmitView.as_view(), name='batch_submit_leads'),
     path('export/', views.ExportLeadsView.as_view(), name='export_leads'),
+    path('export/jobs/', views.ExportJobListView.as_view(), name='export_jobs'),
+    path('export/jobs/<uuid:job_id>/', views.ExportJobDetailView.as_view(), name='export_job_detail'),
+    path('export/jobs/<uuid:job_id>/download/', views.ExportJobDownloadView.as_view(), name='export_job_download'),
+    path('changes/', views.ChangeFeedView.as_view(), name='lead_changes'),
     path('stats/', views.LeadStatsView.as_view(), name='lead_stats'),
 ]
@@ -4,18 +4,26 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from rest_framework.permissions import IsAuthenticated
-from django.http import HttpResponse
-from django.db.models import Q, Count
+from rest_framework.parsers import MultiPartParser
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.db.models import Count
 from django.utils import timezone
 from datetime import timedelta
-from .models import Lead, LeadNote
-from .serializers import LeadSerializer, LeadNoteSerializer
+from .models import Lead, LeadNote, WebhookSubscription
+from .serializers import (
+    LeadSerializer, LeadNoteSerializer, ExportJobSerializer,
+    WebhookSubscriptionSerializer, WebhookDeadLetterSerializer
+)
+from .search import search_leads
+from . import projection, exports, export_jobs, change_feed, bulk, imports, webhooks, batch_submit
+from .fieldsets import parse_fieldsets, apply_fieldsets
 from apps.affiliates.models import Affiliate
-
-# Use openpyxl directly instead of pandas
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill
+from apps.forms.models import Form
+from apps.core.downloads import ranged_file_response
+from apps.core.db_routing import replica_reads
+import gzip
 import logging
+import uuid
 
 logger = logging.getLogger(__name__)
 
@@ -24,13 +32,24 @@ class LeadViewSet(viewsets.ModelViewSet):
     permission_classes = [IsAuthenticated]
     queryset = Lead.objects.all()
     
+    def get_fieldsets(self):
+        """?fields= / ?expand= only shape read requests"""
+        if self.request.method != 'GET':
+            return None, set()
+        return parse_fieldsets(self.request)
+    
+    def get_serializer(self, *args, **kwargs):
+        fields, expand = self.get_fieldsets()
+        kwargs.setdefault('fields', fields)
+        kwargs.setdefault('expand', expand)
+        return super().get_serializer(*args, **kwargs)
+    
     def get_queryset(self):
         user = self.request.user
         
-        # Base queryset with optimizations
-        queryset = Lead.objects.select_related(
-            'form', 'affiliate', 'affiliate__user'
-        ).prefetch_related('lead_notes')
+        # Base queryset: columns, joins and note prefetch follow ?fields= / ?expand=
+        fields, expand = self.get_fieldsets()
+        queryset = apply_fieldsets(Lead.objects.all(), fields, expand)
         
         # Filter by user role
         if user.user_type == 'admin':
@@ -45,11 +64,8 @@ class LeadViewSet(viewsets.ModelViewSet):
         # Apply filters from query parameters
         search = self.request.query_params.get('search')
         if search:
-            queryset = queryset.filter(
-                Q(email__icontains=search) |
-                Q(name__icontains=search) |
-                Q(form_data__icontains=search)
-            )
+            # Full-text index instead of casting form_data to text per row
+            queryset = search_leads(queryset, search)
         
         status_filter = self.request.query_params.get('status')
         if status_filter:
@@ -82,6 +98,11 @@ class LeadViewSet(viewsets.ModelViewSet):
                 quarter_ago = now - timedelta(days=90)
                 queryset = queryset.filter(created_at__gte=quarter_ago)
         
+        # Custom form questions, e.g. ?field.company-size=11-50
+        queryset = projection.filter_by_fields(queryset, self.request.query_params)
+        
+        if search:
+            return queryset.order_by('-search_rank', '-created_at')
         return queryset.order_by('-created_at')
     
     def update(self, request, *args, **kwargs):
@@ -113,6 +134,16 @@ class LeadViewSet(viewsets.ModelViewSet):
         
         return super().update(request, *args, **kwargs)
     
+    def perform_update(self, serializer):
+        instance = serializer.instance
+        old_status = instance.status
+        lead = serializer.save()
+        if lead.status != old_status:
+            bulk.record_status_changes(
+                [(lead.pk, lead.affiliate_id, lead.form_id, old_status, lead.status)],
+                self.request.user
+            )
+    
     @action(detail=True, methods=['post'])
     def add_note(self, request, pk=None):
         """Add a note to a lead - with affiliate restrictions"""
@@ -179,140 +210,353 @@ class LeadViewSet(viewsets.ModelViewSet):
             logger.error(f"Error getting notes: {e}")
             return Response({'error': str(e)}, status=500)
 
+    @action(detail=False, methods=['get'])
+    def field_breakdown(self, request):
+        """Lead counts per answer for a projected form field (respects list filters)"""
+        key = request.query_params.get('key')
+        if not key:
+            return Response({'error': 'key is required'}, status=400)
+        
+        try:
+            queryset = self.get_queryset()
+            return Response({
+                'key': key,
+                'breakdown': projection.field_breakdown(queryset, key)
+            })
+        except Exception as e:
+            logger.error(f"Error getting field breakdown: {e}")
+            return Response({'error': str(e)}, status=500)
+    
+    @action(detail=False, methods=['post'])
+    def bulk_status(self, request):
+        """
+        Move many leads to one status.
+        
+        Body: ``{"status": "contacted", "ids": [...]}``, or
+        ``{"status": "contacted", "all_matching": true}`` to update every lead
+        matching the list filters in the query string.
+        """
+        if request.user.user_type == 'affiliate':
+            return Response(
+                {'error': 'Only admin and operations users can bulk update leads'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        new_status = request.data.get('status')
+        if new_status not in dict(Lead.STATUS_CHOICES):
+            return Response({'error': 'A valid status is required'}, status=400)
+        
+        ids = request.data.get('ids')
+        if ids is None and not request.data.get('all_matching'):
+            return Response({'error': 'Provide ids or set all_matching'}, status=400)
+        
+        try:
+            queryset = self.get_queryset()
+            if ids is not None:
+                if not isinstance(ids, list):
+                    return Response({'error': 'ids must be a list'}, status=400)
+                try:
+                    ids = [uuid.UUID(str(value)) for value in ids]
+                except ValueError:
+                    return Response({'error': 'ids must be lead UUIDs'}, status=400)
+                queryset = queryset.filter(pk__in=ids)
+            
+            updated, unchanged = bulk.bulk_update_status(queryset, new_status, user=request.user)
+            return Response({
+                'status': new_status,
+                'updated': updated,
+                'unchanged': unchanged,
+            })
+        except ValueError as e:
+            return Response({'error': str(e)}, status=400)
+        except Exception as e:
+            logger.error(f"Error in bulk status update: {e}")
+            return Response({'error': str(e)}, status=500)
+
+class LeadImportView(APIView):
+    """
+    Import leads from an uploaded file into one form.
+    
+    Multipart body: ``file`` (CSV, TSV or NDJSON), ``form`` (form id) and
+    optionally ``file_format`` (guessed from the file name otherwise) and
+    ``skip_duplicates`` (default true: skip emails the form already has).
+    """
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser]
+    
+    def post(self, request):
+        if request.user.user_type == 'affiliate':
+            return Response(
+                {'error': 'Only admin and operations users can import leads'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        upload = request.FILES.get('file')
+        if upload is None:
+            return Response({'error': 'file is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        file_format = str(
+            request.data.get('file_format') or imports.guess_format(upload.name)
+        ).lower()
+        if file_format not in imports.FORMATS:
+            return Response(
+                {'error': f"file_format must be one of: {', '.join(imports.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        try:
+            form = Form.objects.get(pk=uuid.UUID(str(request.data.get('form'))))
+        except (ValueError, Form.DoesNotExist):
+            return Response({'error': 'A valid form is required'}, status=status.HTTP_400_BAD_REQUEST)
+        
+        skip_duplicates = str(request.data.get('skip_duplicates', 'true')).lower() not in ('0', 'false', 'no')
+        
+        try:
+            lead_import = imports.LeadImport(form, user=request.user, skip_duplicates=skip_duplicates)
+            result = lead_import.run(upload.open('rb'), file_format)
+            logger.info(
+                f"Lead import into form {form.pk} by {request.user}: "
+                f"{result['created']} created, {result['duplicates']} duplicates, {result['invalid']} invalid"
+            )
+            return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f"Lead import error: {e}")
+            return Response({'error': str(e)}, status=500)
+
+class LeadBatchSubmitView(APIView):
+    """
+    Server-to-server lead submission: many leads, across forms, per call.
+    
+    JSON body ``{"items": [...]}``, each item with its own idempotency key
+    (see apps.leads.batch_submit). Answers one result per item, in order:
+    ``created`` / ``duplicate`` with the lead id, or ``invalid`` with errors.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def post(self, request):
+        user = request.user
+        if user.user_type not in ('affiliate', 'admin'):
+            return Response(
+                {'error': 'Only affiliate and admin users can submit leads'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        items = request.data.get('items') if isinstance(request.data, dict) else None
+        if not isinstance(items, list) or not items:
+            return Response({'error': 'items must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > batch_submit.limit():
+            return Response(
+                {'error': f'At most {batch_submit.limit()} items per call'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        affiliate = None
+        if user.user_type == 'affiliate':
+            affiliate = Affiliate.objects.filter(user=user, is_active=True).first()
+            if affiliate is None:
+                return Response({'error': 'Affiliate profile not found'}, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            result = batch_submit.BatchSubmission(user, affiliate=affiliate).submit(items)
+            logger.info(
+                f"Batch submission by {user}: {result['created']} created, "
+                f"{result['duplicates']} duplicates, {result['invalid']} invalid"
+            )
+            return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_200_OK)
+        except Exception as e:
+            logger.error(f"Batch submission error: {e}")
+            return Response({'error': str(e)}, status=500)
+
 class ExportLeadsView(APIView):
     permission_classes = [IsAuthenticated]
     
+    def get_queryset(self, request):
+        """Filtered leads based on query parameters and user role"""
+        return exports.export_queryset(request.user, request.query_params)
+    
+    def get_filename(self, request, extension):
+        # Include affiliate code in filename if user is affiliate
+        filename_suffix = ""
+        if request.user.user_type == 'affiliate':
+            try:
+                affiliate = Affiliate.objects.get(user=request.user)
+                filename_suffix = f"_{affiliate.affiliate_code}"
+            except:
+                pass
+        
+        return f"leads_export{filename_suffix}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.{extension}"
+    
+    @replica_reads
     def get(self, request):
+        # ?file_format=csv|tsv streams rows instead of building a workbook
+        # (DRF reserves ?format= for renderer selection)
+        file_format = request.query_params.get('file_format', 'xlsx').lower()
+        if file_format in exports.DELIMITERS:
+            return self.stream(request, file_format)
+        
         try:
-            # Get filtered leads based on query parameters and user role
-            user = request.user
-            queryset = Lead.objects.select_related('form', 'affiliate')
-            
-            # Apply role-based filtering
-            if user.user_type == 'affiliate':
-                try:
-                    affiliate = Affiliate.objects.get(user=user)
-                    queryset = queryset.filter(affiliate=affiliate)
-                except Affiliate.DoesNotExist:
-                    queryset = Lead.objects.none()
-            
-            # Apply search and filters
-            search = request.query_params.get('search')
-            if search:
-                queryset = queryset.filter(
-                    Q(email__icontains=search) |
-                    Q(name__icontains=search)
-                )
-            
-            status_filter = request.query_params.get('status')
-            if status_filter:
-                queryset = queryset.filter(status=status_filter)
-            
-            utm_source = request.query_params.get('utm_source')
-            if utm_source:
-                queryset = queryset.filter(utm_source=utm_source)
-            
-            form_id = request.query_params.get('form')
-            if form_id:
-                queryset = queryset.filter(form__id=form_id)
-            
-            # Create Excel workbook using openpyxl (no pandas needed)
-            wb = Workbook()
-            ws = wb.active
-            ws.title = "Leads Export"
+            queryset = self.get_queryset(request)
             
-            # Define headers
-            headers = [
-                'Email', 'Name', 'Phone', 'Form', 'Status', 'Affiliate',
-                'UTM Source', 'UTM Medium', 'UTM Campaign', 'Created', 'Updated', 'IP Address'
-            ]
+            # Columns are worked out up front, rows stream into a temp file
+            export_file = exports.xlsx_tempfile(queryset)
             
-            # Style the header row
-            header_font = Font(bold=True)
-            header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
-            
-            for col_num, header in enumerate(headers, 1):
-                cell = ws.cell(row=1, column=col_num)
-                cell.value = header
-                cell.font = header_font
-                cell.fill = header_fill
+            response = FileResponse(
+                export_file,
+                as_attachment=True,
+                filename=self.get_filename(request, 'xlsx'),
+                content_type=exports.CONTENT_TYPES['xlsx']
+            )
             
-            # Add data rows
-            for row_num, lead in enumerate(queryset.order_by('-created_at'), 2):
-                ws.cell(row=row_num, column=1, value=lead.email)
-                ws.cell(row=row_num, column=2, value=lead.name)
-                ws.cell(row=row_num, column=3, value=lead.phone)
-                ws.cell(row=row_num, column=4, value=lead.form.name if lead.form else '')
-                ws.cell(row=row_num, column=5, value=lead.get_status_display())
-                ws.cell(row=row_num, column=6, value=lead.affiliate_code)
-                ws.cell(row=row_num, column=7, value=lead.utm_source)
-                ws.cell(row=row_num, column=8, value=lead.utm_medium)
-                ws.cell(row=row_num, column=9, value=lead.utm_campaign)
-                ws.cell(row=row_num, column=10, value=lead.created_at.strftime('%Y-%m-%d %H:%M:%S'))
-                ws.cell(row=row_num, column=11, value=lead.updated_at.strftime('%Y-%m-%d %H:%M:%S'))
-                ws.cell(row=row_num, column=12, value=lead.ip_address)
-                
-                # Add form data columns dynamically
-                form_data = lead.form_data or {}
-                for key, value in form_data.items():
-                    if key not in ['email', 'name', 'phone']:  # Avoid duplicates
-                        # Find or create column for this form field
-                        header_key = f'Form_{key.title()}'
-                        if header_key not in headers:
-                            headers.append(header_key)
-                            col_num = len(headers)
-                            # Add header if it's the first time we see this field
-                            if row_num == 2:  # First data row
-                                cell = ws.cell(row=1, column=col_num)
-                                cell.value = header_key
-                                cell.font = header_font
-                                cell.fill = header_fill
-                        
-                        col_num = headers.index(header_key) + 1
-                        ws.cell(row=row_num, column=col_num, value=str(value) if value else '')
+            return response
             
-            # Auto-adjust column widths
-            for column in ws.columns:
-                max_length = 0
-                column_letter = column[0].column_letter
-                for cell in column:
-                    try:
-                        if len(str(cell.value)) > max_length:
-                            max_length = len(str(cell.value))
-                    except:
-                        pass
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
+        except Exception as e:
+            logger.error(f"Export error: {e}")
+            return Response({'error': 'Export failed'}, status=500)
+    
+    def stream(self, request, file_format):
+        """CSV / TSV export streamed straight from a server-side cursor"""
+        try:
+            queryset = self.get_queryset(request)
             
-            # Create HTTP response
-            response = HttpResponse(
-                content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+            response = StreamingHttpResponse(
+                exports.stream_delimited(queryset, file_format),
+                content_type=f'{exports.CONTENT_TYPES[file_format]}; charset=utf-8'
             )
-            
-            # Include affiliate code in filename if user is affiliate
-            filename_suffix = ""
-            if user.user_type == 'affiliate':
-                try:
-                    affiliate = Affiliate.objects.get(user=user)
-                    filename_suffix = f"_{affiliate.affiliate_code}"
-                except:
-                    pass
-            
-            filename = f"leads_export{filename_suffix}_{timezone.now().strftime('%Y%m%d_%H%M%S')}.xlsx"
+            filename = self.get_filename(request, file_format)
             response['Content-Disposition'] = f'attachment; filename="{filename}"'
-            
-            # Save workbook to response
-            wb.save(response)
-            
             return response
             
         except Exception as e:
             logger.error(f"Export error: {e}")
             return Response({'error': 'Export failed'}, status=500)
 
+class ExportJobListView(APIView):
+    """
+    Background exports.
+
+    POST starts an export with the same filters as ExportLeadsView (query
+    params or body) plus ``file_format`` (csv, tsv or xlsx). An identical
+    export that is still pending or running is returned instead of starting
+    a new one.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            jobs = export_jobs.visible_jobs(request.user)[:50]
+            return Response(ExportJobSerializer(jobs, many=True, context={'request': request}).data)
+        except Exception as e:
+            logger.error(f"Export job list error: {e}")
+            return Response({'error': str(e)}, status=500)
+    
+    def post(self, request):
+        try:
+            params = request.query_params.copy()
+            if hasattr(request.data, 'items'):
+                params.update({key: value for key, value in request.data.items() if value})
+            
+            file_format = str(params.get('file_format', 'xlsx')).lower()
+            if file_format not in export_jobs.EXTENSIONS:
+                return Response(
+                    {'error': f"file_format must be one of: {', '.join(export_jobs.EXTENSIONS)}"},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            
+            job, created = export_jobs.request_export(request.user, params, file_format)
+            return Response(
+                ExportJobSerializer(job, context={'request': request}).data,
+                status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK
+            )
+        except Exception as e:
+            logger.error(f"Export job error: {e}")
+            return Response({'error': 'Export failed'}, status=500)
+
+class ExportJobDetailView(APIView):
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        job = export_jobs.visible_jobs(request.user).filter(pk=job_id).first()
+        if job is None:
+            return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ExportJobSerializer(job, context={'request': request}).data)
+
+class ExportJobDownloadView(APIView):
+    """Download a finished export; supports Range requests for resuming"""
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request, job_id):
+        job = export_jobs.visible_jobs(request.user).filter(pk=job_id).first()
+        if job is None:
+            return Response({'error': 'Export not found'}, status=status.HTTP_404_NOT_FOUND)
+        if job.status != 'completed':
+            return Response(
+                {'error': f'Export is {job.status}', 'progress': job.progress},
+                status=status.HTTP_409_CONFLICT
+            )
+        if job.expires_at and job.expires_at <= timezone.now():
+            return Response({'error': 'Export has expired'}, status=status.HTTP_410_GONE)
+        
+        try:
+            fileobj, size = export_jobs.open_artifact(job)
+        except Exception as e:
+            logger.error(f"Export artifact missing for job {job.pk}: {e}")
+            return Response({'error': 'Export file not available'}, status=status.HTTP_410_GONE)
+        
+        return ranged_file_response(
+            request,
+            fileobj,
+            size,
+            export_jobs.DOWNLOAD_CONTENT_TYPES[job.file_format],
+            job.download_name
+        )
+
+class ChangeFeedView(APIView):
+    """
+    Leads and lead notes created or updated since ``?since=<watermark>``.
+
+    Returns NDJSON (gzip encoded when the client accepts it). The watermark
+    for the next call is in the ``X-Watermark`` header and ``X-Has-More`` says
+    whether to call again straight away. ``?limit=`` caps rows per entity.
+    """
+    permission_classes = [IsAuthenticated]
+    
+    def get(self, request):
+        try:
+            leads = exports.export_queryset(request.user, {})
+            notes = LeadNote.objects.all()
+            if request.user.user_type == 'affiliate':
+                notes = notes.filter(lead__in=leads.order_by().values('pk'))
+            
+            records, watermark, has_more = change_feed.read_changes(
+                leads,
+                notes,
+                since=request.query_params.get('since'),
+                limit=request.query_params.get('limit', change_feed.DEFAULT_LIMIT)
+            )
+        except change_feed.InvalidWatermark as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        except Exception as e:
+            logger.error(f"Change feed error: {e}")
+            return Response({'error': str(e)}, status=500)
+        
+        body = change_feed.to_ndjson(records).encode('utf-8')
+        response = HttpResponse(content_type='application/x-ndjson; charset=utf-8')
+        if 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', ''):
+            body = gzip.compress(body)
+            response['Content-Encoding'] = 'gzip'
+        response.content = body
+        response['Vary'] = 'Accept-Encoding'
+        response['X-Watermark'] = watermark
+        response['X-Has-More'] = 'true' if has_more else 'false'
+        response['X-Record-Count'] = str(len(records))
+        return response
+
 class LeadStatsView(APIView):
     permission_classes = [IsAuthenticated]
     
+    @replica_reads
     def get(self, request):
         try:
             user = request.user
@@ -387,6 +631,10 @@ class LeadStatsView(APIView):
                     'submissions': count
                 })
             
+            # Optional grouping by a projected custom question
+            group_by_field = request.query_params.get('group_by_field')
+            field_groups = projection.field_breakdown(queryset, group_by_field) if group_by_field else []
+            
             response_data = {
                 'total_leads': total_leads,
                 'new_leads': new_leads,
@@ -400,6 +648,7 @@ class LeadStatsView(APIView):
                 'top_sources': list(top_sources),
                 'form_performance': list(form_performance),
                 'daily_data': daily_data[::-1],  # Reverse for chronological order
+                'field_breakdown': field_groups,
                 'user_type': user.user_type
             }
             
@@ -420,3 +669,69 @@ class LeadStatsView(APIView):
         except Exception as e:
             logger.error(f"Stats error: {e}")
             return Response({'error': str(e)}, status=500)
+
+class WebhookSubscriptionViewSet(viewsets.ModelViewSet):
+    """
+    Outbound lead webhooks (admin only).
+    
+    Deliveries are signed with the subscription's ``secret``; see
+    apps.leads.webhooks for the payload and signature format.
+    """
+    serializer_class = WebhookSubscriptionSerializer
+    permission_classes = [IsAuthenticated]
+    queryset = WebhookSubscription.objects.all()
+    
+    def get_queryset(self):
+        if self.request.user.user_type != 'admin':
+            return WebhookSubscription.objects.none()
+        return WebhookSubscription.objects.annotate(
+            pending_events=Count('deliveries', distinct=True),
+            dead_letter_count=Count('dead_letters', distinct=True)
+        ).order_by('-created_at')
+    
+    def create(self, request, *args, **kwargs):
+        if request.user.user_type != 'admin':
+            return Response(
+                {'error': 'Only admins can manage webhooks'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+        return super().create(request, *args, **kwargs)
+    
+    def perform_create(self, serializer):
+        serializer.save(created_by=self.request.user)
+    
+    @action(detail=True, methods=['post'])
+    def rotate_secret(self, request, pk=None):
+        """Issue a new signing secret; the old one stops working immediately"""
+        subscription = self.get_object()
+        subscription.secret = WebhookSubscription._meta.get_field('secret').get_default()
+        subscription.save(update_fields=['secret', 'updated_at'])
+        return Response({'id': str(subscription.pk), 'secret': subscription.secret})
+    
+    @action(detail=True, methods=['get'])
+    def dead_letters(self, request, pk=None):
+        """Events that ran out of attempts, newest first"""
+        subscription = self.get_object()
+        letters = subscription.dead_letters.all()
+        page = self.paginate_queryset(letters)
+        if page is not None:
+            return self.get_paginated_response(WebhookDeadLetterSerializer(page, many=True).data)
+        return Response(WebhookDeadLetterSerializer(letters, many=True).data)
+    
+    @action(detail=True, methods=['post'])
+    def replay(self, request, pk=None):
+        """Queue dead letters again: all of them, or the given ``ids``"""
+        subscription = self.get_object()
+        letters = subscription.dead_letters.all()
+        ids = request.data.get('ids')
+        if ids:
+            if not isinstance(ids, list):
+                return Response({'error': 'ids must be a list'}, status=status.HTTP_400_BAD_REQUEST)
+            letters = letters.filter(pk__in=ids)
+        
+        try:
+            replayed = webhooks.replay_dead_letters(letters)
+            return Response({'replayed': replayed})
+        except Exception as e:
+            logger.error(f"Webhook replay error: {e}")
+            return Response({'error': str(e)}, status=500)
@@ -0,0 +1,386 @@
+# apps/leads/webhooks.py - Outbound lead webhooks
+"""
+Push lead events to subscribed endpoints.
+
+    emit()              turn lead events into WebhookDelivery rows for every
+                        matching subscription (same transaction as the
+                        change) and schedule a flush once it commits
+    flush_subscription  background task: claim due rows, POST them, delete
+                        what was accepted, back off or dead-letter the rest
+
+Nothing is sent from the request. Deliveries are rows in the database, so an
+event is never lost to a crashed worker; a flush that dies just leaves its
+claim to expire, and ``manage.py runworker`` sweeps up due events that no
+queued flush covers (``schedule_due``). A flush stops starting POSTs after
+FLUSH_SECONDS, well inside its claim, and hands the rest to a new flush.
+
+Subscriptions with ``batch_size`` above 1 are flushed WEBHOOK_BATCH_WINDOW
+seconds after the first pending event, so a burst (an import, a bulk status
+change) goes out as a few POSTs of up to ``batch_size`` events each.
+
+Every POST is JSON signed with the subscription secret:
+
+    X-Webhook-Signature: t=<unix time>,v1=<hex HMAC-SHA256 of "<t>.<body>">
+
+``verify_signature`` is the receiving side of that check (see
+``manage.py webhook_receiver`` for a local stand-in endpoint).
+"""
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+from datetime import timedelta
+from requests.adapters import HTTPAdapter
+from apps.core.jobs import backoff, enqueue, task
+import hashlib
+import hmac
+import json
+import logging
+import threading
+import time
+import uuid
+import requests
+
+logger = logging.getLogger(__name__)
+
+LEAD_CREATED = 'lead.created'
+LEAD_STATUS_CHANGED = 'lead.status_changed'
+
+DEFAULT_TIMEOUT = 10
+DEFAULT_MAX_ATTEMPTS = 8
+DEFAULT_BATCH_WINDOW = 2
+MAX_BATCH_SIZE = 100
+POOL_SIZE = 10
+
+# Rows one flush claims, how long its claim holds, and how long it keeps
+# starting POSTs (each can take a connect plus a read timeout)
+FLUSH_LIMIT = 500
+CLAIM_SECONDS = 5 * 60
+FLUSH_SECONDS = 2 * 60
+
+SIGNATURE_TOLERANCE = 5 * 60
+
+LEAD_PAYLOAD_FIELDS = (
+    'id', 'form_id', 'affiliate_id', 'email', 'name', 'phone', 'status',
+    'utm_source', 'utm_medium', 'utm_campaign', 'utm_term', 'utm_content',
+    'form_data', 'created_at', 'updated_at',
+)
+
+_local = threading.local()
+
+
+def _models():
+    from .models import WebhookSubscription, WebhookDelivery, WebhookDeadLetter
+    return WebhookSubscription, WebhookDelivery, WebhookDeadLetter
+
+
+def session():
+    """Per-thread requests.Session keeping connections to endpoints alive"""
+    if getattr(_local, 'session', None) is None:
+        pooled = requests.Session()
+        adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0)
+        pooled.mount('http://', adapter)
+        pooled.mount('https://', adapter)
+        pooled.headers['User-Agent'] = 'affiliate-forms-webhooks/1.0'
+        _local.session = pooled
+    return _local.session
+
+
+def sign(secret, body, timestamp=None):
+    """``X-Webhook-Signature`` value for a body (bytes)"""
+    timestamp = int(timestamp or time.time())
+    digest = hmac.new(secret.encode(), f'{timestamp}.'.encode() + body, hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+
+def verify_signature(secret, body, header, tolerance=SIGNATURE_TOLERANCE):
+    """True if ``header`` is a fresh signature of ``body`` with ``secret``"""
+    try:
+        parts = dict(item.split('=', 1) for item in (header or '').split(','))
+        timestamp = int(parts['t'])
+    except (ValueError, KeyError):
+        return False
+    if tolerance and abs(time.time() - timestamp) > tolerance:
+        return False
+    expected = sign(secret, body, timestamp).split('v1=', 1)[1]
+    return hmac.compare_digest(expected, parts.get('v1', ''))
+
+
+def lead_payload(lead):
+    data = {name: getattr(lead, name) for name in LEAD_PAYLOAD_FIELDS}
+    return json.loads(json.dumps(data, cls=DjangoJSONEncoder))
+
+
+def _matching(subscriptions, event, form_id, affiliate_id):
+    return [
+        subscription for subscription in subscriptions
+        if (not subscription.events or event in subscription.events)
+        and subscription.form_id in (None, form_id)
+        and subscription.affiliate_id in (None, affiliate_id)
+    ]
+
+
+def emit(event, items):
+    """
+    Queue ``event`` for every subscription matching each item.
+
+    ``items`` yields ``(form_id, affiliate_id, data)``. Subscriptions are
+    looked up with one query for the whole batch. Returns the number of
+    deliveries created.
+    """
+    WebhookSubscription, WebhookDelivery, _ = _models()
+    items = list(items)
+    if not items:
+        return 0
+
+    form_ids = {form_id for form_id, _, _ in items}
+    affiliate_ids = {affiliate_id for _, affiliate_id, _ in items if affiliate_id}
+    subscriptions = list(WebhookSubscription.objects.filter(is_active=True).filter(
+        Q(form__isnull=True) | Q(form_id__in=form_ids)
+    ).filter(
+        Q(affiliate__isnull=True) | Q(affiliate_id__in=affiliate_ids)
+    ))
+    if not subscriptions:
+        return 0
+
+    now = timezone.now()
+    deliveries = []
+    for form_id, affiliate_id, data in items:
+        for subscription in _matching(subscriptions, event, form_id, affiliate_id):
+            deliveries.append(WebhookDelivery(
+                subscription=subscription,
+                event=event,
+                payload={'id': str(uuid.uuid4()), 'event': event, 'created_at': now.isoformat(), 'data': data},
+                next_attempt_at=now,
+            ))
+    WebhookDelivery.objects.bulk_create(deliveries, batch_size=500)
+
+    touched = {delivery.subscription_id: delivery.subscription for delivery in deliveries}
+    transaction.on_commit(lambda: [schedule(subscription) for subscription in touched.values()])
+    return len(deliveries)
+
+
+def leads_created(leads):
+    return emit(LEAD_CREATED, (
+        (lead.form_id, lead.affiliate_id, lead_payload(lead)) for lead in leads
+    ))
+
+
+def status_changed(changes, changed_by=None):
+    """``changes`` are ``(lead_id, affiliate_id, form_id, old_status, new_status)``"""
+    changed_at = timezone.now().isoformat()
+    return emit(LEAD_STATUS_CHANGED, (
+        (form_id, affiliate_id, {
+            'lead_id': str(lead_id),
+            'form_id': str(form_id),
+            'affiliate_id': str(affiliate_id) if affiliate_id else None,
+            'from_status': old,
+            'to_status': new,
+            'changed_by': getattr(changed_by, 'username', None),
+            'changed_at': changed_at,
+        })
+        for lead_id, affiliate_id, form_id, old, new in changes
+        if old != new
+    ))
+
+
+def _batch_window():
+    return getattr(settings, 'WEBHOOK_BATCH_WINDOW', DEFAULT_BATCH_WINDOW)
+
+
+def schedule(subscription, delay=None):
+    """
+    Make sure a flush is queued for a subscription.
+
+    A queued flush job due no later than this one would be already covers
+    the new events, so every event of a burst shares one job. A flush that
+    is running does not count: it may have claimed its rows already.
+    """
+    from apps.core.models import Job
+
+    if delay is None:
+        delay = _batch_window() if subscription.batch_size > 1 else 0
+    queued = Job.objects.filter(
+        name=flush_subscription.job_name,
+        status='queued',
+        kwargs__subscription_id=str(subscription.pk),
+        run_after__lte=timezone.now() + timedelta(seconds=delay),
+    ).exists()
+    if not queued:
+        enqueue(flush_subscription, delay=delay or None, subscription_id=str(subscription.pk))
+    return not queued
+
+
+def _claim(subscription_id, now, limit):
+    """Claim due rows with a token; works the same with or without row locks"""
+    _, WebhookDelivery, _ = _models()
+    due = WebhookDelivery.objects.filter(
+        subscription_id=subscription_id, next_attempt_at__lte=now
+    ).filter(Q(claimed_until__isnull=True) | Q(claimed_until__lt=now))
+    ids = list(due.order_by('created_at', 'pk').values_list('pk', flat=True)[:limit])
+    if not ids:
+        return []
+
+    token = uuid.uuid4()
+    due.filter(pk__in=ids).update(claim=token, claimed_until=now + timedelta(seconds=CLAIM_SECONDS))
+    return list(WebhookDelivery.objects.filter(claim=token).order_by('created_at', 'pk'))
+
+
+def _body(subscription, batch):
+    if subscription.batch_size > 1:
+        return {'subscription_id': str(subscription.pk), 'events': [row.payload for row in batch]}
+    return batch[0].payload
+
+
+def post(subscription, batch):
+    """POST one batch; returns None on success or an error message"""
+    body = json.dumps(_body(subscription, batch), cls=DjangoJSONEncoder).encode('utf-8')
+    headers = {
+        'Content-Type': 'application/json',
+        'X-Webhook-Signature': sign(subscription.secret, body),
+        'X-Webhook-Event': batch[0].event if len(batch) == 1 else 'batch',
+        'X-Webhook-Delivery': ','.join(row.payload.get('id', '') for row in batch),
+    }
+    try:
+        response = session().post(
+            subscription.url,
+            data=body,
+            headers=headers,
+            timeout=getattr(settings, 'WEBHOOK_TIMEOUT', DEFAULT_TIMEOUT),
+            allow_redirects=False
+        )
+    except requests.RequestException as e:
+        return f'{type(e).__name__}: {e}'
+    if 200 <= response.status_code < 300:
+        return None
+    return f'HTTP {response.status_code}: {response.text[:200]}'
+
+
+def _failed(subscription, batch, error, now):
+    _, WebhookDelivery, WebhookDeadLetter = _models()
+    max_attempts = getattr(settings, 'WEBHOOK_MAX_ATTEMPTS', DEFAULT_MAX_ATTEMPTS)
+
+    dead = [row for row in batch if row.attempts + 1 >= max_attempts]
+    retry = [row for row in batch if row.attempts + 1 < max_attempts]
+
+    if dead:
+        WebhookDeadLetter.objects.bulk_create([
+            WebhookDeadLetter(
+                subscription=subscription,
+                event=row.event,
+                payload=row.payload,
+                attempts=row.attempts + 1,
+                last_error=error,
+                created_at=row.created_at,
+            ) for row in dead
+        ])
+        WebhookDelivery.objects.filter(pk__in=[row.pk for row in dead]).delete()
+        logger.error(f"Webhook {subscription.pk}: {len(dead)} events dead-lettered ({error})")
+
+    # The whole batch shares one attempt count, so one backoff applies
+    delay = None
+    if retry:
+        delay = backoff(retry[0].attempts + 1)
+        for row in retry:
+            row.attempts += 1
+            row.last_error = error
+            row.next_attempt_at = now + timedelta(seconds=delay)
+            row.claim = None
+            row.claimed_until = None
+        WebhookDelivery.objects.bulk_update(
+            retry, ['attempts', 'last_error', 'next_attempt_at', 'claim', 'claimed_until']
+        )
+        logger.warning(f"Webhook {subscription.pk}: {len(retry)} events retry in {delay:.0f}s ({error})")
+    return delay
+
+
+@task
+def flush_subscription(subscription_id):
+    """Deliver every due event of one subscription"""
+    WebhookSubscription, WebhookDelivery, _ = _models()
+
+    subscription = WebhookSubscription.objects.filter(pk=subscription_id, is_active=True).first()
+    if subscription is None:
+        return
+
+    now = timezone.now()
+    started = time.monotonic()
+    rows = _claim(subscription_id, now, FLUSH_LIMIT)
+    size = max(1, min(subscription.batch_size, MAX_BATCH_SIZE))
+    delivered = 0
+    retry_in = []
+    unsent = []
+
+    for start in range(0, len(rows), size):
+        if time.monotonic() - started > FLUSH_SECONDS:
+            # Slow endpoint: give the rest back before the claim runs out
+            unsent = rows[start:]
+            WebhookDelivery.objects.filter(pk__in=[row.pk for row in unsent]).update(
+                claim=None, claimed_until=None
+            )
+            break
+        batch = rows[start:start + size]
+        error = post(subscription, batch)
+        if error is None:
+            WebhookDelivery.objects.filter(pk__in=[row.pk for row in batch]).delete()
+            delivered += len(batch)
+        else:
+            delay = _failed(subscription, batch, error, now)
+            if delay is not None:
+                retry_in.append(delay)
+
+    if delivered:
+        logger.info(f"Webhook {subscription.pk}: delivered {delivered} events")
+
+    # More was due than one flush takes, or failures wait for their backoff
+    if unsent or len(rows) >= FLUSH_LIMIT:
+        schedule(subscription, delay=0)
+    elif retry_in:
+        enqueue(flush_subscription, delay=min(retry_in), subscription_id=str(subscription.pk))
+
+
+def _due_subscription_ids(now):
+    _, WebhookDelivery, _ = _models()
+    return WebhookDelivery.objects.filter(
+        next_attempt_at__lte=now, subscription__is_active=True
+    ).filter(
+        Q(claimed_until__isnull=True) | Q(claimed_until__lt=now)
+    ).values_list('subscription_id', flat=True).distinct()
+
+
+def flush_due():
+    """Flush every subscription with due, unclaimed events right here"""
+    count = 0
+    for subscription_id in _due_subscription_ids(timezone.now()):
+        flush_subscription(str(subscription_id))
+        count += 1
+    return count
+
+
+def schedule_due():
+    """Queue a flush for every subscription with due, unclaimed events not covered yet"""
+    WebhookSubscription, _, _ = _models()
+    subscriptions = WebhookSubscription.objects.filter(pk__in=list(_due_subscription_ids(timezone.now())))
+    return sum(1 for subscription in subscriptions if schedule(subscription, delay=0))
+
+
+def replay_dead_letters(queryset):
+    """Move dead letters back into the delivery queue"""
+    _, WebhookDelivery, _ = _models()
+    now = timezone.now()
+    letters = list(queryset.select_related('subscription'))
+    with transaction.atomic():
+        WebhookDelivery.objects.bulk_create([
+            WebhookDelivery(
+                subscription=letter.subscription,
+                event=letter.event,
+                payload=letter.payload,
+                next_attempt_at=now,
+            ) for letter in letters
+        ])
+        queryset.filter(pk__in=[letter.pk for letter in letters]).delete()
+
+        subscriptions = {letter.subscription_id: letter.subscription for letter in letters}
+        transaction.on_commit(lambda: [schedule(subscription, delay=0) for subscription in subscriptions.values()])
+    return len(letters)
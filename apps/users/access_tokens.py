@@ -0,0 +1,193 @@
+# apps/users/access_tokens.py - Signed access tokens and refresh tokens
+"""
+Stateless API authentication (enabled with AUTH_SIGNED_TOKENS).
+
+    access token    short-lived (AUTH_ACCESS_TOKEN_TTL), HMAC-signed with
+                    django.core.signing; carries the user id, user_type and
+                    affiliate id, so verifying it needs no database access
+    refresh token   long-lived random string (AUTH_REFRESH_TOKEN_TTL); only
+                    its hash is stored, and it is looked up only when a new
+                    access token is requested. Each use rotates it; using a
+                    rotated token again revokes every refresh token of the
+                    user (it was probably stolen)
+
+Sent as ``Authorization: Bearer <access token>``, alongside the existing DB
+``Token`` header, which keeps working.
+
+Revoking an access token before it expires goes through a small denylist in
+the Django cache: single tokens by id (logout) and every token of a user
+issued before a point in time (password change, deactivation, a new
+user_type or affiliate id). Entries only live as long as an access token
+could. Every process must see them, so this needs a shared cache, like the
+one production.py configures.
+"""
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+from datetime import timedelta
+import hashlib
+import logging
+import secrets
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ACCESS_TOKEN_TTL = 5 * 60
+DEFAULT_REFRESH_TOKEN_TTL = 14 * 24 * 60 * 60
+
+SALT = 'apps.users.access_tokens'
+
+DENIED_KEY = 'access_token_denied:{}'
+USER_REVOKED_KEY = 'access_tokens_revoked_before:{}'
+
+
+class InvalidToken(Exception):
+    pass
+
+
+def enabled():
+    return getattr(settings, 'AUTH_SIGNED_TOKENS', False)
+
+
+def access_ttl():
+    return getattr(settings, 'AUTH_ACCESS_TOKEN_TTL', DEFAULT_ACCESS_TOKEN_TTL)
+
+
+def refresh_ttl():
+    return getattr(settings, 'AUTH_REFRESH_TOKEN_TTL', DEFAULT_REFRESH_TOKEN_TTL)
+
+
+def _now_ms():
+    return int(time.time() * 1000)
+
+
+def issue_access_token(user):
+    """Return ``(token, expires_in)``"""
+    claims = {
+        'uid': user.pk,
+        'typ': user.user_type,
+        'aff': user.affiliate_id,
+        'jti': secrets.token_urlsafe(12),
+        'iat': _now_ms(),
+    }
+    return signing.dumps(claims, salt=SALT), access_ttl()
+
+
+def verify_access_token(token):
+    """Claims of a valid, unexpired, non-revoked access token; raises InvalidToken"""
+    try:
+        claims = signing.loads(token, salt=SALT, max_age=access_ttl())
+    except signing.SignatureExpired:
+        raise InvalidToken('Access token expired')
+    except signing.BadSignature:
+        raise InvalidToken('Invalid access token')
+
+    denied_key, revoked_key = DENIED_KEY.format(claims['jti']), USER_REVOKED_KEY.format(claims['uid'])
+    markers = cache.get_many([denied_key, revoked_key])
+    if markers.get(denied_key) or claims['iat'] < markers.get(revoked_key, 0):
+        raise InvalidToken('Access token revoked')
+    return claims
+
+
+def deny_access_token(claims):
+    """Revoke one verified access token before it expires (logout)"""
+    remaining = access_ttl() - (_now_ms() - claims['iat']) // 1000
+    if remaining > 0:
+        cache.set(DENIED_KEY.format(claims['jti']), True, remaining + 1)
+
+
+def revoke_user(user_id):
+    """
+    Revoke every access and refresh token issued to a user so far.
+
+    Called when the password changes, the account is deactivated, or the
+    user_type / affiliate id the tokens carry changes.
+    """
+    cache.set(USER_REVOKED_KEY.format(user_id), _now_ms(), access_ttl() + 1)
+    revoke_refresh_tokens(user_id)
+
+
+def _hash(token):
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def issue_refresh_token(user, user_agent=''):
+    from .models import RefreshToken
+
+    # Keeps the table bounded without a cleanup job
+    RefreshToken.objects.filter(user=user, expires_at__lt=timezone.now()).delete()
+
+    token = secrets.token_urlsafe(48)
+    RefreshToken.objects.create(
+        user=user,
+        token_hash=_hash(token),
+        user_agent=user_agent[:300],
+        expires_at=timezone.now() + timedelta(seconds=refresh_ttl())
+    )
+    return token
+
+
+def issue_pair(user, user_agent=''):
+    """Login response fields for signed token mode"""
+    access, expires_in = issue_access_token(user)
+    return {
+        'access': access,
+        'access_expires_in': expires_in,
+        'refresh': issue_refresh_token(user, user_agent),
+    }
+
+
+def revoke_refresh_tokens(user_id):
+    from .models import RefreshToken
+    return RefreshToken.objects.filter(user_id=user_id, revoked_at__isnull=True).update(revoked_at=timezone.now())
+
+
+def revoke_refresh_token(token):
+    from .models import RefreshToken
+    return RefreshToken.objects.filter(
+        token_hash=_hash(token), revoked_at__isnull=True
+    ).update(revoked_at=timezone.now())
+
+
+def refresh(token, user_agent=''):
+    """
+    Trade a refresh token for a new access token and refresh token.
+
+    The only database work of the signed token mode. Raises InvalidToken.
+    """
+    from .models import RefreshToken
+
+    now = timezone.now()
+    with transaction.atomic():
+        stored = RefreshToken.objects.select_for_update().select_related('user').filter(
+            token_hash=_hash(token or '')
+        ).first()
+        if stored is None or stored.expires_at <= now or not stored.user.is_active:
+            raise InvalidToken('Invalid refresh token')
+        if stored.revoked_at is None:
+            stored.revoked_at = now
+            stored.save(update_fields=['revoked_at'])
+            return issue_pair(stored.user, user_agent)
+
+    # A rotated token came back: assume it leaked and end every session
+    logger.warning(f"Refresh token reuse for user {stored.user_id}; revoking all their tokens")
+    revoke_user(stored.user_id)
+    raise InvalidToken('Invalid refresh token')
+
+
+def user_from_claims(claims):
+    """
+    A User built from the token alone.
+
+    id, user_type and affiliate_id are set, so role checks and filters by
+    user cost nothing; any other field is loaded from the database on first
+    access.
+    """
+    from .models import User
+
+    known = {'id': claims['uid'], 'user_type': claims['typ'], 'affiliate_id': claims['aff'], 'is_active': True}
+    fields = [field for field in User._meta.concrete_fields if field.attname in known]
+    return User.from_db(None, [field.attname for field in fields], [known[field.attname] for field in fields])
+
@@ -1,7 +1,7 @@
 # apps/users/admin.py
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User
+from .models import User, RefreshToken
 
 @admin.register(User)
 class UserAdmin(BaseUserAdmin):
@@ -10,3 +10,10 @@ class UserAdmin(BaseUserAdmin):
     fieldsets = BaseUserAdmin.fieldsets + (
         ('Additional Info', {'fields': ('user_type', 'affiliate_id')}),
     )
+
+@admin.register(RefreshToken)
+class RefreshTokenAdmin(admin.ModelAdmin):
+    list_display = ('user', 'created_at', 'expires_at', 'revoked_at')
+    list_filter = ('revoked_at', 'created_at')
+    search_fields = ('user__username',)
+    readonly_fields = ('user', 'token_hash', 'user_agent', 'created_at', 'expires_at')
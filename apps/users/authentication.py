@@ -0,0 +1,180 @@
+# apps/users/authentication.py - Token authentication with a per-process cache
+"""
+DRF TokenAuthentication without the Token + User query on every request.
+
+Authenticated tokens are kept in a bounded LRU map (AUTH_TOKEN_CACHE_SIZE
+entries, each trusted for AUTH_TOKEN_CACHE_TTL seconds) holding a snapshot
+of the user. Every request gets its own copy of the snapshot.
+
+The map lives in one process, so revocations are also written to the Django
+cache and checked with a single ``get_many``, at most once every
+AUTH_REVOCATION_CHECK_INTERVAL seconds per token and process (with the
+database cache every check is a query, so it isn't done on every request):
+
+- deleting a Token (login, logout, password changes and resets all do)
+  drops it here and marks the key revoked for the other processes
+- saving a User marks the user changed, so snapshots taken before the save
+  (old user_type, deactivated account) are refetched
+
+With a shared cache other processes notice a revocation within
+AUTH_REVOCATION_CHECK_INTERVAL, which is why production.py configures one
+(Redis or the database cache) for every worker; the process that revoked it
+notices at once. Under the per-process default, as in development, other
+processes notice within AUTH_TOKEN_CACHE_TTL.
+
+SignedTokenAuthentication accepts the stateless ``Bearer`` access tokens of
+apps.users.access_tokens.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import BaseAuthentication, TokenAuthentication, get_authorization_header
+from . import access_tokens
+from collections import OrderedDict
+import copy
+import threading
+import time
+
+DEFAULT_CACHE_SIZE = 10000
+DEFAULT_CACHE_TTL = 60
+DEFAULT_REVOCATION_CHECK_INTERVAL = 5
+
+REVOKED_KEY = 'auth_token_revoked:{}'
+USER_CHANGED_KEY = 'auth_user_changed:{}'
+
+
+class TokenCache:
+    """Thread-safe LRU map of token key -> (user, token, cached_at, checked_at) with a TTL"""
+
+    def __init__(self, size, ttl):
+        self.size = size
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or now - entry[2] > self.ttl:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def set(self, key, user, token):
+        with self.lock:
+            now = time.time()
+            self.entries[key] = (user, token, now, now)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.size:
+                self.entries.popitem(last=False)
+
+    def check_due(self, key, interval):
+        """Whether the revocation markers for ``key`` are due a check; restarts the interval if so"""
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and now - entry[3] < interval:
+                return False
+            if entry is not None:
+                self.entries[key] = entry[:3] + (now,)
+            return True
+
+    def discard(self, key):
+        with self.lock:
+            self.entries.pop(key, None)
+
+    def discard_user(self, user_id):
+        with self.lock:
+            for key in [key for key, entry in self.entries.items() if entry[0].pk == user_id]:
+                del self.entries[key]
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.hits = self.misses = 0
+
+    def stats(self):
+        with self.lock:
+            return {'size': len(self.entries), 'max_size': self.size, 'hits': self.hits, 'misses': self.misses}
+
+
+token_cache = TokenCache(
+    getattr(settings, 'AUTH_TOKEN_CACHE_SIZE', DEFAULT_CACHE_SIZE),
+    getattr(settings, 'AUTH_TOKEN_CACHE_TTL', DEFAULT_CACHE_TTL),
+)
+revocation_check_interval = getattr(settings, 'AUTH_REVOCATION_CHECK_INTERVAL', DEFAULT_REVOCATION_CHECK_INTERVAL)
+
+
+def _marker_timeout():
+    # Markers only have to outlive the snapshots they invalidate
+    return token_cache.ttl + 5
+
+
+def token_revoked(key):
+    """Called when a Token is deleted"""
+    token_cache.discard(key)
+    cache.set(REVOKED_KEY.format(key), True, _marker_timeout())
+
+
+def user_changed(user_id):
+    """Called when a User is saved"""
+    token_cache.discard_user(user_id)
+    cache.set(USER_CHANGED_KEY.format(user_id), time.time(), _marker_timeout())
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """Drop-in replacement for ``rest_framework.authentication.TokenAuthentication``"""
+
+    def authenticate_credentials(self, key):
+        entry = token_cache.get(key)
+        if entry is not None:
+            user, token, cached_at = entry[:3]
+            if not token_cache.check_due(key, revocation_check_interval):
+                return copy.copy(user), token
+            revoked_key, changed_key = REVOKED_KEY.format(key), USER_CHANGED_KEY.format(user.pk)
+            markers = cache.get_many([revoked_key, changed_key])
+            if markers.get(revoked_key):
+                token_cache.discard(key)
+                raise exceptions.AuthenticationFailed(_('Invalid token.'))
+            if markers.get(changed_key, 0) < cached_at:
+                return copy.copy(user), token
+            token_cache.discard(key)
+
+        user, token = super().authenticate_credentials(key)
+        # Only tokens that authenticated are cached; failures always hit the database
+        token_cache.set(key, user, token)
+        return copy.copy(user), token
+
+
+class SignedTokenAuthentication(BaseAuthentication):
+    """
+    ``Authorization: Bearer <access token>`` without a database query.
+
+    request.user is built from the token (see access_tokens.user_from_claims)
+    and request.auth holds the token claims.
+    """
+    keyword = 'Bearer'
+
+    def authenticate(self, request):
+        auth = get_authorization_header(request).split()
+        if not auth or auth[0].lower() != self.keyword.lower().encode():
+            return None
+        if len(auth) != 2:
+            raise exceptions.AuthenticationFailed(_('Invalid token header.'))
+
+        try:
+            claims = access_tokens.verify_access_token(auth[1].decode())
+        except (access_tokens.InvalidToken, UnicodeError) as e:
+            raise exceptions.AuthenticationFailed(str(e))
+        return access_tokens.user_from_claims(claims), claims
+
+    def authenticate_header(self, request):
+        return self.keyword
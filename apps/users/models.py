@@ -16,3 +16,25 @@ class User(AbstractUser):
     
     def __str__(self):
         return f"{self.username} ({self.user_type})"
+
+class RefreshToken(models.Model):
+    """
+    Long-lived token exchanged for signed access tokens (apps.users.access_tokens).
+    
+    Only a SHA-256 of the token is stored. Every refresh rotates it: the
+    presented token is revoked and a new one issued.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='refresh_tokens')
+    token_hash = models.CharField(max_length=64, unique=True)
+    user_agent = models.CharField(max_length=300, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField()
+    revoked_at = models.DateTimeField(null=True, blank=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'revoked_at']),
+        ]
+    
+    def __str__(self):
+        return f"Refresh token for {self.user_id} (expires {self.expires_at:%Y-%m-%d})"
@@ -0,0 +1,31 @@
+# apps/users/signals.py - Keep cached and signed tokens honest
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from rest_framework.authtoken.models import Token
+from .authentication import token_revoked, user_changed
+from . import access_tokens
+from .models import User
+
+@receiver(post_delete, sender=Token)
+def revoke_cached_token(sender, instance, **kwargs):
+    """Login, logout and every password change / reset delete the user's tokens"""
+    token_revoked(instance.key)
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def refresh_cached_user(sender, instance, **kwargs):
+    user_changed(instance.pk)
+
+@receiver(post_init, sender=User)
+def remember_token_claims(sender, instance, **kwargs):
+    """What signed access tokens carry, as loaded (deferred fields aren't fetched)"""
+    instance._loaded_claims = (instance.__dict__.get('user_type'), instance.__dict__.get('affiliate_id'))
+
+@receiver(post_save, sender=User)
+def revoke_deactivated_user(sender, instance, created=False, **kwargs):
+    """Signed access tokens don't look at the database until they expire"""
+    claims = (instance.__dict__.get('user_type'), instance.__dict__.get('affiliate_id'))
+    if not created and (not instance.is_active or claims != instance._loaded_claims):
+        # Deactivated, or tokens would keep the old role / affiliate
+        access_tokens.revoke_user(instance.pk)
+    instance._loaded_claims = claims
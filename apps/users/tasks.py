@@ -0,0 +1,49 @@
+# apps/users/tasks.py - Background tasks for user accounts
+from django.conf import settings
+from django.contrib.auth.tokens import default_token_generator
+from django.core.mail import send_mail
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from apps.core.jobs import task
+from .models import User
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+@task
+def send_password_reset_email(user_id, base_url):
+    """
+    Email a password reset link.
+
+    The token is made here rather than in the request so it never sits in
+    the job table.
+    """
+    user = User.objects.filter(pk=user_id, is_active=True).first()
+    if user is None or not user.email:
+        return
+
+    token = default_token_generator.make_token(user)
+    uid = urlsafe_base64_encode(force_bytes(user.pk))
+    reset_url = f"{base_url}/reset-password/{uid}/{token}/"
+
+    subject = 'Password Reset Request'
+    message = f"""
+    Hi {user.username},
+
+    You requested a password reset. Click the link below to reset your password:
+    {reset_url}
+
+    If you didn't request this, please ignore this email.
+
+    This link will expire in 24 hours.
+    """
+
+    send_mail(
+        subject,
+        message,
+        settings.DEFAULT_FROM_EMAIL,
+        [user.email],
+        fail_silently=False,
+    )
+    logger.info(f"Password reset email sent to {user.email}")
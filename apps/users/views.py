@@ -8,12 +8,12 @@ from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import login, logout, authenticate
 from django.contrib.auth.tokens import default_token_generator
-from django.core.mail import send_mail
-from django.conf import settings
-from django.utils.http import urlsafe_base64_encode, urlsafe_base64_decode
-from django.utils.encoding import force_bytes, force_str
-from django.template.loader import render_to_string
+from django.utils.http import urlsafe_base64_decode
+from django.utils.encoding import force_str
 from .models import User
+from .tasks import send_password_reset_email
+from . import access_tokens
+from apps.core.jobs import enqueue, PRIORITY_HIGH
 from .serializers import (
     UserSerializer, LoginSerializer, ChangePasswordSerializer,
     SetPasswordSerializer, UserCreateSerializer, PasswordResetRequestSerializer,
@@ -41,12 +41,16 @@ class UserViewSet(viewsets.ModelViewSet):
             
             # Invalidate all tokens for this user
             Token.objects.filter(user=request.user).delete()
+            access_tokens.revoke_user(request.user.pk)
             new_token = Token.objects.create(user=request.user)
             
-            return Response({
+            response_data = {
                 'message': 'Password changed successfully',
                 'token': new_token.key
-            }, status=status.HTTP_200_OK)
+            }
+            if access_tokens.enabled():
+                response_data.update(access_tokens.issue_pair(request.user, request.META.get('HTTP_USER_AGENT', '')))
+            return Response(response_data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
     @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
@@ -58,6 +62,7 @@ class UserViewSet(viewsets.ModelViewSet):
         if serializer.is_valid():
             user = serializer.save()
             Token.objects.filter(user=user).delete()
+            access_tokens.revoke_user(user.pk)
             
             return Response({
                 'message': f'Password set successfully for {user.username}'
@@ -96,6 +101,10 @@ class LoginView(APIView):
                     'affiliate_id': getattr(user, 'affiliate_id', None)
                 }
                 
+                # Stateless access + refresh tokens next to the DB token
+                if access_tokens.enabled():
+                    response_data.update(access_tokens.issue_pair(user, request.META.get('HTTP_USER_AGENT', '')))
+                
                 # Add affiliate info if user is affiliate
                 if user.user_type == 'affiliate':
                     try:
@@ -130,6 +139,12 @@ class LogoutView(APIView):
         try:
             # Delete the token to logout
             Token.objects.filter(user=request.user).delete()
+            
+            # Signed access tokens die with the denylist, refresh tokens in the DB
+            if isinstance(request.auth, dict):
+                access_tokens.deny_access_token(request.auth)
+            if request.data.get('refresh'):
+                access_tokens.revoke_refresh_token(str(request.data['refresh']))
             logger.info(f"User {request.user.username} logged out successfully")
         except Exception as e:
             logger.error(f"Logout error: {e}")
@@ -137,6 +152,24 @@ class LogoutView(APIView):
         logout(request)
         return Response({'message': 'Logged out successfully'})
 
+class TokenRefreshView(APIView):
+    """Trade a refresh token for a new access / refresh pair (AUTH_SIGNED_TOKENS)"""
+    permission_classes = [AllowAny]
+    authentication_classes = []
+    
+    def post(self, request):
+        if not access_tokens.enabled():
+            return Response({'error': 'Signed tokens are not enabled'}, status=status.HTTP_404_NOT_FOUND)
+        
+        try:
+            tokens = access_tokens.refresh(
+                str(request.data.get('refresh') or ''),
+                request.META.get('HTTP_USER_AGENT', '')
+            )
+        except access_tokens.InvalidToken as e:
+            return Response({'error': str(e)}, status=status.HTTP_401_UNAUTHORIZED)
+        return Response(tokens)
+
 class ProfileView(APIView):
     permission_classes = [IsAuthenticated]
     
@@ -273,32 +306,15 @@ class PasswordResetRequestView(APIView):
             try:
                 user = User.objects.get(email=email, is_active=True)
                 
-                token = default_token_generator.make_token(user)
-                uid = urlsafe_base64_encode(force_bytes(user.pk))
-                
-                reset_url = f"{request.scheme}://{request.get_host()}/reset-password/{uid}/{token}/"
-                
-                subject = 'Password Reset Request'
-                message = f"""
-                Hi {user.username},
-                
-                You requested a password reset. Click the link below to reset your password:
-                {reset_url}
-                
-                If you didn't request this, please ignore this email.
-                
-                This link will expire in 24 hours.
-                """
-                
-                send_mail(
-                    subject,
-                    message,
-                    settings.DEFAULT_FROM_EMAIL,
-                    [email],
-                    fail_silently=False,
+                # The worker makes the token and sends the link
+                enqueue(
+                    send_password_reset_email,
+                    priority=PRIORITY_HIGH,
+                    user_id=user.pk,
+                    base_url=f"{request.scheme}://{request.get_host()}"
                 )
                 
-                logger.info(f"Password reset email sent to {email}")
+                logger.info(f"Password reset email queued for {email}")
                 
             except User.DoesNotExist:
                 logger.warning(f"Password reset requested for non-existent email: {email}")
@@ -328,6 +344,7 @@ class PasswordResetConfirmView(APIView):
             user.save()
             
             Token.objects.filter(user=user).delete()
+            access_tokens.revoke_user(user.pk)
             
             logger.info(f"Password reset completed for user {user.username}")
             
@@ -40,6 +40,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.db_routing.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -133,16 +134,96 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework - UPDATED FOR TOKEN AUTH
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.users.authentication.CachedTokenAuthentication',
+        'apps.users.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.core.pagination.EstimatedCountPagination',
     'PAGE_SIZE': 20,
 }
 
+# Token authentication cache (apps.users.authentication), per process
+AUTH_TOKEN_CACHE_SIZE = 10000
+AUTH_TOKEN_CACHE_TTL = 60  # seconds a cached token is trusted without the database
+AUTH_REVOCATION_CHECK_INTERVAL = 5  # seconds between revocation marker checks per cached token
+
+# Signed access + refresh tokens at login (apps.users.access_tokens)
+AUTH_SIGNED_TOKENS = config('AUTH_SIGNED_TOKENS', default=False, cast=bool)
+AUTH_ACCESS_TOKEN_TTL = 5 * 60
+AUTH_REFRESH_TOKEN_TTL = 14 * 24 * 60 * 60
+
+# List endpoints count exactly up to this many rows, then return estimates
+EXACT_COUNT_THRESHOLD = 10000
+
+# Rows fetched per round trip by streaming CSV / TSV lead exports
+EXPORT_CHUNK_SIZE = 2000
+
+# Background export jobs: 'thread' runs them in the web process, 'queue'
+# hands them to `manage.py runworker`, 'worker' leaves them to
+# `manage.py run_export_jobs`
+EXPORT_JOB_RUNNER = config('EXPORT_JOB_RUNNER', default='thread')
+EXPORT_JOB_TTL = 24 * 60 * 60  # seconds a finished export stays downloadable
+EXPORT_JOB_CLEANUP_INTERVAL = 10 * 60  # expired exports are removed at most this often
+EXPORT_STORAGE = {
+    'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    'OPTIONS': {'location': BASE_DIR / 'exports'},
+}
+
+# Export jobs this large are rendered in partitions on a process pool
+EXPORT_PARALLEL_WORKERS = config('EXPORT_PARALLEL_WORKERS', default=min(4, os.cpu_count() or 1), cast=int)
+EXPORT_PARALLEL_MIN_ROWS = 50000
+
+# Most leads one bulk status update may change
+LEAD_BULK_STATUS_LIMIT = 10000
+
+# Leads inserted per bulk_create by lead imports
+LEAD_IMPORT_BATCH_SIZE = 1000
+
+# Most leads one call to the batch submission API may carry
+LEAD_BATCH_SUBMIT_LIMIT = 500
+
+# Bulk affiliate onboarding: most rows per request, processes hashing passwords
+AFFILIATE_ONBOARDING_LIMIT = 5000
+AFFILIATE_ONBOARDING_HASH_WORKERS = config('AFFILIATE_ONBOARDING_HASH_WORKERS', default=min(4, os.cpu_count() or 1), cast=int)
+
+# Change feed holds back rows touched this recently so late commits aren't skipped
+CHANGE_FEED_SETTLE_SECONDS = 5
+
+# Background job queue (apps.core.jobs, run by `manage.py runworker`)
+JOB_QUEUE_EAGER = config('JOB_QUEUE_EAGER', default=False, cast=bool)  # run jobs on commit, no worker
+JOB_QUEUE_MAX_ATTEMPTS = 5
+JOB_QUEUE_BACKOFF_SECONDS = 30
+JOB_QUEUE_MAX_BACKOFF_SECONDS = 60 * 60
+JOB_QUEUE_LOCK_TIMEOUT = 30 * 60  # running jobs older than this are requeued
+JOB_QUEUE_RETENTION = 7 * 24 * 60 * 60  # finished jobs are pruned after this
+
+# Outbound lead webhooks (apps.leads.webhooks, delivered by the job worker)
+WEBHOOK_TIMEOUT = 10  # seconds per POST
+WEBHOOK_MAX_ATTEMPTS = 8  # then the event moves to the dead-letter table
+WEBHOOK_BATCH_WINDOW = 2  # seconds batched subscriptions collect events for
+
+# Database connections: kept per worker for DB_CONN_MAX_AGE seconds and
+# health-checked before reuse; DB_POOL switches PostgreSQL to the in-process
+# pool of apps.core.db_pool (threaded / ASGI workers)
+DB_CONN_MAX_AGE = config('DB_CONN_MAX_AGE', default=600, cast=int)
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+DB_POOL_MAX_SIZE = config('DB_POOL_MAX_SIZE', default=10, cast=int)
+DB_POOL_TIMEOUT = 30  # seconds to wait for a free connection
+DB_POOL_MAX_LIFETIME = 60 * 60  # connections are replaced after this
+DB_POOL_CHECK_IDLE = 30  # connections idle longer are pinged before reuse
+
+# Serve the public embed / submit endpoints with native async views; for
+# ASGI deployments (uvicorn workers), see render.yaml
+ASYNC_PUBLIC_VIEWS = config('ASYNC_PUBLIC_VIEWS', default=False, cast=bool)
+
+# Read replica routing (apps.core.db_routing); settings files add DATABASES['replica']
+DATABASE_ROUTERS = ['apps.core.db_routing.ReplicaRouter']
+DATABASE_REPLICA_ALIAS = 'replica'
+REPLICA_READ_YOUR_WRITES_SECONDS = 10  # reads stay on the primary this long after a user writes
+
 # Custom User Model - MUST come after INSTALLED_APPS
 AUTH_USER_MODEL = 'users.User'
 
@@ -168,6 +249,8 @@ SESSION_COOKIE_AGE = 86400 * 7  # 7 days
 SESSION_COOKIE_SECURE = config('SESSION_COOKIE_SECURE', default=False, cast=bool)
 SESSION_COOKIE_HTTPONLY = True
 SESSION_COOKIE_SAMESITE = 'Lax'
+SESSION_EXPIRY_REFRESH_INTERVAL = 15 * 60  # apps.core.sessions: expiry write-back at most this often
+SESSION_CACHE_TTL = 5 * 60  # apps.core.sessions: seconds a session is served from the cache
 
 # Token settings
 TOKEN_EXPIRE_AFTER = 86400 * 30  # 30 days (you might want to implement custom token expiry)
@@ -4,6 +4,7 @@ import os
 import dj_database_url
 from pathlib import Path
 import mimetypes
+import logging
 
 BASE_DIR = Path(__file__).resolve().parent.parent.parent
 
@@ -41,6 +42,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'apps.core.db_routing.ReadYourWritesMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -65,11 +67,14 @@ TEMPLATES = [
 
 WSGI_APPLICATION = 'backend.wsgi.application'
 
-# Database
+# Database - persistent connections, health-checked before reuse
+DB_CONN_MAX_AGE = int(os.environ.get('DB_CONN_MAX_AGE', 600))
+DB_POOL = os.environ.get('DB_POOL', 'False').lower() == 'true'  # apps.core.db_pool, for threaded / ASGI workers
+
 DATABASE_URL = os.environ.get('DATABASE_URL')
 if DATABASE_URL:
     DATABASES = {
-        'default': dj_database_url.parse(DATABASE_URL)
+        'default': dj_database_url.parse(DATABASE_URL, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True)
     }
 else:
     DATABASES = {
@@ -79,13 +84,54 @@ else:
         }
     }
 
+# Optional read replica for dashboards, analytics and exports (apps.core.db_routing)
+DATABASE_REPLICA_URL = os.environ.get('DATABASE_REPLICA_URL')
+if DATABASE_REPLICA_URL:
+    DATABASES['replica'] = dj_database_url.parse(
+        DATABASE_REPLICA_URL, conn_max_age=DB_CONN_MAX_AGE, conn_health_checks=True
+    )
+    DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+
+# The pool takes over connection reuse: connections go back to it after each request
+for database in DATABASES.values():
+    if DB_POOL and database['ENGINE'] == 'django.db.backends.postgresql':
+        database.update(ENGINE='apps.core.db_pool', CONN_MAX_AGE=0)
+
+DATABASE_ROUTERS = ['apps.core.db_routing.ReplicaRouter']
+
+# Shared cache - every gunicorn worker (and the job worker) must see the same
+# entries, e.g. the count tokens handed out by apps.core.pagination. Redis when
+# REDIS_URL is set, otherwise a table in the main database (createcachetable
+# in build.sh). 'local' is a per-process cache for hot read-throughs that
+# must not cost a query each (sessions without Redis).
+REDIS_URL = os.environ.get('REDIS_URL')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'django_cache',
+        }
+    }
+CACHES['local'] = {
+    'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    'LOCATION': 'local',
+}
+
 # Custom user model
 AUTH_USER_MODEL = 'users.User'
 
 # REST Framework - FIXED AUTHENTICATION
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'apps.users.authentication.CachedTokenAuthentication',
+        'apps.users.authentication.SignedTokenAuthentication',
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
@@ -94,10 +140,56 @@ REST_FRAMEWORK = {
     'DEFAULT_RENDERER_CLASSES': [
         'rest_framework.renderers.JSONRenderer',
     ],
-    'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
+    'DEFAULT_PAGINATION_CLASS': 'apps.core.pagination.EstimatedCountPagination',
     'PAGE_SIZE': 20,
 }
 
+# Signed access + refresh tokens at login (apps.users.access_tokens)
+AUTH_SIGNED_TOKENS = os.environ.get('AUTH_SIGNED_TOKENS', 'False').lower() == 'true'
+
+# Native async embed / submit views, for the ASGI profile in render.yaml
+ASYNC_PUBLIC_VIEWS = os.environ.get('ASYNC_PUBLIC_VIEWS', 'False').lower() == 'true'
+
+# Background job queue (apps.core.jobs), run by the affiliate-form-worker service
+JOB_QUEUE_EAGER = os.environ.get('JOB_QUEUE_EAGER', 'False').lower() == 'true'  # no worker: run jobs on commit
+JOB_QUEUE_MAX_ATTEMPTS = int(os.environ.get('JOB_QUEUE_MAX_ATTEMPTS', 5))
+JOB_QUEUE_BACKOFF_SECONDS = 30
+JOB_QUEUE_MAX_BACKOFF_SECONDS = 60 * 60
+JOB_QUEUE_LOCK_TIMEOUT = int(os.environ.get('JOB_QUEUE_LOCK_TIMEOUT', 30 * 60))  # running jobs older than this are requeued
+JOB_QUEUE_RETENTION = 7 * 24 * 60 * 60
+
+# Background exports: 'queue' hands them to the worker, 'thread' runs them in the web process
+EXPORT_JOB_RUNNER = os.environ.get('EXPORT_JOB_RUNNER', 'thread')
+
+# Export artifacts - the web service serves files the worker wrote, so with
+# the queue runner they live in a shared, S3 compatible bucket
+EXPORT_STORAGE_BUCKET = os.environ.get('EXPORT_STORAGE_BUCKET')
+if EXPORT_STORAGE_BUCKET:
+    EXPORT_STORAGE = {
+        'BACKEND': 'storages.backends.s3.S3Storage',
+        'OPTIONS': {
+            'bucket_name': EXPORT_STORAGE_BUCKET,
+            'endpoint_url': os.environ.get('EXPORT_STORAGE_ENDPOINT_URL') or None,
+            'region_name': os.environ.get('EXPORT_STORAGE_REGION') or None,
+            'access_key': os.environ.get('EXPORT_STORAGE_ACCESS_KEY'),
+            'secret_key': os.environ.get('EXPORT_STORAGE_SECRET_KEY'),
+            'location': 'exports',
+            'default_acl': 'private',
+            'file_overwrite': False,
+        },
+    }
+else:
+    EXPORT_STORAGE = {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+        'OPTIONS': {'location': BASE_DIR / 'exports'},
+    }
+    if EXPORT_JOB_RUNNER != 'thread':
+        # Files another process writes here can't be served; keep exports in the web process
+        logging.getLogger(__name__).warning(
+            f"EXPORT_JOB_RUNNER='{EXPORT_JOB_RUNNER}' needs EXPORT_STORAGE_BUCKET; running exports on web threads"
+        )
+        EXPORT_JOB_RUNNER = 'thread'
+
 # CORS Settings - FIXED FOR PRODUCTION
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
@@ -121,7 +213,15 @@ CORS_ALLOW_HEADERS = [
 ]
 
 # Session Configuration - FIXED
-SESSION_ENGINE = 'django.contrib.sessions.backends.db'
+# Cached, written to the database only when the data changes (apps.core.sessions).
+# With Redis they're served from the shared cache, so a logout in one worker
+# ends the session in all of them. The database cache would cost a query per
+# request, so without Redis each worker caches sessions itself and a logout
+# reaches the other workers within SESSION_CACHE_TTL.
+SESSION_ENGINE = 'apps.core.sessions'
+SESSION_CACHE_ALIAS = 'default' if REDIS_URL else 'local'
+SESSION_CACHE_TTL = 5 * 60 if REDIS_URL else 30
+SESSION_EXPIRY_REFRESH_INTERVAL = 15 * 60  # push the stored expiry forward at most this often
 SESSION_COOKIE_AGE = 86400 * 7  # 7 days
 SESSION_COOKIE_SECURE = True  # HTTPS only in production
 SESSION_COOKIE_HTTPONLY = True
@@ -6,6 +6,7 @@ from django.conf import settings
 from django.conf.urls.static import static
 from django.http import HttpResponse, FileResponse, JsonResponse
 from django.views.decorators.csrf import csrf_exempt
+from apps.forms import urls as forms_urls
 import os
 import logging
 
@@ -69,10 +70,9 @@ urlpatterns = [
     path('api/core/', include('apps.core.urls')),
     
     # Embed routes
-    path('embed/<uuid:form_id>/', lambda r, form_id: 
-         __import__('apps.forms.views', fromlist=['EmbedFormView']).EmbedFormView.as_view()(r, form_id=form_id)),
-    path('embed/<uuid:form_id>/submit/', lambda r, form_id: 
-         __import__('apps.forms.views', fromlist=['FormSubmissionView']).FormSubmissionView.as_view()(r, form_id=form_id)),
+    # (the views themselves, not wrapped: the async ones must stay coroutines)
+    path('embed/<uuid:form_id>/', forms_urls.embed_form_view),
+    path('embed/<uuid:form_id>/submit/', forms_urls.form_submit_view),
 ]
 
 # CRITICAL: Add static files serving for production
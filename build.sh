@@ -161,6 +161,18 @@ python manage.py migrate affiliates || echo "⚠️ Affiliates migration issue"
 python manage.py migrate leads || echo "⚠️ Leads migration issue"
 python manage.py migrate --run-syncdb || echo "⚠️ Final migration issue"
 
+# Table behind the shared cache (production CACHES without REDIS_URL)
+echo "🗃️ Creating cache table..."
+python manage.py createcachetable || echo "⚠️ Cache table issue"
+
+# Index any leads that don't have a search document yet
+echo "🔍 Updating lead search index..."
+python manage.py rebuild_lead_search_index --missing-only || echo "⚠️ Lead search index issue"
+
+# Conversion counters are kept by deltas; start them from true counts
+echo "🔢 Recounting affiliate stats..."
+python manage.py recount_affiliate_stats || echo "⚠️ Affiliate stats issue"
+
 # Create test users - SAFE VERSION
 echo "👤 Creating test users..."
 python -c "
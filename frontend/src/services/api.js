@@ -211,6 +211,8 @@ export const coreAPI = {
   getAnalytics: (params = {}) => api.get('/core/analytics/', { params }),
   getSettings: () => api.get('/core/settings/'),
   updateSettings: (data) => api.post('/core/settings/', data),
+  // Follow up on a list response with count_is_estimate: true
+  getExactCount: (exactCountUrl) => api.get(exactCountUrl, { baseURL: '' }),
 }
 
 // Utility functions